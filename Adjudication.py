@@ -0,0 +1,87 @@
+from BoardGeometry import BoardGeometry
+
+DEFAULT_REPETITION_LIMIT = 3
+DEFAULT_NO_PROGRESS_PLIES = 60
+
+
+def remaining_distance(game_logic, color):
+    """
+        Returns how many single steps the color's pieces still need, at least, to fill the opposite triangle:
+        their total distance to its tip minus the total distance of a filled triangle. 0 means the color is home.
+        """
+    targets = game_logic.geometry.targets[color]
+    tip = targets[0]
+    pieces = [(row, col) for row in range(game_logic.max_rows) for col in range(game_logic.max_cols)
+              if game_logic.board[row][col] == color]
+    filled = sorted(BoardGeometry.distance(target, tip) for target in targets)[:len(pieces)]
+    return sum(BoardGeometry.distance(piece, tip) for piece in pieces) - sum(filled)
+
+
+class GameAdjudicator:
+    """
+        Ends stalled games. Tracks repeated positions through the game's incremental position hash, and the number
+        of plies since any color last got closer to its goal than ever before. A stalled game is scored by the
+        remaining distance of each color.
+        """
+
+    def __init__(self, game_logic, colors, repetition_limit=DEFAULT_REPETITION_LIMIT,
+                 no_progress_plies=DEFAULT_NO_PROGRESS_PLIES, max_plies=None, first_player_index=0):
+        """
+            Initializes the adjudicator for a game that starts with colors[first_player_index] to move.
+
+            :param colors: The colors of the players in turn order.
+            :param repetition_limit: How often the same position with the same side to move may occur, or None.
+            :param no_progress_plies: How many plies may pass without a color reaching a new best distance, or None.
+            :param max_plies: A hard bound on the number of plies, or None.
+            :param first_player_index: The index of the color to move first, e.g. in a game loaded from a log.
+                """
+        self.game_logic = game_logic
+        self.colors = list(colors)
+        self.repetition_limit = repetition_limit
+        self.no_progress_plies = no_progress_plies
+        self.max_plies = max_plies
+        self.first_player_index = first_player_index
+        self.ply = 0
+        self.plies_without_progress = 0
+        self.best_distances = {color: remaining_distance(game_logic, color) for color in self.colors}
+        self.position_counts = {(game_logic.position_hash, first_player_index): 1}
+        self.reason = None
+
+    def record_ply(self, moved_color):
+        """
+            Records that moved_color finished its turn (or passed). Returns the reason the game must stop, one of
+            'repetition', 'no_progress' or 'max_plies', or None if the game continues.
+                """
+        self.ply += 1
+        distance = remaining_distance(self.game_logic, moved_color)
+        if distance < self.best_distances[moved_color]:
+            self.best_distances[moved_color] = distance
+            self.plies_without_progress = 0
+        else:
+            self.plies_without_progress += 1
+
+        key = (self.game_logic.position_hash, (self.first_player_index + self.ply) % len(self.colors))
+        self.position_counts[key] = self.position_counts.get(key, 0) + 1
+        if self.repetition_limit is not None and self.position_counts[key] >= self.repetition_limit:
+            self.reason = "repetition"
+        elif self.no_progress_plies is not None and self.plies_without_progress >= self.no_progress_plies:
+            self.reason = "no_progress"
+        elif self.max_plies is not None and self.ply >= self.max_plies:
+            self.reason = "max_plies"
+        return self.reason
+
+    def adjudicate(self, excluded=()):
+        """
+            Scores the game by remaining distance.
+
+            :param excluded: Colors that cannot win, e.g. a player who lost on time.
+            :return: A tuple (winner, distances), where winner is the color with the smallest remaining distance,
+                     or None if several colors share it.
+                """
+        distances = {color: remaining_distance(self.game_logic, color) for color in self.colors}
+        candidates = {color: distance for color, distance in distances.items() if color not in excluded}
+        if not candidates:
+            return None, distances
+        best = min(candidates.values())
+        leaders = [color for color, distance in candidates.items() if distance == best]
+        return (leaders[0] if len(leaders) == 1 else None), distances
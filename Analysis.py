@@ -0,0 +1,202 @@
+import argparse
+import csv
+import os
+from collections import deque
+from functools import partial
+from multiprocessing import Pool
+
+from GameLogic import GameLogic
+from ComputerPlayer import ENGINES, load_weights
+from Logging import Logging
+
+COLUMNS = ["game", "ply", "color", "from_row", "from_col", "to_row", "to_col", "evaluation",
+           "played_score", "best_score", "best_from_row", "best_from_col", "best_to_row", "best_to_col",
+           "disagreement", "blunder"]
+# Column types of the .npy output other than int32: scores are weighted evaluations, which need not be whole
+COLUMN_TYPES = {"color": "S1", "evaluation": "f8", "played_score": "f8", "best_score": "f8"}
+# Games submitted to the pool ahead of the one being written, per worker process
+PENDING_GAMES_PER_PROCESS = 4
+
+
+def find_log_files(paths):
+    """
+        Expands a list of log files and directories into the log files they contain, in sorted order.
+        """
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(".txt"):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def analyze_game(log_file_path, engine="heuristic", blunder_threshold=2, weights_version=None):
+    """
+        Replays one logged game and evaluates every position with the chosen engine.
+
+        :param log_file_path: The game log written by Logging.
+        :param engine: Name of the engine in ENGINES used for scoring.
+        :param blunder_threshold: How much lower than the best move's score the played move's score must be to count
+                                  as a blunder. Both scores are the engine's, so with the default weights this is a
+                                  number of steps towards the goal.
+        :param weights_version: The version of the tuned weights the engine evaluates with, or None for
+                                DEFAULT_WEIGHTS; see load_weights.
+        :return: A list of rows with the values of COLUMNS, except for the game column which is left empty.
+        """
+    logger = Logging(log_file_path)
+    actions = logger.load_game()
+    if not actions:
+        return []
+    players = logger.log_start_board(actions)
+    if players is None or not 2 <= sum(players) <= 6:
+        return []
+    game_logic = GameLogic(sum(players))
+    weights = load_weights(version=weights_version)
+    rows = []
+    engine_players = {}  # One engine per color, kept for the whole game
+    try:
+        for ply, (color, start_pos, end_pos) in enumerate(logger.parse_log_file()):
+            if start_pos is None or end_pos is None:
+                break
+            if color not in engine_players:
+                engine_players[color] = ENGINES[engine](color, game_logic, weights=weights)
+            engine_player = engine_players[color]
+            scored_moves = engine_player.score_moves(game_logic, engine_player)
+            scores = dict(scored_moves)
+            if (start_pos, end_pos) not in scores:
+                break  # The log does not describe a legal game from here on
+            # The played move is scored by the engine too, so it is on the same scale as the best move
+            played_score = scores[(start_pos, end_pos)]
+            best_move, best_score = max(scored_moves, key=lambda scored: scored[1])
+            rows.append([None, ply, color, start_pos[0], start_pos[1], end_pos[0], end_pos[1],
+                         engine_player.evaluate_position(game_logic, color), played_score, best_score,
+                         best_move[0][0], best_move[0][1], best_move[1][0], best_move[1][1],
+                         int(best_score > played_score), int(best_score - played_score >= blunder_threshold)])
+            if not game_logic.make_move([(color, start_pos, end_pos)]):
+                break  # The log does not describe a legal game from here on
+    finally:
+        for engine_player in engine_players.values():
+            engine_player.close()
+    return rows
+
+
+class CsvAnalysisWriter:
+    """
+        Streams analysis rows to a CSV file, identifying games by their log file name.
+        """
+
+    def __init__(self, output_path):
+        """
+            Opens the output file and writes the header row.
+                """
+        self.output_file = open(output_path, "w", newline="")
+        self.writer = csv.writer(self.output_file)
+        self.writer.writerow(COLUMNS)
+
+    def write_game(self, game_index, log_file_path, rows):
+        """
+            Writes the rows of one analyzed game.
+                """
+        name = os.path.basename(log_file_path)
+        self.writer.writerows([name] + row[1:] for row in rows)
+
+    def close(self):
+        """
+            Closes the output file.
+                """
+        self.output_file.close()
+
+
+class NpyAnalysisWriter:
+    """
+        Streams analysis rows to a structured .npy file. Games are identified by their index in the input order,
+        and a sidecar .games.txt file lists the log file of each index.
+        """
+
+    def __init__(self, output_path):
+        """
+            Creates the output file, replacing any previous analysis at the same path.
+                """
+        import numpy as np
+        from NpyStore import AppendableNpy
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        dtype = [(name, COLUMN_TYPES.get(name, np.int32)) for name in COLUMNS]
+        self.store = AppendableNpy(output_path, dtype)
+        self.games_file = open(os.path.splitext(output_path)[0] + ".games.txt", "w")
+
+    def write_game(self, game_index, log_file_path, rows):
+        """
+            Appends the rows of one analyzed game as a single chunk.
+                """
+        self.games_file.write(log_file_path + "\n")
+        self.store.append([tuple([game_index] + row[1:2] + [row[2].encode()] + row[3:]) for row in rows])
+
+    def close(self):
+        """
+            Closes the sidecar file. The .npy file is complete after every chunk.
+                """
+        self.games_file.close()
+
+
+def analyze_logs(paths, output_path, engine="heuristic", processes=None, blunder_threshold=2, weights_version=None):
+    """
+        Analyzes many game logs in parallel and streams the per-move results to a CSV or NPY file, chosen by the
+        output file extension. Log files are found as the analysis goes, and at most PENDING_GAMES_PER_PROCESS
+        games per process are in flight, so memory stays bounded however many logs there are.
+
+        :return: A dictionary with the number of games, analyzed plies, disagreements and blunders.
+        """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine}")
+    writer = NpyAnalysisWriter(output_path) if output_path.endswith(".npy") else CsvAnalysisWriter(output_path)
+    summary = {"games": 0, "plies": 0, "disagreements": 0, "blunders": 0}
+    analyze = partial(analyze_game, engine=engine, blunder_threshold=blunder_threshold,
+                      weights_version=weights_version)
+    max_pending = (processes or os.cpu_count() or 1) * PENDING_GAMES_PER_PROCESS
+    pending = deque()  # (log file, AsyncResult) of the submitted games, in log file order
+
+    def write_oldest():
+        log_file_path, result = pending.popleft()
+        rows = result.get()
+        writer.write_game(summary["games"], log_file_path, rows)
+        summary["games"] += 1
+        summary["plies"] += len(rows)
+        summary["disagreements"] += sum(row[-2] for row in rows)
+        summary["blunders"] += sum(row[-1] for row in rows)
+
+    try:
+        with Pool(processes) as pool:
+            for log_file_path in find_log_files(paths):
+                pending.append((log_file_path, pool.apply_async(analyze, (log_file_path,))))
+                if len(pending) >= max_pending:
+                    write_oldest()
+            while pending:
+                write_oldest()
+    finally:
+        writer.close()
+    return summary
+
+
+def main():
+    """
+        Command line entry point: analyzes the given logs and directories into one output file.
+        """
+    parser = argparse.ArgumentParser(description="Evaluate every position of recorded Chinese Checkers games.")
+    parser.add_argument("paths", nargs="+", help="Game log files or directories of game logs.")
+    parser.add_argument("-o", "--output", default="analysis.csv", help="Output file (.csv or .npy).")
+    parser.add_argument("--engine", default="heuristic", choices=sorted(ENGINES))
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--blunder-threshold", type=float, default=2)
+    parser.add_argument("--weights-version", type=int, default=None,
+                        help="Tuned weights to evaluate with, see Tuner.py. The default weights if not given.")
+    args = parser.parse_args()
+    summary = analyze_logs(args.paths, args.output, args.engine, args.processes, args.blunder_threshold,
+                           args.weights_version)
+    print(f"Analyzed {summary['plies']} moves in {summary['games']} games: "
+          f"{summary['disagreements']} disagreements, {summary['blunders']} blunders.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import time
+
+from GameLogic import GameLogic
+from Logging import Logging
+
+HOP_SECONDS = 0.25  # How long one hop takes at normal speed
+FRAME_BUDGET = 1 / 60  # Target time between frames
+MIN_SOUND_INTERVAL = 0.08  # Hop sounds closer together than this are skipped
+
+
+class HopAnimation:
+    """
+        The timeline of a sequence of hops (single steps or jumps), each taking hop_seconds / speed. The state is
+        computed from the elapsed time, so a frame that comes late simply shows a later state: at high speeds
+        several hops finish between two frames, and their intermediate frames are never drawn.
+        """
+
+    def __init__(self, hops, hop_seconds=HOP_SECONDS, speed=1.0):
+        """
+            Initializes the timeline.
+
+            :param hops: A list of (color, start_pos, end_pos) tuples, in the order they are played.
+            :param speed: Playback speed multiplier, e.g. 10 for ten times faster.
+                """
+        if speed <= 0:
+            raise ValueError("Playback speed must be positive.")
+        self.hops = hops
+        self.hop_duration = hop_seconds / speed
+
+    def duration(self):
+        """
+            Returns how long the whole animation takes, in seconds.
+                """
+        return len(self.hops) * self.hop_duration
+
+    def progress(self, elapsed):
+        """
+            Returns the state of the animation after the given number of seconds.
+
+            :return: A tuple (number of finished hops, fraction of the current hop done). The fraction is 0 once
+                     every hop is finished.
+                """
+        if self.hop_duration <= 0 or elapsed >= self.duration():
+            return len(self.hops), 0.0
+        hops_done = int(elapsed / self.hop_duration)
+        return hops_done, elapsed / self.hop_duration - hops_done
+
+
+def interpolate(start, end, fraction):
+    """
+        Returns the point a fraction of the way from start to end, with easing so hops speed up and slow down.
+        """
+    eased = fraction * fraction * (3 - 2 * fraction)
+    return tuple(a + (b - a) * eased for a, b in zip(start, end))
+
+
+class SoundThrottle:
+    """
+        Lets a sound play only if the previous one started at least min_interval ago, so fast playback does not
+        pile up overlapping copies of the same sound.
+        """
+
+    def __init__(self, min_interval=MIN_SOUND_INTERVAL, timer=time.monotonic):
+        """
+            Initializes the throttle.
+
+            :param timer: A function returning the current time in seconds, replaceable for tests.
+                """
+        self.min_interval = min_interval
+        self.timer = timer
+        self.last_played = None
+        self.skipped = 0
+
+    def ready(self):
+        """
+            Returns True, and records the sound as played, if enough time has passed since the last one.
+                """
+        now = self.timer()
+        if self.last_played is not None and now - self.last_played < self.min_interval:
+            self.skipped += 1
+            return False
+        self.last_played = now
+        return True
+
+
+class FramePacer:
+    """
+        Schedules frames at a fixed time budget: the delay before the next frame is the budget minus the time the
+        current frame took, so slow frames do not make the animation fall behind. Counts the frames drawn and the
+        hops that finished without being drawn.
+        """
+
+    def __init__(self, frame_budget=FRAME_BUDGET, timer=time.monotonic):
+        """
+            Initializes the pacer.
+
+            :param timer: A function returning the current time in seconds, replaceable for tests.
+                """
+        self.frame_budget = frame_budget
+        self.timer = timer
+        self.started = None
+        self.frame_started = None
+        self.frames = 0
+        self.dropped_hops = 0
+
+    def start(self):
+        """
+            Starts the animation clock.
+                """
+        self.started = self.frame_started = self.timer()
+
+    def begin_frame(self):
+        """
+            Marks the start of a frame's work and returns the seconds since the animation started.
+                """
+        self.frame_started = self.timer()
+        self.frames += 1
+        return self.frame_started - self.started
+
+    def record_hops(self, finished, shown):
+        """
+            Records that a frame finished several hops, of which only some were shown moving.
+                """
+        self.dropped_hops += max(0, finished - shown)
+
+    def next_delay_ms(self):
+        """
+            Returns the delay in milliseconds before the next frame, at least 1 so other events get their turn.
+                """
+        spent = self.timer() - self.frame_started
+        return max(1, int(round((self.frame_budget - spent) * 1000)))
+
+
+def turn_hops(moves):
+    """
+        Splits logged moves into turns: a jump continued by the same piece belongs to the same turn.
+
+        :param moves: A list of (color, start_pos, end_pos) tuples.
+        :return: A list of turns, each a list of hops.
+        """
+    turns = []
+    for move in moves:
+        color, start_pos, _ = move
+        if turns and turns[-1][-1][0] == color and turns[-1][-1][2] == start_pos:
+            turns[-1].append(move)
+        else:
+            turns.append([move])
+    return turns
+
+
+def load_replay(log_file_path):
+    """
+        Reads a game log written by Logging for replaying.
+
+        :return: A tuple (number of players, moves), where moves are the (color, start_pos, end_pos) tuples up to
+                 the first one that cannot be played, or None if the file is not a readable game log.
+        """
+    logger = Logging(log_file_path)
+    actions = logger.load_game()
+    players = logger.log_start_board(actions) if actions else None
+    if players is None or not 2 <= sum(players) <= 6:
+        return None
+    game_logic = GameLogic(sum(players))
+    moves = []
+    for color, start_pos, end_pos in logger.parse_log_file():
+        if start_pos is None or end_pos is None or not game_logic.make_move([(color, start_pos, end_pos)]):
+            break
+        moves.append((color, start_pos, end_pos))
+    return sum(players), moves
@@ -0,0 +1,124 @@
+import random
+from functools import lru_cache
+
+# Hexagonal directions for single steps, in (row, col) offsets on the doubled-width grid
+HEX_DIRECTIONS = [(0, -2), (1, -1), (1, 1), (0, 2), (-1, 1), (-1, -1)]
+PLAYER_COLORS = ["R", "B", "G", "Y", "O", "P"]
+COLOR_INDEX = {color: i for i, color in enumerate(PLAYER_COLORS)}
+OPPOSITE_COLORS = {'R': 'B', 'B': 'R', 'G': 'Y', 'Y': 'G', 'O': 'P', 'P': 'O'}
+STANDARD_SIZE = 4
+
+
+class BoardGeometry:
+    """
+        The layout of a star board with triangles of the given size, and lookup tables derived from it.
+        Size 4 is the standard 121-hole board on a 17x25 grid. Use get_geometry() to share one instance per size.
+        """
+
+    def __init__(self, size=STANDARD_SIZE):
+        """
+            Generates the board layout and its lookup tables.
+
+            :param size: The number of rows of each star point, at least 1.
+                """
+        assert size >= 1, "Board size must be at least 1."
+        self.size = size
+        self.max_rows = 4 * size + 1
+        self.max_cols = 6 * size + 1
+        self.center = (2 * size, 3 * size)
+
+        # Playable holes in row-major order, and their index
+        self.positions = [(row, col) for row in range(self.max_rows) for col in range(self.max_cols)
+                          if self.in_star(row, col)]
+        self.index = {position: i for i, position in enumerate(self.positions)}
+
+        # neighbors[i][d] and jumps[i][d]: the hole index one and two steps from hole i in direction d, or None
+        self.neighbors = []
+        self.jumps = []
+        for row, col in self.positions:
+            self.neighbors.append([self.index.get((row + dr, col + dc)) for dr, dc in HEX_DIRECTIONS])
+            self.jumps.append([self.index.get((row + 2 * dr, col + 2 * dc)) for dr, dc in HEX_DIRECTIONS])
+        # steps[i]: the holes one step from hole i; jump_over[(i, j)]: the hole jumped over from hole i to hole j
+        self.steps = [frozenset(hole for hole in holes if hole is not None) for holes in self.neighbors]
+        self.jump_over = {(i, to): over
+                          for i in range(len(self.positions))
+                          for over, to in zip(self.neighbors[i], self.jumps[i]) if to is not None}
+
+        # Home triangles, listed from the tip towards the center, and targets in the opposite triangle
+        self.homes = {color: [] for color in PLAYER_COLORS}
+        for position in self.positions:
+            color = self.home_color(position)
+            if color is not None:
+                self.homes[color].append(position)
+        for color in PLAYER_COLORS:
+            self.homes[color].sort(key=lambda pos: (-self.distance(pos, self.center), pos))
+        self.targets = {color: self.homes[OPPOSITE_COLORS[color]] for color in PLAYER_COLORS}
+        self.target_sets = {color: frozenset(targets) for color, targets in self.targets.items()}
+
+        # zobrist[i][c]: random key of a piece of color c on hole i. Seeded by size, so hashes are reproducible.
+        rng = random.Random(size)
+        self.zobrist = [[rng.getrandbits(64) for _ in PLAYER_COLORS] for _ in self.positions]
+
+    def cube(self, row, col):
+        """
+            Returns the cube coordinates of a position relative to the center hole.
+                """
+        dr, dc = row - self.center[0], col - self.center[1]
+        x = (dc - dr) // 2
+        return x, -x - dr, dr
+
+    def in_star(self, row, col):
+        """
+            Checks if a grid position is a hole of the star, i.e. lies in one of its two large triangles.
+                """
+        if (row - self.center[0]) % 2 != (col - self.center[1]) % 2:
+            return False
+        coordinates = self.cube(row, col)
+        return max(coordinates) <= self.size or min(coordinates) >= -self.size
+
+    def home_color(self, position):
+        """
+            Returns the color whose home triangle contains the position, or None for the central hexagon.
+                """
+        x, y, z = self.cube(*position)
+        for value, low, high in ((z, 'R', 'B'), (y, 'Y', 'G'), (x, 'P', 'O')):
+            if value < -self.size:
+                return low
+            if value > self.size:
+                return high
+        return None
+
+    def is_playable(self, row, col):
+        """
+            Checks if (row, col) is a hole of the board.
+                """
+        return (row, col) in self.index
+
+    @staticmethod
+    def distance(start_pos, end_pos):
+        """
+            Returns the number of single steps between two positions.
+                """
+        rows = abs(end_pos[0] - start_pos[0])
+        cols = abs(end_pos[1] - start_pos[1])
+        return rows + max(0, (cols - rows) // 2)
+
+
+@lru_cache(maxsize=None)
+def get_geometry(size=STANDARD_SIZE):
+    """
+        Returns the shared geometry of the given size, generating its tables on first use.
+        """
+    return BoardGeometry(size)
+
+
+def size_for_holes(num_holes):
+    """
+        Returns the board size that has the given number of holes.
+        """
+    size = 1
+    while 6 * size * size + 6 * size + 1 < num_holes:
+        size += 1
+    if 6 * size * size + 6 * size + 1 != num_holes:
+        raise ValueError(f"No board has {num_holes} holes.")
+    return size
@@ -0,0 +1,273 @@
+import argparse
+import math
+import os
+import struct
+import zlib
+from functools import lru_cache, partial
+from multiprocessing import Pool
+
+import numpy as np
+
+from Analysis import find_log_files
+from Animation import load_replay
+from BoardGeometry import STANDARD_SIZE, get_geometry, size_for_holes
+from BoardLayout import BACKGROUND_COLOR, OUTLINE_COLOR, PALETTE, BoardLayout, get_color, hex_to_rgb
+from GameLogic import GameLogic
+
+try:
+    from PIL import Image  # Optional, only needed for animated GIFs
+except ImportError:
+    Image = None
+
+IMAGE_FORMATS = ["png", "svg", "gif"]
+
+
+class BoardRenderer:
+    """
+        Renders board positions to RGB images without a display, with the GUI's layout and palette. The empty board
+        and a sprite for every piece color are drawn once, so a frame is a copy of the background plus one blit per
+        piece.
+        """
+
+    def __init__(self, size=STANDARD_SIZE, width=750, height=750):
+        """
+            Prepares the background and the sprites.
+
+            :param size: The board size, see BoardGeometry.
+            :param width: Image width in pixels. The GUI draws the board in a 750 x 750 area.
+            :param height: Image height in pixels.
+                """
+        geometry = get_geometry(size)
+        self.size = size
+        self.positions = geometry.positions
+        self.layout = BoardLayout(geometry.max_rows, geometry.max_cols, width, height)
+
+        # A disk with a one pixel outline, in a square sprite
+        radius = self.layout.radius
+        side = 2 * math.ceil(radius) + 1
+        offsets = np.arange(side) - side // 2
+        distance = np.hypot(offsets[:, None], offsets[None, :])
+        self.sprite_mask = distance <= radius
+        inside = distance <= radius - 1
+        self.sprites = {}
+        for cell, color in PALETTE.items():
+            sprite = np.empty((side, side, 3), dtype=np.uint8)
+            sprite[:] = hex_to_rgb(OUTLINE_COLOR)
+            sprite[inside] = hex_to_rgb(color)
+            self.sprites[cell] = sprite
+
+        # Where each hole's sprite goes, clipped to the image
+        self.slices = []
+        for row, col in self.positions:
+            x, y = self.layout.center(row, col)
+            top, left = int(round(y)) - side // 2, int(round(x)) - side // 2
+            image_rows = slice(max(top, 0), min(top + side, height))
+            image_cols = slice(max(left, 0), min(left + side, width))
+            sprite_rows = slice(image_rows.start - top, image_rows.stop - top)
+            sprite_cols = slice(image_cols.start - left, image_cols.stop - left)
+            self.slices.append((image_rows, image_cols, sprite_rows, sprite_cols))
+
+        self.background = np.empty((height, width, 3), dtype=np.uint8)
+        self.background[:] = hex_to_rgb(BACKGROUND_COLOR)
+        for hole in range(len(self.positions)):
+            self.blit(self.background, hole, 'E')
+
+    def blit(self, image, hole, cell):
+        """
+            Draws the sprite of a cell value over the given hole.
+                """
+        image_rows, image_cols, sprite_rows, sprite_cols = self.slices[hole]
+        mask = self.sprite_mask[sprite_rows, sprite_cols]
+        image[image_rows, image_cols][mask] = self.sprites[cell][sprite_rows, sprite_cols][mask]
+
+    def render(self, board):
+        """
+            Renders a board, as held by GameLogic, to a (height x width x 3) uint8 RGB array.
+                """
+        image = self.background.copy()
+        for hole, (row, col) in enumerate(self.positions):
+            cell = board[row][col]
+            if cell != 'E' and cell in self.sprites:
+                self.blit(image, hole, cell)
+        return image
+
+    def svg(self, board):
+        """
+            Renders a board as an SVG document.
+                """
+        layout = self.layout
+        elements = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{layout.width:g}" height="{layout.height:g}">',
+                    f'<rect width="100%" height="100%" fill="{BACKGROUND_COLOR}"/>']
+        for row, col in self.positions:
+            x, y = layout.center(row, col)
+            elements.append(f'<circle cx="{x:.1f}" cy="{y:.1f}" r="{layout.radius:.1f}" '
+                            f'fill="{get_color(board[row][col])}" stroke="{OUTLINE_COLOR}"/>')
+        elements.append("</svg>")
+        return "\n".join(elements) + "\n"
+
+
+@lru_cache(maxsize=8)
+def get_renderer(size=STANDARD_SIZE, width=750, height=750):
+    """
+        Returns a shared renderer, so every process builds its background and sprites only once per image size.
+        """
+    return BoardRenderer(size, width, height)
+
+
+def png_bytes(image):
+    """
+        Encodes an RGB image as PNG, using only zlib.
+        """
+    height, width, _ = image.shape
+    # Every scanline starts with filter type 0 (none)
+    raw = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    raw[:, 1:] = image.reshape(height, width * 3)
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw.tobytes(), 6))
+            + chunk(b"IEND", b""))
+
+
+def write_png(path, image):
+    """
+        Writes an RGB image to a PNG file.
+        """
+    with open(path, "wb") as png_file:
+        png_file.write(png_bytes(image))
+
+
+def write_gif(path, frames, frame_duration=200):
+    """
+        Writes RGB frames to an animated GIF. Needs Pillow.
+
+        :param frame_duration: Milliseconds per frame.
+        """
+    check_formats(["gif"])
+    images = [Image.fromarray(frame) for frame in frames]
+    images[0].save(path, save_all=True, append_images=images[1:], duration=frame_duration, loop=0, optimize=True)
+
+
+def check_formats(formats):
+    """
+        Raises ImportError if one of the image formats needs an optional package that is not installed.
+        """
+    if "gif" in formats and Image is None:
+        raise ImportError("Animated GIFs need Pillow; install it with 'pip install pillow'.")
+
+
+def render_board(board, width=750, height=750):
+    """
+        Renders one board with the shared renderer of its size. Used as a process pool task.
+        """
+    return get_renderer(size_for_holes(sum(cell not in (' ', None) for cells in board for cell in cells)),
+                        width, height).render(board)
+
+
+def render_frames(boards, width=750, height=750, processes=None):
+    """
+        Renders many boards in a process pool, in order.
+
+        :return: A list of RGB arrays.
+        """
+    with Pool(processes) as pool:
+        return pool.map(partial(render_board, width=width, height=height), boards,
+                        chunksize=max(1, len(boards) // (4 * (processes or os.cpu_count() or 1))))
+
+
+def replay_log(log_file_path):
+    """
+        Replays a game log written by Logging.
+
+        :return: The list of boards, from the start position to the last logged move, or an empty list if the file
+                 is not a readable game log.
+        """
+    replay = load_replay(log_file_path)
+    if replay is None:
+        return []
+    num_players, moves = replay
+    game_logic = GameLogic(num_players)
+    boards = [[row[:] for row in game_logic.board]]
+    for move in moves:
+        game_logic.make_move([move])
+        boards.append([row[:] for row in game_logic.board])
+    return boards
+
+
+def render_log(log_file_path, output_dir, formats=("png",), width=750, height=750, frame_step=1,
+               frame_duration=200):
+    """
+        Renders the final position of a logged game as PNG and/or SVG, and the whole game as an animated GIF.
+
+        :param formats: Any of IMAGE_FORMATS.
+        :param frame_step: Put every frame_step-th position in the GIF; the final position is always included.
+        :return: The paths of the files written.
+        """
+    boards = replay_log(log_file_path)
+    if not boards:
+        return []
+    renderer = get_renderer(STANDARD_SIZE, width, height)  # Logged games are played on the standard board
+    name = os.path.splitext(os.path.basename(log_file_path))[0]
+    written = []
+    if "png" in formats:
+        written.append(os.path.join(output_dir, name + ".png"))
+        write_png(written[-1], renderer.render(boards[-1]))
+    if "svg" in formats:
+        written.append(os.path.join(output_dir, name + ".svg"))
+        with open(written[-1], "w") as svg_file:
+            svg_file.write(renderer.svg(boards[-1]))
+    if "gif" in formats:
+        frames = boards[::frame_step]
+        if len(boards) > 1 and (len(boards) - 1) % frame_step:
+            frames.append(boards[-1])
+        written.append(os.path.join(output_dir, name + ".gif"))
+        write_gif(written[-1], [renderer.render(board) for board in frames], frame_duration)
+    return written
+
+
+def render_logs(paths, output_dir, formats=("png",), width=750, height=750, processes=None, frame_step=1):
+    """
+        Renders many logged games in a process pool, one game per task.
+
+        :param paths: Log files and directories of log files.
+        :return: The paths of all files written.
+        :raises ImportError: Before anything is rendered, if a format needs a package that is not installed.
+        """
+    check_formats(formats)
+    os.makedirs(output_dir, exist_ok=True)
+    task = partial(render_log, output_dir=output_dir, formats=formats, width=width, height=height,
+                   frame_step=frame_step)
+    written = []
+    with Pool(processes) as pool:
+        for paths_written in pool.imap_unordered(task, find_log_files(paths), chunksize=4):
+            written.extend(paths_written)
+    return sorted(written)
+
+
+def main():
+    """
+        Command line entry point: renders thumbnails, SVGs or animations of logged games.
+        """
+    parser = argparse.ArgumentParser(description="Render logged games to images without a display.")
+    parser.add_argument("logs", nargs="+", help="Game log files or directories of game logs.")
+    parser.add_argument("--output-dir", default="images")
+    parser.add_argument("--formats", nargs="+", choices=IMAGE_FORMATS, default=["png"])
+    parser.add_argument("--width", type=int, default=750)
+    parser.add_argument("--height", type=int, default=750)
+    parser.add_argument("--frame-step", type=int, default=1, help="Use every n-th position in animations.")
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+    try:
+        check_formats(args.formats)
+    except ImportError as error:
+        parser.error(str(error))
+    written = render_logs(args.logs, args.output_dir, args.formats, args.width, args.height, args.processes,
+                          args.frame_step)
+    print(f"Wrote {len(written)} files to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
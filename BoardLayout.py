@@ -0,0 +1,58 @@
+# Colors of the pieces and holes, shared by the GUI and the image renderer
+PALETTE = {
+    'R': '#E57373',  # Red
+    'B': '#64B5F6',  # Blue
+    'G': '#81C784',  # Green
+    'Y': '#FFF176',  # Yellow
+    'O': '#FFB74D',  # Orange
+    'P': '#BA68C8',  # Purple
+    'E': '#FFFFFF'  # Empty but playable spot
+}
+BACKGROUND_COLOR = '#E0F7FA'
+OUTLINE_COLOR = '#000000'
+
+
+def get_color(cell):
+    """
+        Maps cell values to specific colors for drawing the board. Defaults to white for empty or unrecognized cells.
+        """
+    return PALETTE.get(cell, PALETTE['E'])
+
+
+def hex_to_rgb(color):
+    """
+        Converts a '#RRGGBB' color to an (r, g, b) tuple.
+        """
+    return tuple(int(color[i:i + 2], 16) for i in (1, 3, 5))
+
+
+class BoardLayout:
+    """
+        Where the holes of the board are drawn in an area of the given size: each grid column and row gets an equal
+        share of the area, and every hole is a circle centered in its cell.
+        """
+
+    def __init__(self, max_rows, max_cols, width, height):
+        """
+            Computes the layout of a max_rows x max_cols board grid in a width x height area.
+                """
+        self.max_rows = max_rows
+        self.max_cols = max_cols
+        self.width = width
+        self.height = height
+        self.col_width = width / max_cols
+        self.row_height = height / max_rows
+        self.radius = min(self.col_width, self.row_height) / 1.4  # Adjust as needed for visual appeal
+
+    def center(self, row, col):
+        """
+            Returns the (x, y) center of the hole at (row, col).
+                """
+        return col * self.col_width + self.col_width / 2, row * self.row_height + self.row_height / 2
+
+    def bounds(self, row, col):
+        """
+            Returns the (x0, y0, x1, y1) bounding box of the hole at (row, col).
+                """
+        x, y = self.center(row, col)
+        return x - self.radius, y - self.radius, x + self.radius, y + self.radius
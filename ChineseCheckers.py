@@ -3,14 +3,19 @@ from UserInterface import UserInterface
 from Player import Player
 from ComputerPlayer import *
 from Logging import *
+from Adjudication import GameAdjudicator
+from ConsoleRenderer import RENDER_MODES, create_renderer
+from GameClock import GameClock, TimeControl
+import argparse
 import datetime
 
 
 class ChineseCheckers:
-    def __init__(self, human_players, computer_players):
+    def __init__(self, human_players, computer_players, renderer=None):
         """
             Represents a game of Chinese Checkers including players, game logic, and user interface.
             Initializes the game with a given number of human and computer players.
+            The optional renderer decides how the board is shown, see ConsoleRenderer.
             """
         total_players = human_players + computer_players
         MAX_PLAYERS = 6
@@ -24,13 +29,35 @@ class ChineseCheckers:
         for i in range(human_players, total_players):
             self.players.append(ComputerPlayer(player_names[i], colors[i]))
         self.game_logic = GameLogic(total_players)
-        self.ui = UserInterface(self.game_logic)
+        self.ui = UserInterface(self.game_logic, renderer)
+
+    def close(self):
+        """
+            Frees what the computer players hold, see ComputerPlayer.close.
+            """
+        for player in self.players:
+            if not isinstance(player, Player):
+                player.close()
 
 
-def play_game():
+def game_renderer(display, num_humans):
+    """
+        Creates the renderer for a game. Human players type their moves on the console, so games with humans
+        print the board as plain text, unless it is not shown at all; games between computers can be drawn in place.
+        """
+    if num_humans > 0 and display != "quiet":
+        return create_renderer("plain")
+    return create_renderer(display)
+
+
+def play_game(display="auto", time_control=None):
     """
        Main function to play the game. Allows starting a new game or loading an existing game.
        Manages the game loop including player turns and checking for game over conditions.
+
+       :param display: How the board is shown: 'auto', 'curses', 'plain' or 'quiet', see ConsoleRenderer.
+       :param time_control: A GameClock.TimeControl for every seat, or None to play without clocks. A loaded game
+                            keeps the time control in its log unless one is given.
        """
     print("Welcome to Chinese Checkers!")
     choice = input("Start a new game or load an existing one? (new/load): ")
@@ -42,15 +69,17 @@ def play_game():
             logger = Logging(address)
             actions = logger.load_game()
         num_humans, num_computers = logger.log_start_board(actions)
-        game_over = False
+        logged_time_control = logger.log_time_control(actions)
+        if time_control is None and logged_time_control is not None:
+            time_control = TimeControl.parse(logged_time_control)
 
         current_player_index = 0
-        game = ChineseCheckers(num_humans, num_computers)
+        game = ChineseCheckers(num_humans, num_computers, game_renderer(display, num_humans))
         actions = logger.parse_log_file()
 
         for line in actions:
-            print("The current move is:", line)
-            if input(
+            game.ui.display_message(f"The current move is: {line}")
+            if game.ui.prompt(
                     "Press Enter to apply the move or type 'continue' to start playing now: ").lower() == 'continue':
                 break
             else:
@@ -58,7 +87,7 @@ def play_game():
                         num_humans + num_computers)  # Move to the next player
                 game.game_logic.make_move([(line[0], line[1], line[2])])
                 game.ui.display_board()
-        print("Continuing game from the current state...")
+        game.ui.display_message("Continuing game from the current state...")
     else:
         # Logic for starting a new game
         valid_input = False
@@ -76,9 +105,8 @@ def play_game():
                 valid_input = True  # Input is valid, proceed with the game setup
             except ValueError as e:
                 print(f"Invalid input: {e}. Please try again.")
-        game = ChineseCheckers(num_humans, num_computers)
+        game = ChineseCheckers(num_humans, num_computers, game_renderer(display, num_humans))
 
-        game_over = False
         current_player_index = 0
         current_time = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
         log_file = f"game_log_{current_time}.txt"
@@ -86,20 +114,74 @@ def play_game():
         logger.log_action("System",
                           "Game Start, number of humans: " + str(num_humans) + ", number of computers: " + str(
                               num_computers))
+        if time_control is not None:
+            logger.log_action("System", f"Time control: {time_control}")
+    colors = [player.color[0] for player in game.players]
+    adjudicator = GameAdjudicator(game.game_logic, colors, first_player_index=current_player_index)
+    clock = GameClock(time_control, colors) if time_control is not None else None
+    try:
+        run_game_loop(game, logger, adjudicator, current_player_index, watching=num_humans == 0, clock=clock)
+    finally:
+        game.close()
+        game.ui.close()
+
+
+def run_game_loop(game, logger, adjudicator, current_player_index, watching=False, clock=None):
+    """
+        Plays turns until a player wins, a player's time runs out, or the adjudicator stops the game.
+
+        :param watching: Show the board after every computer move, for games without human players.
+        :param clock: An optional GameClock. Time used and left is logged after every turn.
+        """
+    game_over = False
     while not game_over:
         current_player = game.players[current_player_index]
+        color = current_player.color[0]
+        if clock is not None:
+            clock.start(color)
         if isinstance(current_player, Player):
             # Human player's turn
             game.ui.display_board()
+            if clock is not None:
+                game.ui.display_message(f"{color} has {clock.time_left():.0f} seconds left.")
             human_turn(game.game_logic, game.ui, current_player.color, logger, True)
         else:
             # Computer player's turn
-            computer_turn(game.game_logic, current_player, logger)
+            computer_turn(game.game_logic, current_player, logger, game.ui,
+                          clock.time_left() if clock is not None else None)
+            if watching:
+                game.ui.display_board()
+
+        flag_fell = False
+        if clock is not None:
+            elapsed, flag_fell = clock.stop()
+            logger.log_action(color, f"Clock: {elapsed:.2f}s used, {clock.remaining[color]:.2f}s left")
 
+        if flag_fell:
+            # A player who runs out of time loses; the others are scored by remaining distance
+            winner, _ = adjudicator.adjudicate(excluded=[color])
+            game.ui.display_message(f"Player {color} has run out of time.")
+            logger.log_action("System", f"Flag fell for {color}, winner: {winner}")
+            if winner:
+                game.ui.display_winner(winner)
+            else:
+                game.ui.display_message("The game is a draw.")
+            game_over = True
         # Check win condition for each player after their turn
-        if game.game_logic.check_win_condition(current_player.color):
+        elif game.game_logic.check_win_condition(current_player.color):
             game.ui.display_winner(current_player.color)
             game_over = True  # End the game loop if a player wins
+        elif adjudicator.record_ply(current_player.color[0]):
+            # Stop games that repeat positions or make no progress, and score them by remaining distance
+            winner, distances = adjudicator.adjudicate()
+            game.ui.display_message(f"The game is stopped ({adjudicator.reason.replace('_', ' ')}). "
+                                    f"Remaining distances: {distances}")
+            logger.log_action("System", f"Game adjudicated ({adjudicator.reason}), winner: {winner}")
+            if winner:
+                game.ui.display_winner(winner)
+            else:
+                game.ui.display_message("The game is a draw.")
+            game_over = True
 
         # Move to the next player's turn
         current_player_index = (current_player_index + 1) % len(game.players)
@@ -159,18 +241,20 @@ def human_turn(game_logic, ui, player_color, logger, first=True):
             continue
 
 
-def computer_turn(game_logic, computer_player, logger):
+def computer_turn(game_logic, computer_player, logger, ui=None, time_left=None):
     """
        Handles the logic for a computer player's turn. Chooses and makes moves based on game logic.
-       Logs actions for auditing game history.
+       Logs actions for auditing game history. Messages go to the user interface, if given, and the time left on
+       the player's clock is passed to the engine.
        """
-    print("Computer Player's Turn (B):")
-    comp_move = computer_player.choose_move(game_logic, computer_player)
+    show = ui.display_message if ui is not None else print
+    show("Computer Player's Turn (B):")
+    comp_move = computer_player.choose_move(game_logic, computer_player, time_left)
     if comp_move:
         game_logic.make_move([(computer_player.color[0],) + comp_move])
         logger.log_action(computer_player.color, f"Moved from {comp_move[0]} to {comp_move[1]}")
     else:
-        print("Computer player cannot move.")
+        show("Computer player cannot move.")
 
 
 def parse_move(move_str):
@@ -191,4 +275,10 @@ def parse_move(move_str):
 
 
 if __name__ == "__main__":
-    play_game()
+    parser = argparse.ArgumentParser(description="Play Chinese Checkers in the console.")
+    parser.add_argument("--display", choices=RENDER_MODES, default="auto",
+                        help="How the board is shown; 'quiet' skips it, e.g. for scripted runs.")
+    parser.add_argument("--time-control", type=TimeControl.parse, default=None,
+                        help="Clock for every seat: '300' sudden death, '300+5' with increment, '10/move' per move.")
+    args = parser.parse_args()
+    play_game(args.display, args.time_control)
@@ -1,20 +1,39 @@
+import json
+import os
 import random
 
+from BoardGeometry import HEX_DIRECTIONS
+
+# Evaluation features, computed for one color. The default weights only count the distance to the goal.
+FEATURES = ["distance", "stragglers", "blocked", "jumps"]
+DEFAULT_WEIGHTS = {"distance": -1.0, "stragglers": 0.0, "blocked": 0.0, "jumps": 0.0}
+DEFAULT_WEIGHTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "weights")
+WEIGHTS_FILE_PATTERN = "weights_v{version:03d}.json"
+# A typical game takes 70 moves per player; engines plan for this many of their own moves still to come
+MOVES_TO_GO = 40
+_loaded_weights = {}
+
 
 class ComputerPlayer:
     """
         Represents an AI-controlled player that makes decisions based on the current state of the game board.
         """
+    __slots__ = ("color", "game_logic", "rng", "weights")
 
-    def __init__(self, color, game_logic):
+    def __init__(self, color, game_logic, rng=None, weights=None):
         """
             Initializes a new computer player with a specific color and a reference to the game's logic.
 
             :param color: The color assigned to the computer player.
             :param game_logic: A reference to the game logic for making decisions.
+            :param rng: An optional random.Random instance, for reproducible games.
+            :param weights: Feature weights for evaluating positions, by default DEFAULT_WEIGHTS. Tuned weights are
+                            loaded with load_weights.
                 """
         self.color = color
         self.game_logic = game_logic
+        self.rng = rng if rng is not None else random
+        self.weights = weights if weights is not None else DEFAULT_WEIGHTS
 
     def generate_possible_moves(self, game_logic, player):
         """
@@ -24,25 +43,174 @@ class ComputerPlayer:
                 :param player: The computer player for whom moves are being generated.
                 :return: A list of tuples representing possible moves (start_pos, end_pos).
                 """
-        optional_directions = [(0, -2), (1, -1), (1, 1), (0, 2), (-1, 1), (-1, -1)]
-        possible_moves = []
-        for row in range(17):
-            for col in range(25):
-                if game_logic.board[row][col] == player.color[0]:
-                    for direction in optional_directions:
-                        if game_logic.validate_move(player.color[0], (row, col),
-                                                    (row + direction[0], col + direction[1]), False):
-                            possible_moves.append(((row, col), (row + direction[0], col + direction[1])))
-                    for move in game_logic.can_jump_again(player.color[0], (row, col), None):
-                        possible_moves.append(move)
-        return possible_moves
-
-    def choose_move(self, game_logic, computer_player):
+        return game_logic.legal_moves(player.color[0])
+
+    def choose_move(self, game_logic, computer_player, time_left=None):
         """
             Chooses the best move from the generated list of possible moves.
             :param game_logic: The game logic to evaluate the moves.
             :param computer_player: The computer player making the decision.
+            :param time_left: Seconds left on the player's clock, or None without a time control. Engines that
+                              search should budget their time from it; see move_time_budget.
             :return: A tuple representing the chosen move (start_pos, end_pos), or None if no moves are possible.
                 """
         possible_moves = self.generate_possible_moves(game_logic, computer_player)
-        return random.choice(possible_moves) if possible_moves else None
+        return self.rng.choice(possible_moves) if possible_moves else None
+
+    def goal_position(self, game_logic, color):
+        """
+            Returns the tip of the triangle opposite to the given color's home, which its pieces race towards.
+                """
+        home = game_logic.get_player_positions()[color]
+        center_row, center_col = game_logic.max_rows // 2, game_logic.max_cols // 2
+        tip = max(home, key=lambda pos: hex_distance(pos, (center_row, center_col)))
+        return 2 * center_row - tip[0], 2 * center_col - tip[1]
+
+    def evaluate_position(self, game_logic, color, pieces=None):
+        """
+            Scores the position for the given color as the weighted sum of its evaluation features.
+                """
+        features = position_features(game_logic, color, self.goal_position(game_logic, color), pieces)
+        return sum(self.weights[name] * features[name] for name in FEATURES)
+
+    def score_moves(self, game_logic, player):
+        """
+            Scores every possible move by how much it improves the evaluation of the player's position.
+
+            :return: A list of (move, score) tuples in move generation order.
+                """
+        color = player.color[0]
+        board = game_logic.board
+        pieces = [(row, col) for row in range(game_logic.max_rows) for col in range(game_logic.max_cols)
+                  if board[row][col] == color]
+        before = self.evaluate_position(game_logic, color, pieces)
+        scored_moves = []
+        for start_pos, end_pos in self.generate_possible_moves(game_logic, player):
+            board[start_pos[0]][start_pos[1]], board[end_pos[0]][end_pos[1]] = 'E', color
+            moved_pieces = [end_pos if piece == start_pos else piece for piece in pieces]
+            scored_moves.append(((start_pos, end_pos),
+                                 self.evaluate_position(game_logic, color, moved_pieces) - before))
+            board[start_pos[0]][start_pos[1]], board[end_pos[0]][end_pos[1]] = color, 'E'
+        return scored_moves
+
+    def close(self):
+        """
+            Frees what the engine holds, such as worker processes or tables. Call it when the game is over; this
+            player holds nothing.
+                """
+
+
+class HeuristicComputerPlayer(ComputerPlayer):
+    """
+        A computer player that greedily picks the move that improves its evaluation the most, breaking ties at random.
+        """
+    __slots__ = ()
+
+    def choose_move(self, game_logic, computer_player, time_left=None):
+        """
+            Chooses the highest scoring move, or None if no moves are possible. A single greedy pass is far
+            quicker than any clock, so time_left is not needed.
+                """
+        scored_moves = self.score_moves(game_logic, computer_player)
+        if not scored_moves:
+            return None
+        best_score = max(score for _, score in scored_moves)
+        return self.rng.choice([move for move, score in scored_moves if score == best_score])
+
+
+def move_time_budget(time_left, moves_to_go=MOVES_TO_GO, reserve=0.05):
+    """
+        Splits the time left on a clock over the expected remaining moves, keeping a small reserve for overhead.
+        Returns None when there is no clock.
+        """
+    if time_left is None:
+        return None
+    return max(0.0, time_left * (1.0 - reserve) / moves_to_go)
+
+
+def hex_distance(start_pos, end_pos):
+    """
+        Returns the number of single steps between two board positions on the hexagonal grid.
+        """
+    rows = abs(end_pos[0] - start_pos[0])
+    cols = abs(end_pos[1] - start_pos[1])
+    return rows + max(0, (cols - rows) // 2)
+
+
+def position_features(game_logic, color, goal, pieces=None):
+    """
+        Computes the evaluation features of one color's pieces. The positions of the pieces can be passed in when
+        the caller already knows them.
+
+        :return: A dictionary with the total distance of the pieces to the goal, the distance of the piece furthest
+                 behind, the number of pieces whose forward steps are all occupied, and the number of forward jumps.
+        """
+    board = game_logic.board
+
+    def is_playable(row, col):
+        return 0 <= row < game_logic.max_rows and 0 <= col < game_logic.max_cols and board[row][col] not in (' ', None)
+
+    if pieces is None:
+        pieces = [(row, col) for row in range(game_logic.max_rows) for col in range(game_logic.max_cols)
+                  if board[row][col] == color]
+    features = {"distance": 0, "stragglers": 0, "blocked": 0, "jumps": 0}
+    for row, col in pieces:
+        distance = hex_distance((row, col), goal)
+        features["distance"] += distance
+        features["stragglers"] = max(features["stragglers"], distance)
+        has_forward_step = has_free_forward_step = False
+        for dr, dc in HEX_DIRECTIONS:
+            step_row, step_col = row + dr, col + dc
+            if is_playable(step_row, step_col) and hex_distance((step_row, step_col), goal) < distance:
+                has_forward_step = True
+                if board[step_row][step_col] == 'E':
+                    has_free_forward_step = True
+                jump_row, jump_col = row + 2 * dr, col + 2 * dc
+                if (is_playable(jump_row, jump_col) and board[step_row][step_col] != 'E'
+                        and board[jump_row][jump_col] == 'E'
+                        and hex_distance((jump_row, jump_col), goal) < distance):
+                    features["jumps"] += 1
+        if has_forward_step and not has_free_forward_step:
+            features["blocked"] += 1
+    return features
+
+
+def load_weights(directory=DEFAULT_WEIGHTS_DIR, version=None):
+    """
+        Loads evaluation weights from a versioned weights file. Loaded files are cached, so every player created
+        afterwards shares them. The version is always given by the caller, so saving newly tuned weights never
+        changes what an existing setup plays; see weight_versions for the versions available.
+
+        :param version: The version of the weights file, or None for DEFAULT_WEIGHTS.
+        :return: A dictionary of feature weights.
+        """
+    if version is None:
+        return DEFAULT_WEIGHTS
+    path = os.path.join(directory, WEIGHTS_FILE_PATTERN.format(version=version))
+    if path not in _loaded_weights:
+        with open(path) as weights_file:
+            _loaded_weights[path] = dict(DEFAULT_WEIGHTS, **json.load(weights_file)["weights"])
+    return _loaded_weights[path]
+
+
+def weight_versions(directory):
+    """
+        Returns the versions of the weights files in a directory, in increasing order.
+        """
+    if not os.path.isdir(directory):
+        return []
+    prefix, suffix = WEIGHTS_FILE_PATTERN.split("{")[0], ".json"
+    return sorted(int(name[len(prefix):-len(suffix)]) for name in os.listdir(directory)
+                  if name.startswith(prefix) and name.endswith(suffix) and name[len(prefix):-len(suffix)].isdigit())
+
+
+def lookahead_player(color, game_logic, rng=None, weights=None):
+    """
+        Creates a Search.LookaheadComputerPlayer with its default depth. Search builds on this module, so it is
+        imported on first use.
+        """
+    from Search import LookaheadComputerPlayer
+    return LookaheadComputerPlayer(color, game_logic, rng, weights)
+
+
+ENGINES = {"random": ComputerPlayer, "heuristic": HeuristicComputerPlayer, "lookahead": lookahead_player}
@@ -0,0 +1,191 @@
+import sys
+
+try:
+    import curses
+except ImportError:  # Not available on every platform, e.g. Windows without windows-curses
+    curses = None
+
+RENDER_MODES = ["auto", "curses", "plain", "quiet"]
+
+
+def cell_text(cell):
+    """
+        Returns the two characters shown for a board cell.
+        """
+    if cell is None:
+        return "   "  # Three spaces for positions outside the playable area
+    if cell == 'E':
+        return ". "  # Dot for empty positions
+    return f"{cell} "  # Pieces are shown by their player's color initial
+
+
+def format_board(board):
+    """
+        Formats the board as text: a header with the column numbers, then one line per row, prefixed by its number.
+        """
+    max_cols = len(board[0]) if board else 0
+    # Using modulo 10 to keep column numbers single digit, which keeps them aligned with the cells
+    lines = ["   " + "".join(f"{col % 10} " for col in range(max_cols))]
+    for row, cells in enumerate(board):
+        lines.append(f"{str(row).rjust(2)} " + "".join(cell_text(cell) for cell in cells))
+    return "\n".join(lines) + "\n"
+
+
+class PlainRenderer:
+    """
+        Prints the whole board as text after every change. Works on any output, including pipes and files.
+        """
+
+    def __init__(self, stream=None):
+        """
+            Initializes the renderer.
+
+            :param stream: The text stream to write to, sys.stdout by default.
+                """
+        self.stream = stream
+
+    def output(self):
+        """
+            Returns the stream to write to. sys.stdout is looked up on every call, so redirecting it works.
+                """
+        return self.stream if self.stream is not None else sys.stdout
+
+    def render(self, board):
+        """
+            Shows the board.
+                """
+        self.output().write(format_board(board) + "\n")
+
+    def message(self, text):
+        """
+            Shows a line of text, such as whose turn it is.
+                """
+        self.output().write(f"{text}\n")
+
+    def prompt(self, text):
+        """
+            Asks the user for a line of input.
+                """
+        return input(text)
+
+    def close(self):
+        """
+            Releases the terminal. Nothing to do for plain output.
+                """
+
+
+class QuietRenderer(PlainRenderer):
+    """
+        Skips drawing the board entirely, for scripted runs. Messages are still shown.
+        """
+
+    def render(self, board):
+        """
+            Does nothing.
+                """
+
+
+class CursesRenderer:
+    """
+        Draws the board in place with curses and, after the first frame, only rewrites the cells that changed.
+        Messages are shown on a status line below the board.
+        """
+
+    def __init__(self, screen=None):
+        """
+            Initializes the renderer.
+
+            :param screen: A curses window to draw on. If None, the terminal is taken over until close() is called.
+                """
+        self.owns_screen = screen is None
+        if self.owns_screen:
+            screen = curses.initscr()
+            curses.noecho()
+            curses.cbreak()
+        self.screen = screen
+        self.shown = None  # Copy of the board as it is currently on screen
+        self.cells_written = 0
+        self.last_message = None
+
+    def render(self, board):
+        """
+            Updates the screen to show the board, rewriting only the cells that differ from the previous frame.
+                """
+        if self.shown is None or len(self.shown) != len(board) or len(self.shown[0]) != len(board[0]):
+            self.screen.erase()
+            for line_number, line in enumerate(format_board(board).splitlines()):
+                self.screen.addstr(line_number, 0, line)
+            self.cells_written += sum(len(cells) for cells in board)
+        else:
+            for row, (cells, shown_cells) in enumerate(zip(board, self.shown)):
+                if cells == shown_cells:
+                    continue
+                for col, cell in enumerate(cells):
+                    if cell != shown_cells[col]:
+                        # Row 0 holds the column header, and each row starts with its number and a space
+                        self.screen.addstr(row + 1, 3 + 2 * col, cell_text(cell))
+                        self.cells_written += 1
+        self.shown = [cells[:] for cells in board]
+        self.screen.refresh()
+
+    def status_line(self):
+        """
+            Returns the screen line below the board used for messages.
+                """
+        return len(self.shown) + 2 if self.shown is not None else 0
+
+    def message(self, text):
+        """
+            Shows a line of text on the status line, replacing the previous message.
+                """
+        self.last_message = text
+        line = self.status_line()
+        self.screen.move(line, 0)
+        self.screen.clrtobot()
+        self.screen.addstr(line, 0, text)
+        self.screen.refresh()
+
+    def prompt(self, text):
+        """
+            Asks the user for a line of input on the status line.
+                """
+        self.message(text)
+        curses.echo()
+        try:
+            return self.screen.getstr().decode()
+        finally:
+            curses.noecho()
+
+    def close(self):
+        """
+            Gives the terminal back, if this renderer took it over, and prints the last message so it stays visible.
+                """
+        if self.owns_screen:
+            curses.nocbreak()
+            curses.echo()
+            curses.endwin()
+            self.owns_screen = False
+            if self.last_message is not None:
+                print(self.last_message)
+
+
+def create_renderer(mode="auto", stream=None):
+    """
+        Creates a renderer by mode name.
+
+        :param mode: 'curses', 'plain', 'quiet', or 'auto', which uses curses when the output is a terminal and
+                     curses can start, and plain output otherwise.
+        """
+    if mode == "quiet":
+        return QuietRenderer(stream)
+    if mode == "plain":
+        return PlainRenderer(stream)
+    if mode == "curses":
+        return CursesRenderer()
+    output = stream if stream is not None else sys.stdout
+    if curses is not None and output.isatty():
+        try:
+            return CursesRenderer()
+        except curses.error:
+            pass
+    return PlainRenderer(stream)
@@ -0,0 +1,251 @@
+import argparse
+import asyncio
+import json
+import socket
+import struct
+import time
+import zlib
+from collections import deque
+
+from BoardGeometry import STANDARD_SIZE
+from Simulation import SimulationRun, atomic_write_json, merge_aggregates, run_shard
+
+# Messages are zlib-compressed JSON, prefixed with their length as a 4-byte big-endian integer
+FRAME_HEADER = struct.Struct(">I")
+
+
+def encode_frame(message):
+    """
+        Encodes a message as a length-prefixed, compressed frame.
+        """
+    payload = zlib.compress(json.dumps(message).encode())
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+def decode_payload(payload):
+    """
+        Decodes the payload of a frame back into a message.
+        """
+    return json.loads(zlib.decompress(payload))
+
+
+async def read_frame(reader):
+    """
+        Reads one frame from an asyncio stream. Returns None when the peer has closed the connection.
+        """
+    try:
+        header = await reader.readexactly(FRAME_HEADER.size)
+        return decode_payload(await reader.readexactly(FRAME_HEADER.unpack(header)[0]))
+    except asyncio.IncompleteReadError:
+        return None
+
+
+def read_frame_blocking(stream):
+    """
+        Reads one frame from a blocking binary file object. Returns None when the peer has closed the connection.
+        """
+    header = stream.read(FRAME_HEADER.size)
+    if len(header) < FRAME_HEADER.size:
+        return None
+    payload = stream.read(FRAME_HEADER.unpack(header)[0])
+    return decode_payload(payload)
+
+
+class Coordinator:
+    """
+        Hands out the shards of a SimulationRun to workers over TCP and collects their results into the run's
+        checkpoint directory. Shards leased to a worker that disconnects, or that does not answer within the lease
+        timeout, are queued again, and duplicate results are ignored.
+        """
+
+    def __init__(self, run, lease_timeout=600.0, on_result=None):
+        """
+            Initializes the coordinator.
+
+            :param run: The SimulationRun to distribute. Shards it already finished are skipped.
+            :param lease_timeout: Seconds a worker may spend on a shard before it is handed to another worker.
+            :param on_result: Optional callback called as on_result(shard_result, aggregate) as results arrive.
+                """
+        self.run = run
+        self.lease_timeout = lease_timeout
+        self.on_result = on_result
+        self.pending = deque()
+        self.leases = {}  # Maps a leased shard to (writer, deadline)
+        self.finished = set()
+        self.aggregate = None
+        self.server = None
+        self.all_finished = None
+        self.connections = set()
+
+    async def start(self, host="127.0.0.1", port=0):
+        """
+            Prepares the run and starts listening for workers. Returns the bound (host, port).
+                """
+        self.run.prepare()
+        self.finished = set(self.run.finished_shards())
+        self.pending = deque(index for index in range(self.run.num_shards) if index not in self.finished)
+        self.aggregate = self.run.aggregate()
+        self.all_finished = asyncio.Event()
+        if not self.pending:
+            self.all_finished.set()
+        self.server = await asyncio.start_server(self.handle_worker, host, port)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def wait_finished(self):
+        """
+            Waits until every shard has a result, stops listening, and returns the final aggregate.
+                """
+        await self.all_finished.wait()
+        self.server.close()
+        # Connected workers are told the run is done on their next request; drop those that do not ask in time
+        if self.connections:
+            _, unfinished = await asyncio.wait(self.connections, timeout=5.0)
+            for task in unfinished:
+                task.cancel()
+        return self.aggregate
+
+    def expire_leases(self):
+        """
+            Queues again the shards whose lease has run out.
+                """
+        now = time.monotonic()
+        for shard, (_, deadline) in list(self.leases.items()):
+            if deadline < now:
+                del self.leases[shard]
+                self.pending.append(shard)
+
+    def next_message(self, writer):
+        """
+            Chooses the reply to a worker asking for work: a shard, a request to wait, or the end of the run.
+                """
+        self.expire_leases()
+        while self.pending:
+            shard = self.pending.popleft()
+            if shard in self.finished:
+                continue  # A late result arrived after the shard was queued again
+            self.leases[shard] = (writer, time.monotonic() + self.lease_timeout)
+            return {"type": "work", "config": self.run.config, "shard": shard}
+        if self.leases:
+            return {"type": "wait", "delay": 0.2}
+        return {"type": "done"}
+
+    def record_result(self, result):
+        """
+            Checkpoints a shard result and adds it to the aggregate, unless the shard already has a result.
+                """
+        shard = result["shard"]
+        self.leases.pop(shard, None)
+        if shard in self.finished:
+            return
+        atomic_write_json(self.run.shard_path(shard), result)
+        self.finished.add(shard)
+        merge_aggregates(self.aggregate, result)
+        self.aggregate["shards"] += 1
+        atomic_write_json(self.run.aggregate_path(), self.aggregate)
+        if self.on_result is not None:
+            self.on_result(result, self.aggregate)
+        if len(self.finished) == self.run.num_shards:
+            self.all_finished.set()
+
+    async def handle_worker(self, reader, writer):
+        """
+            Serves one worker connection until the run is finished or the worker goes away.
+                """
+        task = asyncio.current_task()
+        self.connections.add(task)
+        try:
+            while True:
+                message = await read_frame(reader)
+                if message is None:
+                    break
+                if message["type"] == "result":
+                    self.record_result(message["result"])
+                    continue
+                reply = self.next_message(writer)
+                writer.write(encode_frame(reply))
+                await writer.drain()
+                if reply["type"] == "done":
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            # Queue again whatever this worker was still working on
+            for shard, (owner, _) in list(self.leases.items()):
+                if owner is writer:
+                    del self.leases[shard]
+                    self.pending.appendleft(shard)
+            self.connections.discard(task)
+            writer.close()
+
+
+def run_worker(host, port, retry_seconds=5.0):
+    """
+        Connects to a coordinator and plays the shards it hands out until the run is finished.
+
+        :param retry_seconds: How long to keep retrying while the coordinator is not reachable yet.
+        :return: The number of shards this worker played.
+        """
+    deadline = time.monotonic() + retry_seconds
+    while True:
+        try:
+            connection = socket.create_connection((host, port))
+            break
+        except ConnectionRefusedError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+    played = 0
+    with connection, connection.makefile("rb") as stream:
+        while True:
+            connection.sendall(encode_frame({"type": "request"}))
+            message = read_frame_blocking(stream)
+            if message is None or message["type"] == "done":
+                return played
+            if message["type"] == "wait":
+                time.sleep(message["delay"])
+                continue
+            result = run_shard(message["config"], message["shard"])
+            connection.sendall(encode_frame({"type": "result", "result": result}))
+            played += 1
+
+
+async def coordinate(run, host="127.0.0.1", port=8766):
+    """
+        Runs a coordinator for the given run until every shard is finished, printing aggregates as they arrive.
+        """
+    coordinator = Coordinator(run, on_result=lambda result, aggregate: print(
+        f"Shard {result['shard']} finished: {aggregate['games']} games so far, wins {aggregate['wins']}"))
+    host, port = await coordinator.start(host, port)
+    print(f"Coordinator listening on {host}:{port}")
+    return await coordinator.wait_finished()
+
+
+def main():
+    """
+        Command line entry point: 'coordinate' runs the coordinator, 'work' runs one worker.
+        """
+    parser = argparse.ArgumentParser(description="Distribute self-play batches over several machines.")
+    parser.add_argument("mode", choices=["coordinate", "work"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--checkpoint-dir", default="simulation")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--shard-size", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--players", type=int, default=2)
+    parser.add_argument("--engine", default="heuristic")
+    parser.add_argument("--max-plies", type=int, default=400)
+    parser.add_argument("--size", type=int, default=STANDARD_SIZE)
+    parser.add_argument("--weights-version", type=int, default=None,
+                        help="Tuned weights the engines play with; every worker needs the same weights file.")
+    args = parser.parse_args()
+    if args.mode == "work":
+        print(f"Worker played {run_worker(args.host, args.port)} shards.")
+    else:
+        run = SimulationRun(args.checkpoint_dir, args.games, args.shard_size, args.seed, args.players, args.engine,
+                            args.max_plies, args.size, args.weights_version)
+        print(json.dumps(asyncio.run(coordinate(run, args.host, args.port)), sort_keys=True, indent=1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import argparse
+from functools import partial
+from multiprocessing import Pool
+
+import numpy as np
+
+from BoardGeometry import PLAYER_COLORS, STANDARD_SIZE, get_geometry
+from NpyStore import AppendableNpy
+from SelfPlay import play_self_play_game
+
+
+def position_dtype(num_holes=121):
+    """
+        Returns the record type of one training position: one plane per color over the holes, the index of the
+        color to move, and the outcome from the point of view of that color (1 win, -1 loss, 0 no winner).
+        """
+    return np.dtype([("planes", np.uint8, (len(PLAYER_COLORS), num_holes)),
+                     ("side", np.int8),
+                     ("outcome", np.int8)])
+
+
+def encode_board(board, positions):
+    """
+        Encodes a board as a (colors x holes) array of 0/1 planes over the given playable positions.
+        """
+    values = np.array([board[row][col] for row, col in positions])
+    return np.stack([values == color for color in PLAYER_COLORS]).astype(np.uint8)
+
+
+def encode_self_play_game(seed, num_players=2, engine="heuristic", max_plies=400, size=STANDARD_SIZE):
+    """
+        Plays one self-play game and returns every position before a move as an array of position_dtype records.
+        """
+    positions = get_geometry(size).positions
+    planes = []
+    sides = []
+
+    def record_position(game_logic, color, move):
+        planes.append(encode_board(game_logic.board, positions))
+        sides.append(PLAYER_COLORS.index(color))
+
+    record = play_self_play_game(num_players, engine, seed, max_plies, on_move=record_position, size=size)
+    encoded = np.zeros(len(planes), dtype=position_dtype(len(positions)))
+    if planes:
+        encoded["planes"] = planes
+        encoded["side"] = sides
+        if record.winner is not None:
+            winner = PLAYER_COLORS.index(record.winner)
+            encoded["outcome"] = np.where(encoded["side"] == winner, 1, -1)
+    return encoded
+
+
+def export_self_play(path, games, num_players=2, engine="heuristic", seed=0, max_plies=400, chunk_size=65536,
+                     processes=None, size=STANDARD_SIZE):
+    """
+        Plays self-play games in a process pool and appends their positions to an append-only .npy file.
+        Positions are buffered and written in chunks of about chunk_size records, so memory use does not grow with
+        the size of the dataset. Game i is played with seed + i, and an existing file is extended. The number of
+        holes per position follows from the board size.
+
+        :return: The number of positions in the file.
+        """
+    store = AppendableNpy(path, position_dtype(len(get_geometry(size).positions)))
+    buffered = []
+    buffered_rows = 0
+    with Pool(processes) as pool:
+        encode = partial(encode_self_play_game, num_players=num_players, engine=engine, max_plies=max_plies,
+                         size=size)
+        for encoded in pool.imap(encode, range(seed, seed + games)):
+            buffered.append(encoded)
+            buffered_rows += len(encoded)
+            if buffered_rows >= chunk_size:
+                store.append(np.concatenate(buffered))
+                buffered, buffered_rows = [], 0
+    if buffered:
+        store.append(np.concatenate(buffered))
+    return len(store)
+
+
+class PositionSampler:
+    """
+        Draws random minibatches from an exported dataset through a read-only memory map, without loading the file.
+        """
+
+    def __init__(self, path, seed=None):
+        """
+            Opens the dataset at the given path.
+                """
+        self.positions = np.load(path, mmap_mode="r")
+        self.rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def sample(self, batch_size):
+        """
+            Returns (planes, side, outcome) arrays for batch_size positions drawn without replacement.
+                """
+        indices = np.sort(self.rng.choice(len(self.positions), size=min(batch_size, len(self.positions)),
+                                          replace=False))
+        batch = self.positions[indices]
+        return batch["planes"], batch["side"], batch["outcome"]
+
+
+def main():
+    """
+        Command line entry point: exports self-play positions to a dataset file.
+        """
+    parser = argparse.ArgumentParser(description="Export self-play positions as a training dataset.")
+    parser.add_argument("path", help="The .npy file to create or extend.")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--players", type=int, default=2)
+    parser.add_argument("--engine", default="heuristic")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-plies", type=int, default=400)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--size", type=int, default=STANDARD_SIZE, help="Board size, 4 for the standard board.")
+    args = parser.parse_args()
+    rows = export_self_play(args.path, args.games, args.players, args.engine, args.seed, args.max_plies,
+                            processes=args.processes, size=args.size)
+    print(f"{args.path} now holds {rows} positions.")
+
+
+if __name__ == "__main__":
+    main()
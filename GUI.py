@@ -1,8 +1,13 @@
 from ChineseCheckers import *
 from copy import *
 import tkinter as tk
-from tkinter import simpledialog, messagebox
+from tkinter import simpledialog, messagebox, filedialog
 from GameLogic import GameLogic
+from Adjudication import GameAdjudicator
+from HintEngine import HintEngine, ReachabilityCache
+from GameClock import GameClock, TimeControl
+from BoardLayout import BACKGROUND_COLOR, BoardLayout, get_color
+from Animation import FramePacer, HopAnimation, SoundThrottle, interpolate, load_replay, turn_hops
 import pygame
 import os
 
@@ -23,12 +28,25 @@ class GUI:
         self.master.title("Chinese Checkers")
         self.canvas_width = 1000
         self.canvas_height = 750
-        self.canvas = tk.Canvas(self.master, width=self.canvas_width, height=self.canvas_height, bg='#E0F7FA')
+        self.canvas = tk.Canvas(self.master, width=self.canvas_width, height=self.canvas_height, bg=BACKGROUND_COLOR)
         self.canvas.pack()
         self.circle_ids_to_board_positions = {}  # Store mapping from circle IDs to board positions
         self.pass_button = tk.Button(self.master, text="Pass Turn", font=('Arial', 16),
                                      padx=20, pady=10, command=self.pass_turn)
         self.pass_button.pack_forget()
+        self.hint_button = tk.Button(self.master, text="Hint", font=('Arial', 16),
+                                     padx=20, pady=10, command=self.ask_for_hint)
+        self.hint_button.pack_forget()
+        self.hint_engine = HintEngine()
+        self.hint_future = None
+        self.hint_hash = None
+        self.reachability = None  # Destinations of the pieces, per position
+        self.board_positions_to_circle_ids = {}
+        self.highlighted_circles = []
+        self.current_color = None  # Color of the human player whose turn it is
+        self.continuation_jumps = None  # The jumps allowed while continuing a jump, or None on a new turn
+        self.clock = None  # GameClock of the current game, if it is played with a time control
+        self.time_up = False  # Set when the human player to move runs out of time
         self.waiting_for_move = False  # Indicates if we are waiting for the player to make a move
         self.move_start_pos = None  # Stores the start position of the move
         self.move_end_pos = None
@@ -44,6 +62,17 @@ class GUI:
         self.start_button = tk.Button(self.master, text="Start Game", font=('Arial', 16),
                                       padx=20, pady=10, command=self.start_game)
         self.start_button.pack()
+        self.replay_log_button = tk.Button(self.master, text="Replay Log", font=('Arial', 16),
+                                           padx=20, pady=10, command=self.replay_log_file)
+        self.replay_log_button.pack()
+        # Playback speed multiplier of move animations, for computer turns and replays
+        self.speed_scale = tk.Scale(self.master, from_=1, to=100, orient=tk.HORIZONTAL, length=300,
+                                    label="Animation speed (x)")
+        self.speed_scale.pack()
+        self.layout = None  # BoardLayout of the board on the canvas
+        self.animating = False
+        self.pending_hops = []  # Hops of the last turn, animated once the mover's clock is stopped
+        self.sound_throttle = SoundThrottle()
         self.selected_piece = None  # Track the currently selected piece, if any
         self.available_moves = []
         self.player_colors = ['R', 'B', 'G', 'Y', 'O', 'P']  # The order of colors as initialized in the game
@@ -95,14 +124,30 @@ class GUI:
             except ValueError as e:
                 print(f"Invalid input: {e}. Please try again.")
 
+        time_control = None
+        time_control_spec = simpledialog.askstring("Input", "Time control, e.g. 300, 300+5 or 10/move "
+                                                            "(leave empty to play without clocks):",
+                                                   parent=self.master)
+        if time_control_spec:
+            try:
+                time_control = TimeControl.parse(time_control_spec.strip())
+            except ValueError as e:
+                print(f"{e} Playing without clocks.")
+
         game = ChineseCheckers(num_humans, num_computers)
         game_over = False
         current_player_index = 0
         self.game_logic = GameLogic(total_players)
         self.ui = UserInterface(self.game_logic)
+        self.reachability = ReachabilityCache(self.game_logic)
+        colors = [player.color[0] for player in game.players]
+        adjudicator = GameAdjudicator(self.game_logic, colors)
+        self.clock = GameClock(time_control, colors) if time_control is not None else None
 
         while not game_over:
             current_player = game.players[current_player_index]
+            if self.clock is not None:
+                self.clock.start(current_player.color[0])
             if isinstance(current_player, Player):
                 # Human player's turn
                 self.human_turn(game.game_logic, game.ui, current_player.color, True)
@@ -110,14 +155,31 @@ class GUI:
                 # Computer player's turn
                 self.computer_turn( current_player)
 
+            flag_fell = False
+            if self.clock is not None:
+                _, flag_fell = self.clock.stop()
+            # Animate the turn only now, so the animation is not charged to the mover's clock
+            hops, self.pending_hops = self.pending_hops, []
+            self.animate_hops(hops)
+            if flag_fell:
+                # A player who runs out of time loses; the others are scored by remaining distance
+                winner, _ = adjudicator.adjudicate(excluded=[current_player.color[0]])
+                self.display_winner_on_canvas(winner if winner else "Draw")
+                game_over = True
             # Check win condition for each player after their turn
-            if self.game_logic.check_win_condition(current_player.color):
+            elif self.game_logic.check_win_condition(current_player.color):
                 self.display_winner_on_canvas(current_player.color)
                 game_over = True  # End the game loop if a player wins
                 self.win_sound.play()
+            elif adjudicator.record_ply(current_player.color[0]):
+                # Stop games that repeat positions or make no progress, and score them by remaining distance
+                winner, _ = adjudicator.adjudicate()
+                self.display_winner_on_canvas(winner if winner else "Draw")
+                game_over = True
 
             # Move to the next player's turn
             current_player_index = (current_player_index + 1) % len(game.players)
+        game.close()
 
     def on_canvas_click(self, event):
         """
@@ -151,13 +213,67 @@ class GUI:
 
                     if self.move_start_pos is None:
                         self.move_start_pos = pos
+                        self.highlight_destinations(pos)
                     else:
                         self.move_end_pos = pos
+                        self.clear_highlights()
                         self.waiting_for_move = False  # Indicate completion of move input
                         # Optionally, revert the appearance of the final selected circle here
                         self.canvas.itemconfig(self.selected_piece, outline='black', width=1)
                         self.selected_piece = None  # Reset the selection
 
+    def highlight_destinations(self, start_pos):
+        """
+            Highlights where the selected piece can go: single steps and jumps in green, and destinations at the
+            end of a jump chain in blue. While a jump is being continued, only the allowed further jumps are shown.
+                """
+        self.clear_highlights()
+        if self.continuation_jumps is not None:
+            destinations = {end_pos: [start, end_pos] for start, end_pos in self.continuation_jumps
+                            if start == start_pos}
+        else:
+            destinations = self.reachability.destinations(self.current_color, start_pos)
+        for destination, path in destinations.items():
+            circle_id = self.board_positions_to_circle_ids.get(destination)
+            if circle_id is not None:
+                self.canvas.itemconfig(circle_id, outline='#2E7D32' if len(path) == 2 else '#1565C0', width=3)
+                self.highlighted_circles.append(circle_id)
+
+    def clear_highlights(self):
+        """
+            Removes the destination and hint highlights.
+                """
+        for circle_id in self.highlighted_circles:
+            self.canvas.itemconfig(circle_id, outline='black', width=1)
+        self.highlighted_circles = []
+
+    def ask_for_hint(self):
+        """
+            Asks the hint engine for a move in the background, and shows it once it is ready.
+                """
+        if not self.waiting_for_move or self.game_logic is None:
+            return
+        self.hint_hash = self.game_logic.position_hash
+        self.hint_future = self.hint_engine.request_hint(self.game_logic, self.current_color)
+        self.master.after(50, self.show_hint)
+
+    def show_hint(self):
+        """
+            Highlights the hinted move when the hint engine is done, unless the position has changed meanwhile.
+                """
+        if not self.hint_future.done():
+            self.master.after(50, self.show_hint)
+            return
+        move = self.hint_future.result()
+        if move is None or not self.waiting_for_move or self.game_logic.position_hash != self.hint_hash:
+            return
+        self.clear_highlights()
+        for position in move:
+            circle_id = self.board_positions_to_circle_ids.get(position)
+            if circle_id is not None:
+                self.canvas.itemconfig(circle_id, outline='#FF6F00', width=4)
+                self.highlighted_circles.append(circle_id)
+
     def pass_turn(self):
         """
             Allows the player to pass their turn, useful in certain game situations.
@@ -181,24 +297,23 @@ class GUI:
 
         # Adjust these values as necessary based on your canvas size and desired layout
         board_width = self.canvas_width * 0.75
-        col_width = board_width / self.game_logic.max_cols
-        row_height = self.canvas_height / self.game_logic.max_rows
-        radius = min(col_width, row_height) / 1.4  # Adjust as needed for visual appeal
+        layout = BoardLayout(self.game_logic.max_rows, self.game_logic.max_cols, board_width, self.canvas_height)
+        self.layout = layout
         self.circle_ids_to_board_positions = {}  # Reset mapping for new board drawing
+        self.board_positions_to_circle_ids = {}
+        self.highlighted_circles = []
         # Draw the game board
         for row in range(self.game_logic.max_rows):
             for col in range(self.game_logic.max_cols):
                 piece = self.game_logic.board[row][col]
                 if piece != ' ':  # Assuming ' ' represents an empty space on the board
-                    x = col * col_width + col_width / 2
-                    y = row * row_height + row_height / 2
                     fill = self.get_color(piece)
                     # Draw the piece as a circle on the canvas
-                    self.canvas.create_oval(x - radius, y - radius, x + radius, y + radius, fill=fill, outline='black')
-                    circle_id = self.canvas.create_oval(x - radius, y - radius, x + radius, y + radius, fill=fill,
-                                                        outline='black')
+                    self.canvas.create_oval(*layout.bounds(row, col), fill=fill, outline='black')
+                    circle_id = self.canvas.create_oval(*layout.bounds(row, col), fill=fill, outline='black')
                     # Map the circle ID to its board position
                     self.circle_ids_to_board_positions[circle_id] = (row, col)
+                    self.board_positions_to_circle_ids[(row, col)] = circle_id
         self.canvas.bind("<Button-1>", self.on_canvas_click)
 
         # Draw the turn indicator on the right side
@@ -223,7 +338,16 @@ class GUI:
         self.draw_board()
         # Before entering the loop waiting for player input, show the pass button
         self.pass_button.pack(side=tk.BOTTOM, pady=10)  # Adjust positioning as needed
+        self.hint_button.pack(side=tk.BOTTOM, pady=10)
+        self.current_color = player_color
+        self.continuation_jumps = None
+        self.time_up = False
+        if self.clock is not None:
+            self.canvas.create_text(875.0, 300.0, text=f"{self.clock.time_left():.0f} s left",
+                                    font=self.stylish_font, fill=self.stylish_color)
         while True:
+            # Compute the destinations of all pieces now, so they show as soon as a piece is selected
+            self.reachability.precompute(player_color)
             if first:
                 self.canvas.create_text(875.0, 375.0,
                                         text=current_player_name + "'s Turn,\nChoose your \nmove: ",
@@ -249,8 +373,26 @@ class GUI:
                 self.master.update()
                 if self.pass_turn_bol:  # If pass button was clicked, exit the wait loop
                     break
+                if self.clock is not None and self.clock.flagged():
+                    self.time_up = True
+                    self.waiting_for_move = False
+                    break
+            if self.time_up:
+                self.clear_highlights()
+                break  # The player has run out of time, which ends the game
             start_pos = copy(self.move_start_pos)
             end_pos = self.move_end_pos
+            self.clear_highlights()
+
+            path = self.reachability.destinations(player_color, start_pos).get(end_pos) if first else None
+            if path is not None and len(path) > 2:
+                # A destination at the end of a jump chain: make all of its jumps at once, then show them hop by hop
+                hops = [(player_color, jump_start_pos, jump_end_pos) for jump_start_pos, jump_end_pos in
+                        zip(path, path[1:])]
+                for hop in hops:
+                    self.game_logic.make_move([hop])
+                self.pending_hops = hops
+                break
 
             if self.game_logic.validate_move(player_color, start_pos, end_pos, False):
                 distance_moved = max(abs(end_pos[0] - start_pos[0]), abs(end_pos[1] - start_pos[1]))
@@ -287,6 +429,7 @@ class GUI:
                         self.pass_button.place(x=self.canvas_width - 200,
                                                y=600)  # Adjust 'x' and 'y' as needed to place it upper right
                         first = False  # Indicate that we're still in the same turn for subsequent jumps
+                        self.continuation_jumps = additional_jumps_available
                         continue  # Continue in the loop to allow the player to make additional jumps
                 break  # Exit the loop if no jump was made or no additional jumps are possible
             else:
@@ -294,49 +437,143 @@ class GUI:
                 self.canvas.create_text(875.0, 450.0,
                                         text="Invalid move. \nTry again",
                                         font=self.stylish_font, fill=self.stylish_color)
+        self.hint_button.pack_forget()
+        self.continuation_jumps = None
 
     def computer_turn(self, computer_player):
         """
-            Simulates the computer player's turn, making moves based on the game logic.
+            Simulates the computer player's turn, making moves based on the game logic. The move and any further
+            jumps are made at once, and left in pending_hops to be animated after the turn.
                 """
+        self.draw_board()  # The animation starts from the position before the move
         self.canvas.create_text(875.0, 375.0, text=computer_player.color + "Computer \nPlayer's Turns",
                                 font=self.stylish_font, fill=self.stylish_color)
-        comp_move = computer_player.choose_move(self.game_logic, computer_player)
+        comp_move = computer_player.choose_move(self.game_logic, computer_player,
+                                                self.clock.time_left() if self.clock is not None else None)
         if comp_move:
             # Execute the chosen move
-            self.game_logic.make_move([(computer_player.color[0],) + comp_move])
-            self.move_sound.play()
-            self.master.update_idletasks()  # Force update of the GUI
-            self.draw_board()
-            self.master.update_idletasks()
+            color = computer_player.color[0]
+            hops = [(color,) + comp_move]
+            self.game_logic.make_move([hops[0]])
             # Unpack the chosen move to start and end positions
             start_pos, end_pos = comp_move
 
             # Check for possible jumps after the initial move
             distance_moved = max(abs(end_pos[0] - start_pos[0]), abs(end_pos[1] - start_pos[1]))
             if (end_pos[0] != start_pos[0] and distance_moved > 1) or end_pos[0] == start_pos[0] and distance_moved > 3:
-                possible_jumps = self.game_logic.can_jump_again(computer_player.color[0], end_pos, start_pos)
-                counter = 0
-                while possible_jumps:
-                    counter += 1
-                    # Choose a random jump from the possible jumps
-                    jump_move = random.choice(possible_jumps)
-                    # Unpack the start and end positions from the chosen jump move
-                    if counter < 5:  # max jumps
-                        jump_start_pos, jump_end_pos = jump_move
-                        # Execute the jump move
-                        self.game_logic.make_move([(computer_player.color[0],) + (jump_start_pos, jump_end_pos)])
-                        self.move_sound.play()
-                    else:
-                        break
+                possible_jumps = self.game_logic.can_jump_again(color, end_pos, start_pos)
+                while possible_jumps and len(hops) < 5:  # max jumps
+                    # Choose a random jump from the possible jumps and execute it
+                    jump_start_pos, jump_end_pos = random.choice(possible_jumps)
+                    hops.append((color, jump_start_pos, jump_end_pos))
+                    self.game_logic.make_move([hops[-1]])
                     # Update possible jumps for subsequent jumps
-                    possible_jumps = self.game_logic.can_jump_again(computer_player.color[0], jump_end_pos,
-                                                                    jump_start_pos)
+                    possible_jumps = self.game_logic.can_jump_again(color, jump_end_pos, jump_start_pos)
+            self.pending_hops = hops
         else:
             self.canvas.create_text(875.0, 375.0,
                                     text="Computer player\n cannot move.",
                                     font=self.stylish_font, fill=self.stylish_color)
 
+    def set_hole(self, position, cell):
+        """
+            Recolors one hole on the canvas, without redrawing the board.
+                """
+        circle_id = self.board_positions_to_circle_ids.get(position)
+        if circle_id is not None:
+            self.canvas.itemconfig(circle_id, fill=self.get_color(cell))
+
+    def animate_hops(self, hops):
+        """
+            Animates hops on the canvas, which must show the board before the first hop. Frames are scheduled with
+            after() at a fixed time budget, and the event loop keeps running until the animation is over. At high
+            speeds, hops that finish between two frames are shown finished without being drawn moving, and hop
+            sounds (the move sound for steps, the jump sound for jumps) are throttled.
+
+            :param hops: A list of (color, start_pos, end_pos) tuples, in the order they were played.
+                """
+        if not hops or self.layout is None:
+            return
+        animation = HopAnimation(hops, speed=self.speed_scale.get())
+        pacer = FramePacer()
+        finished = tk.BooleanVar(value=False)
+        radius = self.layout.radius
+        state = {"hops_done": 0, "moving": None, "sprite": None}
+
+        def frame():
+            hops_done, fraction = animation.progress(pacer.begin_frame())
+            newly_done = hops[state["hops_done"]:hops_done]
+            for color, start_pos, end_pos in newly_done:
+                self.set_hole(start_pos, 'E')
+                self.set_hole(end_pos, color)
+            if newly_done:
+                pacer.record_hops(len(newly_done), 1 if state["moving"] is not None else 0)
+                state["moving"] = None
+                if self.sound_throttle.ready():
+                    _, start_pos, end_pos = newly_done[-1]
+                    is_jump = self.game_logic.geometry.distance(start_pos, end_pos) > 1
+                    (self.jump_sound if is_jump else self.move_sound).play()
+            state["hops_done"] = hops_done
+
+            if hops_done < len(hops):
+                color, start_pos, end_pos = hops[hops_done]
+                if state["moving"] != hops_done:
+                    # A new hop starts: lift the piece out of its hole into a sprite
+                    state["moving"] = hops_done
+                    self.set_hole(start_pos, 'E')
+                    if state["sprite"] is None:
+                        state["sprite"] = self.canvas.create_oval(0, 0, 0, 0, outline='black')
+                    self.canvas.itemconfig(state["sprite"], fill=self.get_color(color))
+                x, y = interpolate(self.layout.center(*start_pos), self.layout.center(*end_pos), fraction)
+                self.canvas.coords(state["sprite"], x - radius, y - radius, x + radius, y + radius)
+                self.master.after(pacer.next_delay_ms(), frame)
+            else:
+                if state["sprite"] is not None:
+                    self.canvas.delete(state["sprite"])
+                finished.set(True)
+
+        # wait_variable runs a nested event loop, so keep the buttons that start a game loop from being clicked
+        self.animating = True
+        self.start_button.config(state=tk.DISABLED)
+        self.replay_log_button.config(state=tk.DISABLED)
+        pacer.start()
+        try:
+            frame()
+            self.master.wait_variable(finished)
+        finally:
+            self.animating = False
+            self.start_button.config(state=tk.NORMAL)
+            self.replay_log_button.config(state=tk.NORMAL)
+
+    def replay_log_file(self):
+        """
+            Replays a logged game on the board, animated at the chosen speed.
+                """
+        if self.waiting_for_move or self.animating:
+            return  # Not while a game is waiting for a move or something else is animated
+        log_file_path = filedialog.askopenfilename(parent=self.master, title="Replay a game log",
+                                                   filetypes=[("Game logs", "*.txt"), ("All files", "*")])
+        if not log_file_path:
+            return
+        replay = load_replay(log_file_path)
+        if replay is None:
+            messagebox.showerror("Replay", "This file is not a readable game log.", parent=self.master)
+            return
+        num_players, moves = replay
+        self.game_logic = GameLogic(num_players)
+        self.draw_board()
+        turns = turn_hops(moves)
+        status = self.canvas.create_text(875.0, 375.0, font=self.stylish_font, fill=self.stylish_color)
+        for turn_number, hops in enumerate(turns, start=1):
+            # One turn at a time, so the status follows the replay and a jump chain plays as one move
+            self.canvas.itemconfig(status, text=f"Replaying\nturn {turn_number} of {len(turns)}")
+            self.animate_hops(hops)
+            for hop in hops:
+                self.game_logic.make_move([hop])
+        self.draw_board()
+        self.canvas.create_text(875.0, 375.0, text="Replay\nfinished", font=self.stylish_font,
+                                fill=self.stylish_color)
+
     def display_winner_on_canvas(self, winner_color):
         """
             Displays the winner on the canvas once the game is concluded.
@@ -349,16 +586,7 @@ class GUI:
         """
             Maps cell values to specific colors for drawing the board.
                 """
-        colors = {
-            'R': '#E57373',  # Red
-            'B': '#64B5F6',  # Blue
-            'G': '#81C784',  # Green
-            'Y': '#FFF176',  # Yellow
-            'O': '#FFB74D',  # Orange
-            'P': '#BA68C8',  # Purple
-            'E': 'white'  # Empty but playable spot
-        }
-        return colors.get(cell, 'white')  # Default to white for empty/unrecognized cells
+        return get_color(cell)  # The palette is shared with the offscreen renderer
 
 
 def main():
@@ -0,0 +1,114 @@
+import time
+
+TIME_CONTROL_MODES = ["sudden_death", "increment", "per_move"]
+
+
+class TimeControl:
+    """
+        The time rules of a game: a single time bank per player (sudden death), a bank that grows by a fixed
+        increment after every move (increment), or a fixed time for every move that does not carry over (per_move).
+        """
+
+    def __init__(self, mode, seconds, increment=0.0):
+        """
+            Initializes the time control.
+
+            :param mode: One of TIME_CONTROL_MODES.
+            :param seconds: The initial time bank, or the time for each move in per_move mode.
+            :param increment: Seconds added after each move in increment mode.
+                """
+        if mode not in TIME_CONTROL_MODES:
+            raise ValueError(f"Unknown time control mode {mode!r}.")
+        if seconds <= 0 or increment < 0:
+            raise ValueError("Time control seconds must be positive and the increment not negative.")
+        self.mode = mode
+        self.seconds = seconds
+        self.increment = increment if mode == "increment" else 0.0
+
+    @staticmethod
+    def parse(spec):
+        """
+            Parses a time control: '300' is 300 seconds sudden death, '300+5' adds 5 seconds per move, and
+            '10/move' gives 10 seconds for every move.
+                """
+        try:
+            if spec.endswith("/move"):
+                return TimeControl("per_move", float(spec[:-len("/move")]))
+            if "+" in spec:
+                seconds, increment = spec.split("+")
+                return TimeControl("increment", float(seconds), float(increment))
+            return TimeControl("sudden_death", float(spec))
+        except ValueError:
+            raise ValueError(f"Invalid time control {spec!r}, expected e.g. '300', '300+5' or '10/move'.")
+
+    def __str__(self):
+        if self.mode == "per_move":
+            return f"{self.seconds:g}/move"
+        if self.mode == "increment":
+            return f"{self.seconds:g}+{self.increment:g}"
+        return f"{self.seconds:g}"
+
+
+class GameClock:
+    """
+        Keeps the time of every seat. The game loop starts the clock of the player to move and stops it after the
+        turn; a player whose time runs out has lost on time ('flag fall').
+        """
+
+    def __init__(self, time_control, colors, timer=time.monotonic):
+        """
+            Initializes the clock with a full time bank for every color.
+
+            :param timer: A function returning the current time in seconds, replaceable for tests.
+                """
+        self.time_control = time_control
+        self.timer = timer
+        self.remaining = {color: float(time_control.seconds) for color in colors}
+        self.running = None  # Color whose clock is running
+        self.started = None
+
+    def start(self, color):
+        """
+            Starts the clock of the player to move. In per_move mode, the player gets a fresh move time.
+                """
+        if self.time_control.mode == "per_move":
+            self.remaining[color] = float(self.time_control.seconds)
+        self.running = color
+        self.started = self.timer()
+
+    def elapsed(self):
+        """
+            Returns how long the running clock has been running.
+                """
+        return self.timer() - self.started if self.running is not None else 0.0
+
+    def time_left(self, color=None):
+        """
+            Returns the seconds a player has left, counting the running turn, by default for the player to move.
+                """
+        color = color if color is not None else self.running
+        if color == self.running:
+            return max(0.0, self.remaining[color] - self.elapsed())
+        return self.remaining[color]
+
+    def flagged(self, color=None):
+        """
+            Checks if a player's time has run out, by default the player to move.
+                """
+        return self.time_left(color) <= 0.0
+
+    def stop(self):
+        """
+            Stops the running clock, charges the turn to its player and adds the increment if the player is still
+            in time.
+
+            :return: A tuple (elapsed seconds, flag fell).
+                """
+        color, elapsed = self.running, self.elapsed()
+        self.remaining[color] = max(0.0, self.remaining[color] - elapsed)
+        flag_fell = self.remaining[color] <= 0.0
+        if not flag_fell:
+            self.remaining[color] += self.time_control.increment
+        self.running = None
+        self.started = None
+        return elapsed, flag_fell
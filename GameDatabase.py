@@ -0,0 +1,315 @@
+import argparse
+import os
+import sqlite3
+from multiprocessing import Pool
+
+from Adjudication import remaining_distance
+from Analysis import find_log_files
+from BoardGeometry import PLAYER_COLORS
+from GameLogic import GameLogic
+from Logging import Logging
+
+# The leader of every game is stored after every CHECKPOINT_INTERVAL moves
+CHECKPOINT_INTERVAL = 10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    source TEXT UNIQUE NOT NULL,
+    started TEXT,
+    num_players INTEGER NOT NULL,
+    num_humans INTEGER NOT NULL,
+    time_control TEXT,
+    winner TEXT,
+    termination TEXT NOT NULL,
+    plies INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS seats (
+    game_id INTEGER NOT NULL REFERENCES games(id),
+    color TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    result TEXT,
+    PRIMARY KEY (game_id, color)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS checkpoints (
+    game_id INTEGER NOT NULL REFERENCES games(id),
+    ply INTEGER NOT NULL,
+    leader TEXT,
+    PRIMARY KEY (game_id, ply)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS positions (
+    position_hash INTEGER NOT NULL,
+    game_id INTEGER NOT NULL REFERENCES games(id),
+    ply INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_winner ON games (winner);
+CREATE INDEX IF NOT EXISTS games_plies ON games (plies);
+CREATE INDEX IF NOT EXISTS games_termination ON games (termination);
+CREATE INDEX IF NOT EXISTS seats_color_result ON seats (color, result, game_id);
+CREATE INDEX IF NOT EXISTS checkpoints_ply_leader ON checkpoints (ply, leader, game_id);
+CREATE INDEX IF NOT EXISTS positions_hash ON positions (position_hash);
+"""
+
+
+def signed_hash(position_hash):
+    """
+        Converts an unsigned 64-bit position hash to the signed range SQLite integers can hold.
+        """
+    return position_hash - (1 << 64) if position_hash >= 1 << 63 else position_hash
+
+
+def leader(game_logic, colors):
+    """
+        Returns the color with the smallest remaining distance, or None if several colors share it.
+        """
+    distances = {color: remaining_distance(game_logic, color) for color in colors}
+    best = min(distances.values())
+    leaders = [color for color, distance in distances.items() if distance == best]
+    return leaders[0] if len(leaders) == 1 else None
+
+
+def summarize_log(log_file_path):
+    """
+        Replays one game log written by Logging and summarizes it for the database. A game counts as won when a
+        player finishes during the replay; otherwise the outcome logged by the game loop, if any, is used.
+
+        :return: A dictionary with the game's fields, seats, leaders at every checkpoint and position hashes, or None
+                 if the file is not a readable game log.
+        """
+    logger = Logging(log_file_path)
+    actions = logger.load_game()
+    players = logger.log_start_board(actions) if actions else None
+    if players is None or not 2 <= sum(players) <= 6:
+        return None
+    num_humans, num_computers = players
+    colors = PLAYER_COLORS[:num_humans + num_computers]
+    game_logic = GameLogic(len(colors))
+    winner, termination = None, "unfinished"
+    checkpoints = []
+    hashes = [game_logic.position_hash]
+    moves = logger.parse_log_file()
+    for ply, (color, start_pos, end_pos) in enumerate(moves, start=1):
+        if start_pos is None or end_pos is None or not game_logic.make_move([(color, start_pos, end_pos)]):
+            break
+        hashes.append(game_logic.position_hash)
+        if ply % CHECKPOINT_INTERVAL == 0:
+            checkpoints.append((ply, leader(game_logic, colors)))
+        if game_logic.check_win_condition(color):
+            winner, termination = color, "win"
+            break
+    if termination == "unfinished":
+        for line in actions:
+            if "Game adjudicated (" in line:
+                termination = line.split("Game adjudicated (")[1].split(")")[0]
+            elif "Flag fell for " in line:
+                termination = "time"
+            else:
+                continue
+            logged_winner = line.rsplit("winner: ", 1)[1].strip()
+            winner = logged_winner if logged_winner in colors else None
+    if termination == "unfinished":
+        results = [None] * len(colors)
+    else:
+        results = ["draw" if winner is None else "win" if color == winner else "loss" for color in colors]
+    return {"source": os.path.abspath(log_file_path),
+            "started": next((line[:19] for line in actions if line[:4].isdigit()), None),
+            "num_players": len(colors),
+            "num_humans": num_humans,
+            "time_control": logger.log_time_control(actions),
+            "winner": winner,
+            "termination": termination,
+            "plies": len(hashes) - 1,
+            "seats": [(color, "human" if i < num_humans else "computer", result)
+                      for i, (color, result) in enumerate(zip(colors, results))],
+            "checkpoints": checkpoints,
+            "hashes": hashes}
+
+
+class GameDatabase:
+    """
+        An indexed SQLite database of played games, filled from game logs, with queries over seats, outcomes,
+        game lengths, leaders during the game and positions reached.
+        """
+
+    def __init__(self, path):
+        """
+            Opens or creates the database.
+
+            :param path: The database file, or ':memory:'.
+                """
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        """
+            Closes the database.
+                """
+        self.connection.close()
+
+    def insert_games(self, summaries, store_positions=True):
+        """
+            Inserts game summaries from summarize_log in one transaction. Games whose source is already in the
+            database are skipped, so logs can be ingested again safely.
+
+            :param store_positions: Also store the hash of every position, for games_with_position.
+            :return: The number of games inserted.
+                """
+        inserted = 0
+        with self.connection:
+            cursor = self.connection.cursor()
+            for summary in summaries:
+                cursor.execute("INSERT OR IGNORE INTO games (source, started, num_players, num_humans, time_control, "
+                               "winner, termination, plies) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                               (summary["source"], summary["started"], summary["num_players"],
+                                summary["num_humans"], summary["time_control"], summary["winner"],
+                                summary["termination"], summary["plies"]))
+                if cursor.rowcount == 0:
+                    continue
+                game_id = cursor.lastrowid
+                cursor.executemany("INSERT INTO seats VALUES (?, ?, ?, ?)",
+                                   [(game_id,) + seat for seat in summary["seats"]])
+                cursor.executemany("INSERT INTO checkpoints VALUES (?, ?, ?)",
+                                   [(game_id, ply, leading) for ply, leading in summary["checkpoints"]])
+                if store_positions:
+                    cursor.executemany("INSERT INTO positions VALUES (?, ?, ?)",
+                                       [(signed_hash(position_hash), game_id, ply)
+                                        for ply, position_hash in enumerate(summary["hashes"])])
+                inserted += 1
+        return inserted
+
+    def ingest_logs(self, paths, processes=None, batch_size=500, store_positions=True):
+        """
+            Replays game logs in a process pool and loads them into the database, one transaction per batch.
+
+            :param paths: Log files and directories of log files.
+            :return: The number of games inserted.
+                """
+        inserted = 0
+        batch = []
+        with Pool(processes) as pool:
+            for summary in pool.imap(summarize_log, find_log_files(paths), chunksize=16):
+                if summary is not None:
+                    batch.append(summary)
+                if len(batch) >= batch_size:
+                    inserted += self.insert_games(batch, store_positions)
+                    batch = []
+        return inserted + self.insert_games(batch, store_positions)
+
+    def query(self, sql, parameters=()):
+        """
+            Runs a query and returns its rows as dictionaries.
+                """
+        cursor = self.connection.execute(sql, parameters)
+        names = [description[0] for description in cursor.description]
+        return [dict(zip(names, row)) for row in cursor]
+
+    def count_games(self):
+        """
+            Returns the number of games in the database.
+                """
+        return self.connection.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+    def find_games(self, color=None, result=None, kind=None, winner=None, termination=None, min_plies=None,
+                   max_plies=None, limit=None):
+        """
+            Finds games by seat, outcome and length. All given conditions must hold.
+
+            :param color: Only games with a seat of this color; result and kind then apply to that seat.
+            :param result: 'win', 'loss' or 'draw' of the color's seat.
+            :param kind: 'human' or 'computer' for the color's seat.
+            :return: A list of game rows as dictionaries, in insertion order.
+            :raises ValueError: If result or kind is given without a color.
+                """
+        if color is None and (result is not None or kind is not None):
+            raise ValueError("result and kind apply to the seat of a color, so a color must be given.")
+        joins, conditions, parameters = "", [], []
+        if color is not None:
+            joins = " JOIN seats ON seats.game_id = games.id"
+            conditions.append("seats.color = ?")
+            parameters.append(color)
+            for column, value in (("result", result), ("kind", kind)):
+                if value is not None:
+                    conditions.append(f"seats.{column} = ?")
+                    parameters.append(value)
+        for condition, value in (("games.winner = ?", winner), ("games.termination = ?", termination),
+                                 ("games.plies >= ?", min_plies), ("games.plies <= ?", max_plies)):
+            if value is not None:
+                conditions.append(condition)
+                parameters.append(value)
+        sql = "SELECT games.* FROM games" + joins
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY seats.game_id" if color is not None else " ORDER BY games.id"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return self.query(sql, parameters)
+
+    def games_lost_after_leading(self, color, ply, limit=None, count=False):
+        """
+            Finds the games the color lost although it was the only leader after the given move.
+
+            :param ply: The move number, a multiple of CHECKPOINT_INTERVAL.
+            :param count: Return only the number of such games, which is much quicker than fetching them all.
+                """
+        if ply <= 0 or ply % CHECKPOINT_INTERVAL:
+            raise ValueError(f"Leaders are stored every {CHECKPOINT_INTERVAL} moves, not after move {ply}.")
+        # Ordering by the checkpoint's game id follows the index, so no sort is needed and LIMIT stops early
+        sql = (" FROM checkpoints"
+               " JOIN seats ON seats.game_id = checkpoints.game_id AND seats.color = checkpoints.leader"
+               " JOIN games ON games.id = checkpoints.game_id"
+               " WHERE checkpoints.ply = ? AND checkpoints.leader = ? AND seats.result = 'loss'")
+        if count:
+            return self.connection.execute("SELECT COUNT(*)" + sql, (ply, color)).fetchone()[0]
+        sql = "SELECT games.*" + sql + " ORDER BY checkpoints.game_id"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return self.query(sql, (ply, color))
+
+    def games_with_position(self, position_hash):
+        """
+            Finds the games that reached a position, with the first move number at which they reached it.
+                """
+        return self.query("SELECT games.*, MIN(positions.ply) AS ply FROM positions"
+                          " JOIN games ON games.id = positions.game_id"
+                          " WHERE positions.position_hash = ? GROUP BY games.id ORDER BY games.id",
+                          (signed_hash(position_hash),))
+
+    def win_rates(self):
+        """
+            Returns the share of finished games won by each color, as a dictionary.
+                """
+        rows = self.connection.execute("SELECT color, AVG(result = 'win') FROM seats WHERE result IS NOT NULL"
+                                       " GROUP BY color ORDER BY color")
+        return dict(rows.fetchall())
+
+
+def main():
+    """
+        Command line entry point: ingests game logs into a database, or queries it.
+        """
+    parser = argparse.ArgumentParser(description="Load game logs into an indexed database and query it.")
+    parser.add_argument("database", help="The SQLite database file.")
+    parser.add_argument("--ingest", nargs="*", default=[], help="Log files or directories to load.")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--no-positions", action="store_true", help="Do not store position hashes.")
+    parser.add_argument("--lost-after-leading", nargs=2, metavar=("COLOR", "MOVE"),
+                        help="List the games COLOR lost after leading at move MOVE.")
+    args = parser.parse_args()
+    database = GameDatabase(args.database)
+    try:
+        if args.ingest:
+            inserted = database.ingest_logs(args.ingest, args.processes, store_positions=not args.no_positions)
+            print(f"Inserted {inserted} games; the database holds {database.count_games()} games.")
+        if args.lost_after_leading:
+            color, ply = args.lost_after_leading
+            for game in database.games_lost_after_leading(color, int(ply)):
+                print(f"{game['source']}: winner {game['winner']} after {game['plies']} moves ({game['termination']})")
+        print(f"Win rates: {database.win_rates()}")
+    finally:
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,25 @@
+from BoardGeometry import get_geometry, COLOR_INDEX, STANDARD_SIZE
+from Moves import pack_move, move_color, move_start, move_end
+
+
 class GameLogic:
     """
        Manages the logic for a Chinese Checkers game. This includes initializing the game board,
        handling player moves, and checking for win conditions.
        """
 
-    def __init__(self, num_players):
+    def __init__(self, num_players, size=STANDARD_SIZE):
         """
             Initializes the game with a specified number of players. Sets up the board based on the number of players.
+            The board size is the number of rows of each star point; the standard board has size 4.
                 """
         assert num_players in [2, 3, 4, 5, 6], "Number of players must be 2, 3, 4, or 6."
         self.num_players = num_players
-        self.max_rows = 17
-        self.max_cols = 25
+        self.geometry = get_geometry(size)
+        self.max_rows = self.geometry.max_rows
+        self.max_cols = self.geometry.max_cols
         self.board = self.initialize_board()
+        self.position_hash = self.compute_hash()
 
     def initialize_board(self):
         """
@@ -43,38 +50,31 @@ class GameLogic:
             Defines the initial positions for each player's pieces on the board.
             Returns a dictionary with colors as keys and a list of tuples representing positions.
                 """
-        return {
-            'R': [(0, 12), (1, 11), (1, 13), (2, 10), (2, 12),  # Red's triangle
-                  (2, 14), (3, 9), (3, 11), (3, 13), (3, 15)],
-            'B': [(16, 12), (15, 11), (15, 13), (14, 10), (14, 12), (14, 14),  # Blue's triangle
-                  (13, 9), (13, 11), (13, 13), (13, 15)],
-            'G': [(7, 3), (6, 4), (6, 2), (5, 5), (5, 3),  # Green's triangle
-                  (5, 1), (4, 6), (4, 4), (4, 2), (4, 0)],
-            'Y': [(9, 21), (10, 22), (10, 20), (11, 23), (11, 21),  # Yellow's triangle,
-                  (11, 19), (12, 24), (12, 22), (12, 20), (12, 18)],
-            'O': [(7, 21), (6, 22), (6, 20), (5, 23), (5, 21),  # Orange's triangle
-                  (5, 19), (4, 24), (4, 22), (4, 20), (4, 18)],
-            'P': [(9, 3), (10, 4), (10, 2), (11, 5), (11, 3),  # Purple's triangle
-                  (11, 1), (12, 6), (12, 4), (12, 2), (12, 0)],
-        }
+        return {color: list(home) for color, home in self.geometry.homes.items()}
 
     def is_playable_area(self, row, col):
         """
                Checks if a given position is within a playable area of the board.
                """
-        if row % 2 != col % 2:
-            return False
-        else:
-            if row < 4:
-                return (col >= 12 - row and col <= 12 + row)
-            elif row == 4 or row == 12:
-                return True
-            elif 4 < row < 9:
-                return row - 4 <= col < self.max_cols - (row - 4)
-            elif 8 < row < 13:
-                return self.max_cols - (row + 13) <= col <= row + 12
-            elif 12 < row:
-                return (col >= row - 4 and col <= 28 - row)
+        return self.geometry.is_playable(row, col)
+
+    def compute_hash(self):
+        """
+            Computes the Zobrist hash of the pieces on the board from scratch. make_move keeps position_hash up to
+            date incrementally; call this again after editing the board directly.
+                """
+        position_hash = 0
+        for i, (row, col) in enumerate(self.geometry.positions):
+            color = COLOR_INDEX.get(self.board[row][col])
+            if color is not None:
+                position_hash ^= self.geometry.zobrist[i][color]
+        return position_hash
+
+    def playable_positions(self):
+        """
+            Returns all playable positions of the board in row-major order.
+                """
+        return list(self.geometry.positions)
 
     def is_within_board(self, position):
         """
@@ -86,7 +86,8 @@ class GameLogic:
     def validate_move(self, player, start_pos, end_pos, comment=True):
         """
         Validates whether a move from start_pos to end_pos is legal for the specified player.
-        This includes checking for simple moves and jumps.
+        This includes checking for simple moves and jumps. Explains why a move is illegal, for user input;
+        engines should call is_legal_move instead.
         """
         try:
             # Input type validation
@@ -100,21 +101,8 @@ class GameLogic:
                 raise ValueError("The starting position does not contain the player's piece.")
             if self.board[end_pos[0]][end_pos[1]] != 'E':
                 raise ValueError("The ending position is not empty.")
-            # Hexagonal directions for movement and jumps
-            directions = [(0, -2), (1, -1), (1, 1), (0, 2), (-1, 1), (-1, -1)]
-            if (end_pos[0] - start_pos[0], end_pos[1] - start_pos[1]) in directions:
-                return True
-            # Check for jump moves
-            for dx, dy in directions:
-                mid_pos = (start_pos[0] + dx, start_pos[1] + dy)
-                jump_pos = (start_pos[0] + 2 * dx, start_pos[1] + 2 * dy)
-
-                if jump_pos == end_pos and self.is_within_board(mid_pos) and self.board[mid_pos[0]][mid_pos[1]] not in [
-                    None, 'E']:
-                    # Valid jump over another piece to an empty space
-                    return True
-            # If none of the conditions are met, the move is illegal
-            return False
+            # If the move is neither a step nor a jump over a piece, it is illegal
+            return self.is_legal_move(player, start_pos, end_pos)
 
         except (TypeError, ValueError) as e:
             if player != 'B':
@@ -122,6 +110,100 @@ class GameLogic:
                     print(f"Error validating move: {e}")
             return False
 
+    def is_legal_move(self, player, start_pos, end_pos):
+        """
+            Checks whether a single step or jump from start_pos to end_pos is legal for the player, using the
+            precomputed board tables. Never raises or prints for illegal moves; positions must be tuples.
+                """
+        start = self.geometry.index.get(start_pos)
+        end = self.geometry.index.get(end_pos)
+        if start is None or end is None:
+            return False
+        board = self.board
+        if board[start_pos[0]][start_pos[1]] != player or board[end_pos[0]][end_pos[1]] != 'E':
+            return False
+        if end in self.geometry.steps[start]:
+            return True
+        over = self.geometry.jump_over.get((start, end))
+        if over is None:
+            return False
+        over_row, over_col = self.geometry.positions[over]
+        return board[over_row][over_col] != 'E'
+
+    def validate_moves(self, player, moves):
+        """
+            Checks a batch of candidate (start_pos, end_pos) moves for the player in one call.
+            Returns a list of booleans in the order of the moves.
+                """
+        is_legal_move = self.is_legal_move
+        return [is_legal_move(player, start_pos, end_pos) for start_pos, end_pos in moves]
+
+    def legal_moves(self, player):
+        """
+            Lists every legal single step and single jump of the player's pieces as (start_pos, end_pos) tuples,
+            steps of a piece before its jumps.
+                """
+        positions = self.geometry.positions
+        return [(positions[move_start(move)], positions[move_end(move)]) for move in self.legal_move_codes(player)]
+
+    def legal_move_codes(self, player):
+        """
+            Lists the same moves as legal_moves, packed into ints (see Moves), without allocating any tuples.
+                """
+        geometry = self.geometry
+        positions = geometry.positions
+        board = self.board
+        color_index = COLOR_INDEX[player]
+        moves = []
+        for start, (row, col) in enumerate(positions):
+            if board[row][col] != player:
+                continue
+            neighbors = geometry.neighbors[start]
+            for over in neighbors:
+                if over is not None and board[positions[over][0]][positions[over][1]] == 'E':
+                    moves.append(pack_move(color_index, start, over))
+            for over, to in zip(neighbors, geometry.jumps[start]):
+                if (to is not None and board[positions[to][0]][positions[to][1]] == 'E'
+                        and board[positions[over][0]][positions[over][1]] != 'E'):
+                    moves.append(pack_move(color_index, start, to))
+        return moves
+
+    def reachable_destinations(self, player, start_pos):
+        """
+            Finds every destination of the piece at start_pos in one turn: its single steps, and every hole it can
+            reach through a chain of jumps, found breadth first so each chain is as short as possible.
+
+            :return: A dictionary mapping each destination to its path, the list of positions from start_pos to
+                     the destination.
+                """
+        geometry = self.geometry
+        positions = geometry.positions
+        board = self.board
+        start = geometry.index.get(start_pos)
+        if start is None or board[start_pos[0]][start_pos[1]] != player:
+            return {}
+        destinations = {}
+        for step in geometry.steps[start]:
+            row, col = positions[step]
+            if board[row][col] == 'E':
+                destinations[(row, col)] = [start_pos, (row, col)]
+        # The moving piece leaves its start hole, so it can neither jump over it nor land on it again
+        paths = {start: [start_pos]}
+        frontier = [start]
+        while frontier:
+            next_frontier = []
+            for hole in frontier:
+                for over, to in zip(geometry.neighbors[hole], geometry.jumps[hole]):
+                    if to is None or to in paths or over == start:
+                        continue
+                    (over_row, over_col), (to_row, to_col) = positions[over], positions[to]
+                    if board[over_row][over_col] != 'E' and board[to_row][to_col] == 'E':
+                        paths[to] = paths[hole] + [(to_row, to_col)]
+                        destinations[(to_row, to_col)] = paths[to]
+                        next_frontier.append(to)
+            frontier = next_frontier
+        return destinations
+
     def make_move(self, move_sequence):
         """
                Executes a sequence of moves on the board, updating the board state accordingly.
@@ -149,6 +231,8 @@ class GameLogic:
                 # Perform the move
             self.board[start_pos[0]][start_pos[1]] = 'E'  # Mark the start position as empty
             self.board[end_pos[0]][end_pos[1]] = move_sequence[0][0]  # Place the piece at the end position
+            self.update_hash(start_pos, piece)
+            self.update_hash(end_pos, move_sequence[0][0])
 
         except (TypeError, ValueError) as e:
             print(f"Error executing move: {e}")
@@ -156,29 +240,47 @@ class GameLogic:
 
         return True  # Indicate successful execution of the move sequence
 
+    def make_packed_move(self, move):
+        """
+            Executes a packed move from legal_move_codes. The move is not validated, so engines can apply and
+            undo moves cheaply; undo a move by making the move with start and end swapped.
+                """
+        color = move_color(move)
+        geometry = self.geometry
+        start, end = move_start(move), move_end(move)
+        (start_row, start_col), (end_row, end_col) = geometry.positions[start], geometry.positions[end]
+        self.board[start_row][start_col] = 'E'
+        self.board[end_row][end_col] = color
+        color_index = COLOR_INDEX[color]
+        self.position_hash ^= geometry.zobrist[start][color_index] ^ geometry.zobrist[end][color_index]
+
+    def update_hash(self, position, piece):
+        """
+            Toggles a piece on a position in the position hash.
+                """
+        hole = self.geometry.index.get(position)
+        color = COLOR_INDEX.get(piece)
+        if hole is not None and color is not None:
+            self.position_hash ^= self.geometry.zobrist[hole][color]
+
     def can_jump_again(self, player, current_pos, prev_location):
         """
                 Checks if the player can make another jump from the current position. Prevents reversing back to the previous location.
                 """
-        # Hexagonal directions for potential jumps
-        directions = [(0, -4), (2, -2), (2, 2), (0, 4), (-2, 2), (-2, -2)]
+        current = self.geometry.index.get(current_pos)
+        if current is None:
+            return []
+        positions = self.geometry.positions
+        board = self.board
         optional_moves = []
-        for dx, dy in directions:
-            xjump_pos = current_pos[0] + dx
-            yjump_pos = current_pos[1] + dy
-            jump_pos = (xjump_pos, yjump_pos)
-            # Skip potential jumps that would reverse the pawn back to its previous location
-            if jump_pos == prev_location:
-                continue
-
-            # Check if the jump is within the board
-            if not self.is_within_board(jump_pos):
+        for over, to in zip(self.geometry.neighbors[current], self.geometry.jumps[current]):
+            # Skip potential jumps off the board or back to the previous location
+            if to is None or positions[to] == prev_location:
                 continue
             # Check if the middle position has a piece to jump over and the jump position is empty
-            player_options = ["R", "B", "G", "Y", "O", "P"]
-            if self.board[xjump_pos][yjump_pos] == 'E' and self.board[xjump_pos - (dx // 2)][
-                yjump_pos - (dy // 2)] in player_options:
-                optional_moves.append((current_pos, (xjump_pos, yjump_pos)))  # Found a valid jump
+            (jump_row, jump_col), (over_row, over_col) = positions[to], positions[over]
+            if board[jump_row][jump_col] == 'E' and board[over_row][over_col] != 'E':
+                optional_moves.append((current_pos, (jump_row, jump_col)))  # Found a valid jump
         return optional_moves  # No valid jumps found that do not reverse to the previous location
 
     def check_win_condition(self, player):
@@ -189,9 +291,7 @@ class GameLogic:
             if player[0] not in ['R', 'B', 'G', 'Y', 'O', 'P']:
                 raise ValueError("Invalid player identifier.")
 
-            # Target areas need to be dynamically calculated or predefined based on the player's starting positions
-            # and the number of players. This example assumes predefined target areas for a simplified board setup.
-            target_areas = self.get_target_areas_for_player(player)
+            target_areas = self.geometry.target_sets[player[0]]
             for row in range(self.max_rows):
                 for col in range(self.max_cols):
                     if self.board[row][col] == player[0]:
@@ -207,19 +307,5 @@ class GameLogic:
         """
             Determines the target area for the specified player's pieces to achieve a win.
                """
-        # Placeholder: Define target areas for each player. This should be dynamic based on the game setup.
-        target_areas = {
-            'R': [(row, col) for row in range(13, 17) for col in range(9, 16)],
-            'B': [(row, col) for row in range(0, 4) for col in range(9, 16)],
-            'G': [(9, 21), (10, 22), (10, 20), (11, 23), (11, 21),  # Yellow's triangle, moved 2 places to the right
-                  (11, 19), (12, 24), (12, 22), (12, 20), (12, 18)],
-            'Y': [(7, 3), (6, 4), (6, 2), (5, 5), (5, 3),  # Green's triangle, moved 3 places to the left
-                  (5, 1), (4, 6), (4, 4), (4, 2), (4, 0)],
-            'O': [(7, 21), (6, 22), (6, 20), (5, 23), (5, 21),  # Orange's triangle, moved 1 place to the right
-                  (5, 19), (4, 24), (4, 22), (4, 20), (4, 18)],
-            'P': [(9, 3), (10, 4), (10, 2), (11, 5), (11, 3),  # Purple's triangle, moved 2 places to the left
-                  (11, 1), (12, 6), (12, 4), (12, 2), (12, 0)],
-
-            # Define other areas for 'B', 'G', 'Y', 'O', 'P' as appropriate
-        }
-        return target_areas.get(player, [])
+        # Each player races to the triangle opposite to its home
+        return list(self.geometry.targets.get(player, []))
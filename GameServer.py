@@ -0,0 +1,412 @@
+import asyncio
+import itertools
+import json
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from BoardGeometry import PLAYER_COLORS
+from GameLogic import GameLogic
+from ComputerPlayer import ComputerPlayer
+
+
+def compute_computer_move(board, color, num_players, time_limit=None):
+    """
+        Chooses a move for a computer seat. Runs inside a worker process, so it only receives plain data.
+        The engine is given time_limit as its time left, and where the platform has interval timers it is
+        interrupted with a TimeoutError once the limit has passed, so a move the server has given up on does not
+        keep the worker busy.
+            """
+    game_logic = GameLogic(num_players)
+    game_logic.board = board
+    computer_player = ComputerPlayer(color, game_logic)
+    try:
+        if time_limit is None or not hasattr(signal, "setitimer"):
+            return computer_player.choose_move(game_logic, computer_player, time_limit)
+        previous_handler = signal.signal(signal.SIGALRM, raise_move_timeout)
+        signal.setitimer(signal.ITIMER_REAL, time_limit)
+        try:
+            return computer_player.choose_move(game_logic, computer_player, time_limit)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+    finally:
+        computer_player.close()
+
+
+def raise_move_timeout(signum, frame):
+    """
+        Signal handler that stops a computer move which ran out of time.
+            """
+    raise TimeoutError("The computer move ran out of time.")
+
+
+class GameTable:
+    """
+        Holds the state of one hosted game: the game logic, the seats, and the clients watching it.
+        """
+
+    def __init__(self, table_id, seats, max_plies=None):
+        """
+            Initializes a table with the given seat kinds ('human' or 'computer'), one per player in color order.
+                """
+        assert 2 <= len(seats) <= 6, "Number of seats must be between 2 and 6."
+        self.table_id = table_id
+        self.seats = list(zip(PLAYER_COLORS, seats))
+        self.game_logic = GameLogic(len(seats))
+        self.max_plies = max_plies
+        self.current_player_index = 0
+        self.ply = 0
+        self.winner = None
+        self.finished = False
+        self.owners = {}  # Maps a human seat's color to the client writer that joined it
+        self.subscribers = set()  # Writers that receive this table's events
+        self.pending_move = None  # Future resolved with (start_pos, end_pos) by the seat to move
+        self.task = None
+
+    def current_color(self):
+        """
+            Returns the color of the seat that has to move.
+                """
+        return self.seats[self.current_player_index][0]
+
+    def state(self):
+        """
+            Returns a JSON-serializable snapshot of the table.
+                """
+        return {"table": self.table_id,
+                "board": ["".join(row) for row in self.game_logic.board],
+                "seats": [{"color": color, "kind": kind, "taken": color in self.owners}
+                          for color, kind in self.seats],
+                "turn": None if self.finished else self.current_color(),
+                "ply": self.ply,
+                "winner": self.winner,
+                "finished": self.finished}
+
+
+class GameServer:
+    """
+        Hosts many concurrent games over a line-delimited JSON protocol on TCP or Unix sockets.
+        Computer turns are offloaded to a process pool, and every move is bounded by a timeout. Finished tables
+        are dropped once the last client watching them has left.
+        """
+
+    def __init__(self, move_timeout=30.0, computer_workers=None, max_plies=None):
+        """
+            Initializes the server.
+
+            :param move_timeout: Seconds a seat has to move before its turn is passed.
+            :param computer_workers: Size of the process pool used for computer turns.
+            :param max_plies: Default bound on the length of hosted games, or None for no bound.
+                """
+        self.move_timeout = move_timeout
+        self.computer_workers = computer_workers
+        self.max_plies = max_plies
+        self.tables = {}
+        self.table_ids = itertools.count(1)
+        self.executor = None
+        self.servers = []
+
+    async def start_tcp(self, host="127.0.0.1", port=0):
+        """
+            Starts listening on a TCP socket. Returns the bound (host, port).
+                """
+        self.ensure_executor()
+        server = await asyncio.start_server(self.handle_client, host, port)
+        self.servers.append(server)
+        return server.sockets[0].getsockname()[:2]
+
+    async def start_unix(self, path):
+        """
+            Starts listening on a Unix domain socket at the given path.
+                """
+        self.ensure_executor()
+        server = await asyncio.start_unix_server(self.handle_client, path)
+        self.servers.append(server)
+        return path
+
+    def ensure_executor(self):
+        """
+            Creates the process pool for computer turns on first use.
+                """
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.computer_workers)
+
+    async def close(self):
+        """
+            Stops listening, cancels running tables, and shuts down the process pool.
+                """
+        for server in self.servers:
+            server.close()
+            await server.wait_closed()
+        self.servers = []
+        for table in self.tables.values():
+            if table.task is not None:
+                table.task.cancel()
+        tasks = [table.task for table in self.tables.values() if table.task is not None]
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+
+    def create_table(self, seats, max_plies=None):
+        """
+            Creates a table and starts its game loop. Returns the new table.
+                """
+        table = GameTable(next(self.table_ids), seats, max_plies if max_plies is not None else self.max_plies)
+        self.tables[table.table_id] = table
+        table.task = asyncio.get_running_loop().create_task(self.run_table(table))
+        return table
+
+    async def run_table(self, table):
+        """
+            Runs the game loop of one table until a player wins, the ply bound is reached or a computer move fails.
+                """
+        loop = asyncio.get_running_loop()
+        while not table.finished:
+            color, kind = table.seats[table.current_player_index]
+            self.broadcast(table, {"event": "turn", "color": color, "ply": table.ply})
+            try:
+                if kind == "computer":
+                    board = [row[:] for row in table.game_logic.board]
+                    executor = self.executor
+                    move = await asyncio.wait_for(
+                        loop.run_in_executor(executor, compute_computer_move, board, color,
+                                             len(table.seats), self.move_timeout), self.move_timeout)
+                else:
+                    table.pending_move = loop.create_future()
+                    move = await asyncio.wait_for(table.pending_move, self.move_timeout)
+            except asyncio.TimeoutError:
+                self.broadcast(table, {"event": "timeout", "color": color})
+                move = None
+            except Exception as error:
+                # A computer move that failed, e.g. in a broken process pool, ends the game instead of the task, so
+                # the clients still get the end event
+                self.broadcast(table, {"event": "error", "color": color, "error": str(error) or type(error).__name__})
+                if isinstance(error, BrokenProcessPool) and self.executor is executor:
+                    # Later computer moves get a new pool; other tables may already have replaced this one
+                    executor.shutdown(wait=False)
+                    self.executor = None
+                    self.ensure_executor()
+                table.finished = True
+                break
+            finally:
+                table.pending_move = None
+
+            if move:
+                start_pos, end_pos = move
+                table.game_logic.make_move([(color, start_pos, end_pos)])
+                self.broadcast(table, {"event": "move", "color": color,
+                                       "from": list(start_pos), "to": list(end_pos)})
+                if table.game_logic.check_win_condition(color):
+                    table.winner = color
+                    table.finished = True
+            elif kind == "computer":
+                self.broadcast(table, {"event": "pass", "color": color})
+
+            table.ply += 1
+            if table.max_plies is not None and table.ply >= table.max_plies:
+                table.finished = True
+            table.current_player_index = (table.current_player_index + 1) % len(table.seats)
+        self.broadcast(table, {"event": "end", "winner": table.winner, "ply": table.ply})
+        self.evict_finished_tables()
+
+    def evict_finished_tables(self):
+        """
+            Drops the finished tables that no client is watching any more.
+                """
+        for table_id in [table_id for table_id, table in self.tables.items()
+                         if table.finished and not table.subscribers]:
+            del self.tables[table_id]
+
+    def broadcast(self, table, message):
+        """
+            Sends an event to every client subscribed to the table.
+                """
+        message["table"] = table.table_id
+        for writer in list(table.subscribers):
+            self.send(writer, message)
+
+    def send(self, writer, message):
+        """
+            Writes one JSON message followed by a newline. Closed connections are dropped silently.
+                """
+        if writer.is_closing():
+            return
+        writer.write((json.dumps(message) + "\n").encode())
+
+    async def handle_client(self, reader, writer):
+        """
+            Serves one client connection, answering each request line with a reply line.
+                """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request = {}
+                try:
+                    request = json.loads(line)
+                    reply = self.handle_request(request, writer)
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    reply = {"ok": False, "error": str(e)}
+                if isinstance(request, dict) and "id" in request:
+                    reply["id"] = request["id"]
+                self.send(writer, reply)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for table in self.tables.values():
+                table.subscribers.discard(writer)
+                for color in [c for c, owner in table.owners.items() if owner is writer]:
+                    del table.owners[color]
+            self.evict_finished_tables()
+            writer.close()
+
+    def handle_request(self, request, writer):
+        """
+            Dispatches a single request and returns the reply.
+                """
+        op = request["op"]
+        if op == "create":
+            seats = request["seats"]
+            if not all(kind in ("human", "computer") for kind in seats):
+                raise ValueError("Seats must be 'human' or 'computer'.")
+            if not 2 <= len(seats) <= 6:
+                raise ValueError("Number of seats must be between 2 and 6.")
+            max_plies = request.get("max_plies")
+            if max_plies is not None and (type(max_plies) is not int or max_plies <= 0):
+                raise ValueError("max_plies must be a positive integer.")
+            table = self.create_table(seats, max_plies)
+            table.subscribers.add(writer)
+            return {"ok": True, "table": table.table_id}
+        if op == "list":
+            return {"ok": True, "tables": [table_id for table_id, table in self.tables.items()
+                                           if not table.finished]}
+
+        table = self.tables.get(request["table"])
+        if table is None:
+            raise ValueError("Unknown table.")
+        if op == "watch":
+            table.subscribers.add(writer)
+            return {"ok": True, "state": table.state()}
+        if op == "state":
+            return {"ok": True, "state": table.state()}
+        if op == "join":
+            color = request["color"]
+            if (color, "human") not in table.seats:
+                raise ValueError("No human seat with that color.")
+            if table.owners.get(color, writer) is not writer:
+                raise ValueError("Seat already taken.")
+            table.owners[color] = writer
+            table.subscribers.add(writer)
+            return {"ok": True, "state": table.state()}
+        if op == "move":
+            color = request["color"]
+            if table.owners.get(color) is not writer:
+                raise ValueError("You have not joined that seat.")
+            if table.finished or table.current_color() != color or table.pending_move is None:
+                raise ValueError("It is not your turn.")
+            start_pos, end_pos = tuple(request["from"]), tuple(request["to"])
+            if not table.game_logic.validate_move(color, start_pos, end_pos, False):
+                return {"ok": False, "error": "Illegal move."}
+            if not table.pending_move.done():
+                table.pending_move.set_result((start_pos, end_pos))
+            return {"ok": True}
+        raise ValueError(f"Unknown op: {op}")
+
+
+class GameClient:
+    """
+        A minimal client for the game server, used for scripted games and local testing.
+        """
+
+    def __init__(self):
+        """
+            Initializes an unconnected client.
+                """
+        self.reader = None
+        self.writer = None
+        self.request_ids = itertools.count(1)
+        self.replies = {}
+        self.events = asyncio.Queue()
+        self.reader_task = None
+
+    async def connect_tcp(self, host, port):
+        """
+            Connects to a server listening on TCP.
+                """
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        self.reader_task = asyncio.get_running_loop().create_task(self.read_messages())
+
+    async def connect_unix(self, path):
+        """
+            Connects to a server listening on a Unix domain socket.
+                """
+        self.reader, self.writer = await asyncio.open_unix_connection(path)
+        self.reader_task = asyncio.get_running_loop().create_task(self.read_messages())
+
+    async def read_messages(self):
+        """
+            Routes incoming lines to the waiting request or to the event queue.
+                """
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            if "id" in message and message["id"] in self.replies:
+                self.replies.pop(message["id"]).set_result(message)
+            else:
+                await self.events.put(message)
+
+    async def request(self, op, **fields):
+        """
+            Sends a request and waits for its reply.
+                """
+        request_id = next(self.request_ids)
+        future = asyncio.get_running_loop().create_future()
+        self.replies[request_id] = future
+        self.writer.write((json.dumps(dict(fields, op=op, id=request_id)) + "\n").encode())
+        await self.writer.drain()
+        return await future
+
+    async def next_event(self, event=None, timeout=None):
+        """
+            Returns the next event, skipping events of other kinds when a kind is given.
+                """
+        while True:
+            message = await asyncio.wait_for(self.events.get(), timeout)
+            if event is None or message.get("event") == event:
+                return message
+
+    async def close(self):
+        """
+            Closes the connection.
+                """
+        if self.reader_task is not None:
+            self.reader_task.cancel()
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def serve(host="127.0.0.1", port=8765, unix_path=None):
+    """
+        Runs a game server until it is interrupted.
+        """
+    server = GameServer()
+    if unix_path:
+        await server.start_unix(unix_path)
+        print(f"Game server listening on {unix_path}")
+    else:
+        host, port = await server.start_tcp(host, port)
+        print(f"Game server listening on {host}:{port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(serve())
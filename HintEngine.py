@@ -0,0 +1,95 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy
+
+from ComputerPlayer import ENGINES
+
+
+class ReachabilityCache:
+    """
+        Caches the destinations of every piece of a player per position, keyed by the position hash, so the user
+        interface can show them as soon as a piece is selected. The least recently used positions are evicted.
+        """
+
+    def __init__(self, game_logic, max_positions=64):
+        """
+            Initializes an empty cache for the given game.
+
+            :param max_positions: How many (position, player) entries to keep.
+                """
+        self.game_logic = game_logic
+        self.max_positions = max_positions
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def precompute(self, player):
+        """
+            Computes the destinations of all the player's pieces in the current position, unless they are cached.
+
+            :return: A dictionary mapping each piece's position to its reachable destinations, see
+                     GameLogic.reachable_destinations.
+                """
+        key = (self.game_logic.position_hash, player)
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        self.misses += 1
+        game_logic = self.game_logic
+        reachable = {position: game_logic.reachable_destinations(player, position)
+                     for position in game_logic.geometry.positions
+                     if game_logic.board[position[0]][position[1]] == player}
+        self.entries[key] = reachable
+        if len(self.entries) > self.max_positions:
+            self.entries.popitem(last=False)
+        return reachable
+
+    def destinations(self, player, start_pos):
+        """
+            Returns the destinations of the piece at start_pos, mapped to their paths. Empty if the position does
+            not hold one of the player's pieces.
+                """
+        return self.precompute(player).get(start_pos, {})
+
+
+class HintEngine:
+    """
+        Computes move hints on a background thread, so the user interface stays responsive while the engine thinks.
+        The engine works on a copy of the game, taken when the hint is requested.
+        """
+
+    def __init__(self, engine="heuristic"):
+        """
+            Initializes the hint engine.
+
+            :param engine: Name of the engine in ComputerPlayer.ENGINES that suggests the moves.
+                """
+        self.engine = engine
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hint")
+
+    def request_hint(self, game_logic, player):
+        """
+            Starts computing the best move for the player in the current position.
+
+            :return: A Future whose result is a (start_pos, end_pos) tuple, or None if the player cannot move.
+                """
+        snapshot = copy(game_logic)
+        snapshot.board = [row[:] for row in game_logic.board]
+        return self.executor.submit(self.best_move, snapshot, player)
+
+    def best_move(self, game_logic, player):
+        """
+            Asks the engine for its move in the given game.
+                """
+        computer_player = ENGINES[self.engine](player, game_logic)
+        try:
+            return computer_player.choose_move(game_logic, computer_player)
+        finally:
+            computer_player.close()
+
+    def close(self):
+        """
+            Stops the background thread once the pending hints are done.
+                """
+        self.executor.shutdown(wait=False)
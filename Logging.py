@@ -49,6 +49,15 @@ class Logging:
                 num_pc = int(parts[11])
                 return num_humans, num_pc
 
+    def log_time_control(self, actions):
+        """
+            Returns the time control logged at the start of the game, such as '300+5', or None without clocks.
+                """
+        for line in actions:
+            if "Time control: " in line:
+                return line[line.find("Time control: ") + len("Time control: "):].strip()
+        return None
+
     def parse_log_file(self):
         """
             Parses the log file for moves made during the game, returning a list of moves in a structured format.
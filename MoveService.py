@@ -0,0 +1,529 @@
+import argparse
+import asyncio
+import http.client
+import json
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
+from BoardGeometry import COLOR_INDEX, PLAYER_COLORS, STANDARD_SIZE, size_for_holes
+from ComputerPlayer import DEFAULT_WEIGHTS, FEATURES, load_weights
+from Dataset import encode_board
+from GameLogic import GameLogic
+from Moves import move_end, move_start
+from Symmetry import SymmetricCache, Symmetry
+from Tuner import FeatureTables, color_features
+
+# A position is sent as one character per hole, in BoardGeometry.positions order: '.' for an empty hole and the
+# color letter for a piece. The board size follows from the length, 121 characters for the standard board.
+EMPTY_HOLE = "."
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+
+def encode_position(game_logic):
+    """
+        Encodes the board of a game as a position string.
+        """
+    board = game_logic.board
+    return "".join(board[row][col] if board[row][col] in COLOR_INDEX else EMPTY_HOLE
+                   for row, col in game_logic.geometry.positions)
+
+
+def decode_position(position):
+    """
+        Sets up a game with the board described by a position string.
+
+        :raises ValueError: If the string has an unknown character or no board has that many holes.
+        """
+    unknown = set(position) - set(PLAYER_COLORS) - {EMPTY_HOLE}
+    if unknown:
+        raise ValueError(f"Unknown characters in position: {''.join(sorted(unknown))!r}.")
+    game_logic = GameLogic(min(max(len(set(position) - {EMPTY_HOLE}), 2), 6), size_for_holes(len(position)))
+    for (row, col), cell in zip(game_logic.geometry.positions, position):
+        game_logic.board[row][col] = 'E' if cell == EMPTY_HOLE else cell
+    game_logic.position_hash = game_logic.compute_hash()
+    return game_logic
+
+
+@lru_cache(maxsize=None)
+def feature_tables(size=STANDARD_SIZE):
+    """
+        Returns the shared feature tables of the given board size.
+        """
+    return FeatureTables(GameLogic(2, size))
+
+
+@lru_cache(maxsize=None)
+def board_symmetry(size=STANDARD_SIZE):
+    """
+        Returns the shared symmetry tables of the given board size.
+        """
+    return Symmetry(GameLogic(2, size))
+
+
+def best_moves(requests, weights):
+    """
+        Finds the heuristic's best move for many positions at once: the boards after every legal move of every
+        position are stacked and their features computed in one vectorized pass per board size.
+
+        :param requests: A list of (position string, color) tuples.
+        :param weights: Feature weights, as used by HeuristicComputerPlayer.
+        :return: A list with, per request, the best (start_pos, end_pos) tuple, or None if the color cannot move.
+                 Unlike the heuristic player, ties go to the first move in generation order, so answers are
+                 deterministic and can be cached.
+        """
+    results = [None] * len(requests)
+    by_size = {}
+    for i, (position, color) in enumerate(requests):
+        game_logic = decode_position(position)
+        moves = game_logic.legal_move_codes(color)
+        if moves:
+            by_size.setdefault(game_logic.geometry.size, []).append((i, game_logic, color, moves))
+
+    for size, games in by_size.items():
+        tables = feature_tables(size)
+        boards = []
+        for _, game_logic, color, moves in games:
+            planes = encode_board(game_logic.board, game_logic.geometry.positions).astype(bool)
+            after = np.repeat(planes[None], len(moves), axis=0)
+            rows = np.arange(len(moves))
+            after[rows, COLOR_INDEX[color], [move_start(move) for move in moves]] = False
+            after[rows, COLOR_INDEX[color], [move_end(move) for move in moves]] = True
+            boards.append(after)
+        sides = np.concatenate([np.full(len(moves), COLOR_INDEX[color]) for _, _, color, moves in games])
+        features = color_features(np.concatenate(boards), tables, sides)[:, 0]
+
+        offset = 0
+        for i, game_logic, color, moves in games:
+            own = features[offset:offset + len(moves)]
+            offset += len(moves)
+            scores = np.zeros(len(moves))
+            for column, name in enumerate(FEATURES):  # Summed in the same order as evaluate_position
+                scores = scores + weights[name] * own[:, column]
+            best = moves[int(np.argmax(scores))]
+            positions = game_logic.geometry.positions
+            results[i] = (positions[move_start(best)], positions[move_end(best)])
+    return results
+
+
+class MicroBatcher:
+    """
+        Collects requests that arrive close together into batches, and evaluates each batch with a single call on a
+        worker thread. While a batch is evaluated, new requests queue up for the next one.
+        """
+
+    def __init__(self, evaluate_batch, max_batch=32, max_delay=0.002, on_batch=None):
+        """
+            Initializes the batcher. Call start() from the event loop before submitting.
+
+            :param evaluate_batch: A function mapping a list of items to the list of their results.
+            :param max_batch: The largest number of items evaluated together.
+            :param max_delay: Seconds the first item of a batch waits for others to join it.
+            :param on_batch: Optional callback called as on_batch(batch_size) for every batch.
+                """
+        self.evaluate_batch = evaluate_batch
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.on_batch = on_batch
+        self.queue = None
+        self.task = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="batch")
+
+    def start(self):
+        """
+            Starts collecting batches on the running event loop.
+                """
+        self.queue = asyncio.Queue()
+        self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def submit(self, item):
+        """
+            Queues an item and waits for its result.
+                """
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((item, future))
+        return await future
+
+    def take_waiting(self, batch):
+        """
+            Adds queued items to the batch, up to max_batch.
+                """
+        while len(batch) < self.max_batch and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+
+    async def run(self):
+        """
+            Evaluates batches until cancelled.
+                """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            self.take_waiting(batch)
+            if len(batch) < self.max_batch and self.max_delay > 0:
+                await asyncio.sleep(self.max_delay)
+                self.take_waiting(batch)
+            try:
+                results = await loop.run_in_executor(self.executor, self.evaluate_batch, [item for item, _ in batch])
+            except Exception as error:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            if self.on_batch is not None:
+                self.on_batch(len(batch))
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def close(self):
+        """
+            Stops collecting batches and shuts down the worker thread.
+                """
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+        self.executor.shutdown(wait=True)
+
+
+class ServiceStats:
+    """
+        Request latencies, cache hits and batch sizes of a running service.
+        """
+
+    def __init__(self, max_latencies=10000):
+        """
+            Initializes empty statistics.
+
+            :param max_latencies: How many of the most recent latencies the percentiles are computed over.
+                """
+        self.latencies = deque(maxlen=max_latencies)
+        self.requests = 0
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+        self.batched_requests = 0
+
+    def record_batch(self, batch_size):
+        """
+            Counts an evaluated batch.
+                """
+        self.batches += 1
+        self.batched_requests += batch_size
+
+    def record_request(self, seconds, hit):
+        """
+            Counts an answered move request.
+                """
+        self.requests += 1
+        self.latencies.append(seconds)
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def summary(self):
+        """
+            Returns the statistics as a dictionary, with latencies in milliseconds.
+                """
+        summary = {"requests": self.requests,
+                   "cache_hits": self.hits,
+                   "cache_misses": self.misses,
+                   "cache_hit_rate": self.hits / self.requests if self.requests else 0.0,
+                   "batches": self.batches,
+                   "mean_batch_size": self.batched_requests / self.batches if self.batches else 0.0}
+        latencies = np.array(self.latencies) * 1000.0
+        for percentile in (50, 90, 99):
+            summary[f"latency_p{percentile}_ms"] = float(np.percentile(latencies, percentile)) if len(latencies) else 0.0
+        return summary
+
+
+class MoveService:
+    """
+        Suggests moves over HTTP with JSON bodies, so other tools can use the heuristic engine without the game.
+
+        POST /move with {"position": <position string>, "color": "R"} answers {"move": [[row, col], [row, col]],
+        "cached": false}, where move is null if the color cannot move. GET /stats returns the ServiceStats summary
+        and GET /health answers {"status": "ok"}. Connections are kept alive between requests.
+        """
+
+    def __init__(self, weights=None, cache_size=4096, max_batch=32, max_delay=0.002):
+        """
+            Initializes the service.
+
+            :param weights: Feature weights of the engine, by default DEFAULT_WEIGHTS.
+            :param cache_size: How many answered positions to keep per board size, least recently used first out.
+                               A position and color shares its entry with its rotations and reflections.
+            :param max_batch: See MicroBatcher.
+            :param max_delay: See MicroBatcher.
+                """
+        self.weights = weights if weights is not None else DEFAULT_WEIGHTS
+        self.cache_size = cache_size
+        self.caches = {}  # A SymmetricCache per board size
+        self.stats = ServiceStats()
+        self.batcher = MicroBatcher(lambda requests: best_moves(requests, self.weights), max_batch, max_delay,
+                                    self.stats.record_batch)
+        self.server = None
+        self.connections = {}  # Handler task of every open connection, with its writer
+        self.loop = None
+        self.thread = None
+
+    async def start(self, host="127.0.0.1", port=0):
+        """
+            Starts listening for requests. Returns the bound (host, port).
+                """
+        self.batcher.start()
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def close(self):
+        """
+            Stops listening, closes open connections and stops the batcher. Closing a connection ends its handler
+            the same way a client hanging up does.
+                """
+        self.server.close()
+        for writer in list(self.connections.values()):
+            writer.close()
+        await asyncio.gather(*self.connections, return_exceptions=True)
+        await self.batcher.close()
+
+    async def suggest(self, position, color, game_logic=None):
+        """
+            Returns the best move for the color as a (start_pos, end_pos) tuple or None, and whether it came from
+            the cache. A rotation or reflection of a position answered before is a cache hit too, as the heuristic
+            does not depend on the orientation of the board.
+
+            :param game_logic: The decoded position, if the caller already has it.
+                """
+        if game_logic is None:
+            game_logic = decode_position(position)
+        size = game_logic.geometry.size
+        if size not in self.caches:
+            self.caches[size] = SymmetricCache(board_symmetry(size), self.cache_size)
+        cache = self.caches[size]
+        canonical = cache.symmetry.canonicalize(game_logic.board, color)
+        entry = cache.lookup(game_logic.board, color, canonical)
+        if entry is not None:
+            return entry[1], True
+        move = await self.batcher.submit((position, color))
+        cache.store(game_logic.board, color, None, move, canonical)
+        return move, False
+
+    async def handle_move(self, body):
+        """
+            Answers a move request.
+
+            :return: A tuple (HTTP status, reply).
+                """
+        started = time.perf_counter()
+        try:
+            request = json.loads(body)
+            position, color = request["position"], request["color"]
+            if not isinstance(position, str):
+                raise ValueError("The position must be a string.")
+            if not isinstance(color, str) or color not in COLOR_INDEX:
+                raise ValueError(f"Unknown color {color!r}.")
+            game_logic = decode_position(position)  # Rejects malformed positions before they reach a batch
+        except (ValueError, KeyError, TypeError) as error:
+            return 400, {"error": str(error)}
+        move, cached = await self.suggest(position, color, game_logic)
+        self.stats.record_request(time.perf_counter() - started, cached)
+        return 200, {"move": [list(move[0]), list(move[1])] if move is not None else None, "cached": cached}
+
+    async def respond(self, method, path, body):
+        """
+            Routes a request to its handler.
+
+            :return: A tuple (HTTP status, reply).
+                """
+        routes = {"/move": "POST", "/stats": "GET", "/health": "GET"}
+        if path not in routes:
+            return 404, {"error": f"Unknown path {path}."}
+        if method != routes[path]:
+            return 405, {"error": f"{path} expects {routes[path]}."}
+        if path == "/move":
+            return await self.handle_move(body)
+        if path == "/stats":
+            return 200, self.stats.summary()
+        return 200, {"status": "ok"}
+
+    async def handle_connection(self, reader, writer):
+        """
+            Serves the HTTP/1.1 requests of one connection until the client closes it.
+                """
+        task = asyncio.current_task()
+        self.connections[task] = writer
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                status, reply = await self.respond(method, path.split("?", 1)[0], body)
+                payload = json.dumps(reply).encode()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+                             f"Content-Type: application/json\r\n"
+                             f"Content-Length: {len(payload)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            self.connections.pop(task, None)
+            writer.close()
+
+    def start_background(self, host="127.0.0.1", port=0):
+        """
+            Runs the service on its own event loop in a background thread. Returns the bound (host, port).
+                """
+        ready = threading.Event()
+        address = []
+
+        def serve():
+            self.loop = asyncio.new_event_loop()
+            address.append(self.loop.run_until_complete(self.start(host, port)))
+            ready.set()
+            self.loop.run_forever()
+            self.loop.run_until_complete(self.close())
+            self.loop.close()
+
+        self.thread = threading.Thread(target=serve, name="move-service", daemon=True)
+        self.thread.start()
+        ready.wait()
+        return address[0]
+
+    def stop_background(self):
+        """
+            Stops a service started with start_background.
+                """
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+def request_move(connection, position, color):
+    """
+        Asks a running service for a move over an open http.client.HTTPConnection.
+
+        :return: The decoded reply.
+        """
+    connection.request("POST", "/move", json.dumps({"position": position, "color": color}),
+                       {"Content-Type": "application/json"})
+    return json.loads(connection.getresponse().read())
+
+
+def request_stats(host, port):
+    """
+        Fetches the statistics of a running service.
+        """
+    connection = http.client.HTTPConnection(host, port)
+    try:
+        connection.request("GET", "/stats")
+        return json.loads(connection.getresponse().read())
+    finally:
+        connection.close()
+
+
+def sample_positions(count, num_players=2, max_plies=150, seed=0):
+    """
+        Generates positions from random games, each paired with the color to move.
+
+        :return: A list of (position string, color) tuples.
+        """
+    rng = random.Random(seed)
+    samples = []
+    while len(samples) < count:
+        game_logic = GameLogic(num_players)
+        colors = PLAYER_COLORS[:num_players]
+        for ply in range(rng.randrange(max_plies)):
+            moves = game_logic.legal_moves(colors[ply % num_players])
+            if moves:
+                game_logic.make_move([(colors[ply % num_players],) + rng.choice(moves)])
+        samples.append((encode_position(game_logic), colors[rng.randrange(num_players)]))
+    return samples
+
+
+def load_test(host, port, positions, clients=8, requests_per_client=200, seed=0):
+    """
+        Sends move requests from several client threads at once, each over its own kept-alive connection, picking
+        positions at random.
+
+        :param positions: A list of (position string, color) tuples, see sample_positions.
+        :return: A dictionary with the request rate and the client-side latency percentiles in milliseconds.
+        """
+    def client(index):
+        rng = random.Random(seed + index)
+        connection = http.client.HTTPConnection(host, port)
+        latencies = []
+        try:
+            for _ in range(requests_per_client):
+                position, color = rng.choice(positions)
+                started = time.perf_counter()
+                request_move(connection, position, color)
+                latencies.append(time.perf_counter() - started)
+        finally:
+            connection.close()
+        return latencies
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        latencies = np.concatenate(list(executor.map(client, range(clients)))) * 1000.0
+    seconds = time.perf_counter() - started
+    result = {"requests": len(latencies), "seconds": seconds, "requests_per_second": len(latencies) / seconds}
+    for percentile in (50, 90, 99):
+        result[f"latency_p{percentile}_ms"] = float(np.percentile(latencies, percentile))
+    return result
+
+
+def main():
+    """
+        Command line entry point: 'serve' runs the service, 'bench' load tests a service on localhost.
+        """
+    parser = argparse.ArgumentParser(description="Suggest moves over HTTP.")
+    parser.add_argument("mode", choices=["serve", "bench"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--cache-size", type=int, default=4096)
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-delay", type=float, default=0.002, help="Seconds a request waits for a batch.")
+    parser.add_argument("--weights-version", type=int, default=None,
+                        help="Tuned weights to suggest moves with, see Tuner.py. The default weights if not given.")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per client.")
+    parser.add_argument("--positions", type=int, default=500, help="Distinct positions to request.")
+    args = parser.parse_args()
+    service = MoveService(load_weights(version=args.weights_version), cache_size=args.cache_size,
+                          max_batch=args.max_batch, max_delay=args.max_delay)
+    if args.mode == "serve":
+        async def serve():
+            host, port = await service.start(args.host, args.port)
+            print(f"Serving moves on http://{host}:{port}")
+            await service.server.serve_forever()
+
+        asyncio.run(serve())
+    else:
+        host, port = service.start_background(args.host, 0)
+        try:
+            result = load_test(host, port, sample_positions(args.positions), args.clients, args.requests)
+            result["service"] = request_stats(host, port)
+        finally:
+            service.stop_background()
+        print(json.dumps(result, indent=1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import tracemalloc
+from array import array
+
+from BoardGeometry import PLAYER_COLORS, COLOR_INDEX
+
+# A packed move is one int: color index << 24 | start hole << 12 | end hole, with holes numbered as in
+# BoardGeometry.positions. A turn is always a single step or a single jump, so its start and end describe it fully.
+HOLE_BITS = 12
+HOLE_MASK = (1 << HOLE_BITS) - 1
+COLOR_SHIFT = 2 * HOLE_BITS
+
+
+def pack_move(color_index, start, end):
+    """
+        Packs a move given as a color index and start and end hole indices.
+        """
+    return color_index << COLOR_SHIFT | start << HOLE_BITS | end
+
+
+def move_color(move):
+    """
+        Returns the color of a packed move.
+        """
+    return PLAYER_COLORS[move >> COLOR_SHIFT]
+
+
+def move_start(move):
+    """
+        Returns the start hole index of a packed move.
+        """
+    return move >> HOLE_BITS & HOLE_MASK
+
+
+def move_end(move):
+    """
+        Returns the end hole index of a packed move.
+        """
+    return move & HOLE_MASK
+
+
+def encode_move(geometry, move):
+    """
+        Packs a (color, start_pos, end_pos) tuple, as used by the user interfaces and the log, into an int.
+        """
+    color, start_pos, end_pos = move
+    return pack_move(COLOR_INDEX[color[0]], geometry.index[start_pos], geometry.index[end_pos])
+
+
+def decode_move(geometry, move):
+    """
+        Unpacks a packed move into a (color, start_pos, end_pos) tuple.
+        """
+    return move_color(move), geometry.positions[move_start(move)], geometry.positions[move_end(move)]
+
+
+class MoveHistory:
+    """
+        The moves of a game, stored as packed ints in an array. Takes 4 bytes per move, where a list of
+        (color, start_pos, end_pos) tuples takes well over a hundred. Iterating yields the moves as tuples.
+        """
+    __slots__ = ("geometry", "codes")
+
+    def __init__(self, geometry, moves=()):
+        """
+            Initializes the history with moves given as (color, start_pos, end_pos) tuples.
+                """
+        assert len(geometry.positions) <= HOLE_MASK + 1, "Board too large for packed moves."
+        self.geometry = geometry
+        self.codes = array("I", (encode_move(geometry, move) for move in moves))
+
+    def append(self, move):
+        """
+            Appends a move given as a (color, start_pos, end_pos) tuple.
+                """
+        self.codes.append(encode_move(self.geometry, move))
+
+    def append_code(self, move):
+        """
+            Appends a packed move.
+                """
+        self.codes.append(move)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, ply):
+        return decode_move(self.geometry, self.codes[ply])
+
+    def __iter__(self):
+        return (decode_move(self.geometry, move) for move in self.codes)
+
+    def __eq__(self, other):
+        if isinstance(other, MoveHistory):
+            return self.geometry.size == other.geometry.size and self.codes == other.codes
+        return list(self) == list(other)
+
+
+def traced_peak(function, *args, **kwargs):
+    """
+        Calls a function while tracing memory allocations.
+
+        :return: A tuple (result, peak), where peak is the largest number of bytes allocated during the call
+                 and not yet freed.
+        """
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    try:
+        result = function(*args, **kwargs)
+        return result, tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
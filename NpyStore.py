@@ -0,0 +1,83 @@
+import os
+
+import numpy as np
+
+HEADER_ALIGNMENT = 64
+MAX_ROWS = 10 ** 15  # The header is sized for this row count, so it can be rewritten in place as rows are appended
+
+
+class AppendableNpy:
+    """
+        An append-only .npy file. Rows are written in chunks through numpy.memmap and the header is updated after
+        each chunk, so the file stays loadable with numpy.load at any time without holding it in memory.
+        """
+
+    def __init__(self, path, dtype, row_shape=()):
+        """
+            Opens an existing file for appending, or creates an empty one.
+
+            :param path: Path of the .npy file.
+            :param dtype: The dtype of the stored rows, which may be structured.
+            :param row_shape: The shape of a single row.
+                """
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.row_shape = tuple(row_shape)
+        self.row_nbytes = self.dtype.itemsize * int(np.prod(self.row_shape, dtype=np.int64))
+        if os.path.exists(path):
+            with open(path, "rb") as npy_file:
+                version = np.lib.format.read_magic(npy_file)
+                shape, _, dtype = np.lib.format.read_array_header_1_0(npy_file)
+                header_size = npy_file.tell()
+            if version != (1, 0) or dtype != self.dtype or tuple(shape[1:]) != self.row_shape:
+                raise ValueError(f"{path} was not written with the same dtype and row shape.")
+            self.rows = shape[0]
+            self.header_size = header_size
+            # Drop any partially written chunk left behind by an interrupted append
+            with open(path, "r+b") as npy_file:
+                npy_file.truncate(self.header_size + self.rows * self.row_nbytes)
+        else:
+            unpadded = len(np.lib.format.magic(1, 0)) + 2 + len(self.description(MAX_ROWS)) + 1
+            self.header_size = -(-unpadded // HEADER_ALIGNMENT) * HEADER_ALIGNMENT
+            self.rows = 0
+            with open(path, "wb") as npy_file:
+                npy_file.write(self.header())
+
+    def description(self, rows):
+        """
+            Returns the header dictionary of the file for the given row count as a string.
+                """
+        return repr({"descr": np.lib.format.dtype_to_descr(self.dtype),
+                     "fortran_order": False,
+                     "shape": (rows,) + self.row_shape})
+
+    def header(self):
+        """
+            Builds the fixed-size .npy version 1.0 header for the current row count.
+                """
+        prefix = np.lib.format.magic(1, 0)
+        header_len = self.header_size - len(prefix) - 2
+        return (prefix + header_len.to_bytes(2, "little")
+                + self.description(self.rows).ljust(header_len - 1).encode("latin1") + b"\n")
+
+    def append(self, rows):
+        """
+            Appends a chunk of rows and updates the header. Returns the new row count.
+                """
+        rows = np.asarray(rows, dtype=self.dtype).reshape((-1,) + self.row_shape)
+        if len(rows) == 0:
+            return self.rows
+        offset = self.header_size + self.rows * self.row_nbytes
+        with open(self.path, "r+b") as npy_file:
+            npy_file.truncate(offset + len(rows) * self.row_nbytes)
+        chunk = np.memmap(self.path, dtype=self.dtype, mode="r+", offset=offset, shape=rows.shape)
+        chunk[...] = rows
+        chunk.flush()
+        del chunk
+        self.rows += len(rows)
+        with open(self.path, "r+b") as npy_file:
+            npy_file.write(self.header())
+        return self.rows
+
+    def __len__(self):
+        return self.rows
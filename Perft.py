@@ -0,0 +1,190 @@
+import argparse
+import json
+import os
+import time
+from functools import partial
+from multiprocessing import Pool
+
+from BoardGeometry import PLAYER_COLORS, COLOR_INDEX, STANDARD_SIZE
+from GameLogic import GameLogic
+from Moves import pack_move, move_start, move_end, decode_move
+from SharedTable import SharedTable, attached_table, table_key
+
+FIXTURES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perft_fixtures.json")
+
+
+def setup_position(num_players=2, size=STANDARD_SIZE, moves=()):
+    """
+        Creates a game and plays the given (color, start_pos, end_pos) moves on it, without validating them.
+        """
+    game_logic = GameLogic(num_players, size)
+    for color, start_pos, end_pos in moves:
+        game_logic.make_move([(color, tuple(start_pos), tuple(end_pos))])
+    return game_logic
+
+
+def perft(game_logic, colors, depth, turn=0, table=None):
+    """
+        Counts the move sequences of the given length from the current position. Every turn is one step or jump,
+        as in GameLogic.legal_moves, and a player without moves passes, which counts as one move. The search does
+        not stop at won positions, so the counts only depend on move generation.
+
+        :param colors: The colors of the players in turn order.
+        :param turn: The index in colors of the player to move.
+        :param table: An optional SharedTable that remembers the counts of positions below depth 1, so positions
+                      reached again by another move order are counted once.
+        :return: The number of leaf nodes at the given depth.
+        """
+    if depth == 0:
+        return 1
+    color = colors[turn]
+    next_turn = (turn + 1) % len(colors)
+    moves = game_logic.legal_move_codes(color)
+    if not moves:
+        return perft(game_logic, colors, depth - 1, next_turn, table)
+    if depth == 1:
+        return len(moves)
+    if table is not None:
+        key = table_key(game_logic.position_hash, depth, turn)
+        nodes = table.probe(key)
+        if nodes is not None:
+            return nodes
+    color_index = COLOR_INDEX[color]
+    nodes = 0
+    for move in moves:
+        game_logic.make_packed_move(move)
+        nodes += perft(game_logic, colors, depth - 1, next_turn, table)
+        game_logic.make_packed_move(pack_move(color_index, move_end(move), move_start(move)))
+    if table is not None:
+        table.store(key, nodes)
+    return nodes
+
+
+def perft_divide(game_logic, colors, depth, turn=0):
+    """
+        Counts the move sequences below each root move, which helps to find the move where two engines disagree.
+
+        :return: A list of ((color, start_pos, end_pos), nodes) tuples in move generation order.
+        """
+    color = colors[turn]
+    next_turn = (turn + 1) % len(colors)
+    color_index = COLOR_INDEX[color]
+    divided = []
+    for move in game_logic.legal_move_codes(color):
+        game_logic.make_packed_move(move)
+        divided.append((decode_move(game_logic.geometry, move), perft(game_logic, colors, depth - 1, next_turn)))
+        game_logic.make_packed_move(pack_move(color_index, move_end(move), move_start(move)))
+    return divided
+
+
+def perft_root_move(position, depth, root_move, table_name=None):
+    """
+        Counts the move sequences below one root move in a fresh game, for parallel_perft.
+
+        :param table_name: The name of a SharedTable to use, or None to count without one.
+        """
+    game_logic = setup_position(position["num_players"], position["size"], position["moves"])
+    colors = PLAYER_COLORS[:position["num_players"]]
+    turn = position["turn"]
+    game_logic.make_move([root_move])
+    table = attached_table(table_name) if table_name is not None else None
+    return perft(game_logic, colors, depth - 1, (turn + 1) % len(colors), table)
+
+
+def parallel_perft(position, depth, processes=None, table_entries=0):
+    """
+        Counts the move sequences of the given length from a position, splitting the root moves over a process pool.
+
+        :param position: A dictionary with num_players, size, the moves leading to the position and the turn index.
+        :param table_entries: If not 0, the workers share a SharedTable of this many entries.
+        :return: The number of leaf nodes, equal to perft on the same position.
+        """
+    game_logic = setup_position(position["num_players"], position["size"], position["moves"])
+    colors = PLAYER_COLORS[:position["num_players"]]
+    root_moves = [decode_move(game_logic.geometry, move)
+                  for move in game_logic.legal_move_codes(colors[position["turn"]])]
+    if depth <= 1 or not root_moves:
+        return perft(game_logic, colors, depth, position["turn"])
+    if not table_entries:
+        with Pool(processes) as pool:
+            return sum(pool.map(partial(perft_root_move, position, depth), root_moves))
+    with SharedTable(table_entries) as table, Pool(processes) as pool:
+        return sum(pool.map(partial(perft_root_move, position, depth, table_name=table.name), root_moves))
+
+
+def load_fixtures(path=FIXTURES_FILE):
+    """
+        Loads the known-good perft counts. Each fixture describes a position and its counts for depths 1, 2, ...
+        """
+    with open(path) as fixtures_file:
+        fixtures = json.load(fixtures_file)
+    for fixture in fixtures:
+        fixture.setdefault("size", STANDARD_SIZE)
+        fixture.setdefault("moves", [])
+        fixture.setdefault("turn", len(fixture["moves"]) % fixture["num_players"])
+    return fixtures
+
+
+def check_fixtures(max_depth=None, processes=None, path=FIXTURES_FILE):
+    """
+        Recomputes the counts of every fixture up to max_depth and returns the mismatches as a list of
+        (fixture name, depth, expected, actual) tuples. An empty list means move generation is unchanged.
+        """
+    mismatches = []
+    for fixture in load_fixtures(path):
+        for depth, expected in enumerate(fixture["counts"][:max_depth], start=1):
+            actual = parallel_perft(fixture, depth, processes) if processes else perft(
+                setup_position(fixture["num_players"], fixture["size"], fixture["moves"]),
+                PLAYER_COLORS[:fixture["num_players"]], depth, fixture["turn"])
+            if actual != expected:
+                mismatches.append((fixture["name"], depth, expected, actual))
+    return mismatches
+
+
+def benchmark(position, depth, processes=None):
+    """
+        Times a perft run, the standard throughput benchmark of move generation.
+
+        :param processes: Use parallel_perft with this many processes, or a single process if None.
+        :return: A dictionary with the node count, the elapsed seconds and the nodes per second.
+        """
+    started = time.perf_counter()
+    if processes:
+        nodes = parallel_perft(position, depth, processes)
+    else:
+        nodes = perft(setup_position(position["num_players"], position["size"], position["moves"]),
+                      PLAYER_COLORS[:position["num_players"]], depth, position["turn"])
+    elapsed = time.perf_counter() - started
+    return {"nodes": nodes, "seconds": elapsed, "nodes_per_second": nodes / elapsed if elapsed else float("inf")}
+
+
+def main():
+    """
+        Command line entry point: checks the regression fixtures, or counts and times moves from the start position.
+        """
+    parser = argparse.ArgumentParser(description="Count move sequences to check and benchmark move generation.")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--players", type=int, default=2)
+    parser.add_argument("--size", type=int, default=STANDARD_SIZE)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--divide", action="store_true", help="Print the count below each root move.")
+    parser.add_argument("--check", action="store_true", help="Check the counts stored in the fixtures file.")
+    args = parser.parse_args()
+    if args.check:
+        mismatches = check_fixtures(args.depth, args.processes)
+        for name, depth, expected, actual in mismatches:
+            print(f"{name} depth {depth}: expected {expected}, got {actual}")
+        print("All fixtures match." if not mismatches else f"{len(mismatches)} mismatches.")
+        return
+    position = {"num_players": args.players, "size": args.size, "moves": [], "turn": 0}
+    if args.divide:
+        game_logic = setup_position(args.players, args.size)
+        for (color, start_pos, end_pos), nodes in perft_divide(game_logic, PLAYER_COLORS[:args.players], args.depth):
+            print(f"{start_pos} -> {end_pos}: {nodes}")
+    result = benchmark(position, args.depth, args.processes)
+    print(f"Depth {args.depth}: {result['nodes']} nodes in {result['seconds']:.3f} s "
+          f"({result['nodes_per_second']:.0f} nodes/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@ class Player:
     """
         Represents a player in the game, storing their name and assigned color.
         """
+    __slots__ = ("name", "color")
+
     def __init__(self, name, color):
         """
                 Initializes a new player with the given name and color.
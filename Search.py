@@ -0,0 +1,287 @@
+import argparse
+import json
+import struct
+import time
+from multiprocessing import Pool, util
+
+from BoardGeometry import COLOR_INDEX, PLAYER_COLORS
+from ComputerPlayer import FEATURES, ComputerPlayer, HeuristicComputerPlayer, move_time_budget, position_features
+from GameLogic import GameLogic
+from Moves import decode_move, move_end, move_start, pack_move
+from Perft import load_fixtures, setup_position
+from SharedTable import SharedTable, attached_table, table_key
+
+# Search values are floats, stored in the table as the 64 bits of a double
+VALUE_BITS = struct.Struct("<d")
+VALUE_WORD = struct.Struct("<Q")
+_private_tables = {}
+
+
+def value_to_word(value):
+    """
+        Packs a search value into a table value.
+        """
+    return VALUE_WORD.unpack(VALUE_BITS.pack(value))[0]
+
+
+def word_to_value(word):
+    """
+        Unpacks a table value into a search value.
+        """
+    return VALUE_BITS.unpack(VALUE_WORD.pack(word))[0]
+
+
+class ParanoidSearch:
+    """
+        A fixed-depth minimax search for one color, which assumes all other players play against it ('paranoid'
+        search). Leaves are scored by the weighted features of the color minus the average of its opponents'. Every
+        searched position is stored in a SharedTable keyed by position, depth, turn and searching color, so positions
+        reached by different move orders, or already searched by another process, are not searched again. All users
+        of a table must use the same weights.
+        """
+
+    def __init__(self, game_logic, color, weights, table):
+        """
+            Initializes a search of the given game, which it plays moves on and takes back.
+                """
+        self.game_logic = game_logic
+        self.color = color
+        self.weights = weights
+        self.table = table
+        self.colors = PLAYER_COLORS[:game_logic.num_players]
+        goal_player = ComputerPlayer(color, game_logic)
+        self.goals = {other: goal_player.goal_position(game_logic, other) for other in self.colors}
+        self.nodes = 0
+
+    def evaluate(self):
+        """
+            Scores the current position for the searching color.
+                """
+        scores = {}
+        for color in self.colors:
+            features = position_features(self.game_logic, color, self.goals[color])
+            scores[color] = sum(self.weights[name] * features[name] for name in FEATURES)
+        opponents = [scores[color] for color in self.colors if color != self.color]
+        return scores[self.color] - sum(opponents) / len(opponents)
+
+    def value(self, turn, depth):
+        """
+            Returns the minimax value of the current position with colors[turn] to move, searched depth moves deep.
+            A player without moves passes.
+                """
+        game_logic = self.game_logic
+        key = table_key(game_logic.position_hash, depth, turn, COLOR_INDEX[self.color])
+        stored = self.table.probe(key)
+        if stored is not None:
+            return word_to_value(stored)
+        self.nodes += 1
+        if depth == 0:
+            value = self.evaluate()
+        else:
+            color = self.colors[turn]
+            next_turn = (turn + 1) % len(self.colors)
+            moves = game_logic.legal_move_codes(color)
+            if not moves:
+                value = self.value(next_turn, depth - 1)
+            else:
+                color_index = COLOR_INDEX[color]
+                values = []
+                for move in moves:
+                    game_logic.make_packed_move(move)
+                    values.append(self.value(next_turn, depth - 1))
+                    game_logic.make_packed_move(pack_move(color_index, move_end(move), move_start(move)))
+                value = max(values) if color == self.color else min(values)
+        self.table.store(key, value_to_word(value))
+        return value
+
+    def root_move_value(self, move, depth):
+        """
+            Returns the value of playing a packed move of the searching color, followed by depth - 1 more moves.
+                """
+        game_logic = self.game_logic
+        turn = self.colors.index(self.color)
+        game_logic.make_packed_move(move)
+        value = self.value((turn + 1) % len(self.colors), depth - 1)
+        game_logic.make_packed_move(pack_move(COLOR_INDEX[self.color], move_end(move), move_start(move)))
+        return value
+
+
+def private_table(num_entries):
+    """
+        Returns a table used by this process only, for comparing against a shared one. It is freed when the
+        process exits.
+        """
+    if num_entries not in _private_tables:
+        table = SharedTable(num_entries)
+        util.Finalize(table, table.close, exitpriority=10)
+        _private_tables[num_entries] = table
+    return _private_tables[num_entries]
+
+
+def search_root_move(task):
+    """
+        Searches one root move in a pool worker, on a fresh copy of the game.
+
+        :param task: A tuple (board, num_players, size, color, weights, depth, packed move, table), where table is
+                     the name of a shared table or the number of entries of a private one.
+        :return: A tuple (value, nodes searched, table counts).
+        """
+    board, num_players, size, color, weights, depth, move, table = task
+    game_logic = GameLogic(num_players, size)
+    game_logic.board = [row[:] for row in board]
+    game_logic.position_hash = game_logic.compute_hash()
+    if isinstance(table, str):
+        table = attached_table(table)
+    else:
+        table = private_table(table)
+        table.clear()  # Values from an earlier search of another position or with other weights must not leak in
+    search = ParanoidSearch(game_logic, color, weights, table)
+    return search.root_move_value(move, depth), search.nodes, table.take_counts()
+
+
+def search_moves(game_logic, color, depth, weights, table, pool=None, shared=True):
+    """
+        Finds the search value of every legal move of a color, splitting the moves over a process pool if given.
+        Workers share the table, so a position one worker has searched is a table hit for all the others.
+
+        :param shared: If False, every worker uses a private table of the same size instead, which shows how much
+                       work sharing saves.
+        :return: A tuple (list of ((start_pos, end_pos), value) in move generation order, nodes searched). The
+                 table's counts include those of the workers.
+        """
+    moves = game_logic.legal_move_codes(color)
+    if pool is None:
+        search = ParanoidSearch(game_logic, color, weights, table)
+        values = [search.root_move_value(move, depth) for move in moves]
+        nodes = search.nodes
+    else:
+        board = [row[:] for row in game_logic.board]
+        table_arg = table.name if shared else table.num_entries
+        results = pool.map(search_root_move, [(board, game_logic.num_players, game_logic.geometry.size, color,
+                                               weights, depth, move, table_arg) for move in moves], chunksize=1)
+        values = [value for value, _, _ in results]
+        nodes = sum(worker_nodes for _, worker_nodes, _ in results)
+        for _, _, counts in results:
+            table.add_counts(counts)
+    geometry = game_logic.geometry
+    return [(decode_move(geometry, move)[1:], value) for move, value in zip(moves, values)], nodes
+
+
+class LookaheadComputerPlayer(HeuristicComputerPlayer):
+    """
+        A computer player that looks several moves ahead with a paranoid search, breaking ties at random. On a
+        clock it deepens the search one move at a time while its share of the time left allows. The search keeps
+        its transposition table for the whole game and can spread its root moves over worker processes that share
+        the table. Call close() when the game is over.
+        """
+    __slots__ = ("depth", "table", "pool", "last_depth")
+
+    def __init__(self, color, game_logic, rng=None, weights=None, depth=2, processes=1, table_entries=1 << 20):
+        """
+            Initializes the player.
+
+            :param depth: How many moves, of all players, to look ahead at most.
+            :param processes: Number of search processes. With 1, the search runs in this process.
+            :param table_entries: Size of the transposition table, see SharedTable.
+                """
+        super().__init__(color, game_logic, rng, weights)
+        self.depth = depth
+        self.table = SharedTable(table_entries)
+        self.pool = Pool(processes) if processes > 1 else None
+        self.last_depth = None  # The depth of the search that chose the last move
+
+    def choose_move(self, game_logic, computer_player, time_left=None):
+        """
+            Chooses the move with the best search value, or None if no moves are possible. Without a clock the
+            search goes depth moves deep. With one, it searches 1, 2, ... moves deep, and stops before an iteration
+            that would overrun move_time_budget(time_left), expecting each iteration to grow by as much as the last.
+                """
+        budget = move_time_budget(time_left)
+        started = time.perf_counter()
+        iteration_seconds = []
+        scored_moves = []
+        for depth in range(1, self.depth + 1) if budget is not None else [self.depth]:
+            iteration_started = time.perf_counter()
+            scored_moves = self.score_moves(game_logic, computer_player, depth)
+            iteration_seconds.append(time.perf_counter() - iteration_started)
+            self.last_depth = depth
+            if budget is not None and depth < self.depth:
+                if len(iteration_seconds) > 1 and iteration_seconds[-2] > 0:
+                    growth = iteration_seconds[-1] / iteration_seconds[-2]
+                else:
+                    growth = len(scored_moves)  # Every move of the next player, after each of this one's
+                if time.perf_counter() - started + iteration_seconds[-1] * growth > budget:
+                    break
+        if not scored_moves:
+            return None
+        best_score = max(score for _, score in scored_moves)
+        return self.rng.choice([move for move, score in scored_moves if score == best_score])
+
+    def score_moves(self, game_logic, player, depth=None):
+        """
+            Scores every possible move by its search value.
+
+            :param depth: How many moves to look ahead, by default the player's depth.
+            :return: A list of (move, score) tuples in move generation order.
+                """
+        return search_moves(game_logic, player.color[0], depth or self.depth, self.weights, self.table,
+                            self.pool)[0]
+
+    def close(self):
+        """
+            Stops the worker processes and frees the table.
+                """
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+        self.table.close()
+
+
+def benchmark_search(position, depth, processes=1, shared=True, table_entries=1 << 20):
+    """
+        Times one search of every root move of the player to move.
+
+        :param position: A dictionary with num_players, size, the moves leading to the position and the turn index,
+                         as in the perft fixtures.
+        :return: A dictionary with the nodes searched, the elapsed seconds and the table statistics. The fill is
+                 left out when workers use private tables.
+        """
+    game_logic = setup_position(position["num_players"], position["size"], position["moves"])
+    color = PLAYER_COLORS[position["turn"]]
+    weights = HeuristicComputerPlayer(color, game_logic).weights
+    pool = Pool(processes) if processes > 1 else None
+    try:
+        with SharedTable(table_entries) as table:
+            started = time.perf_counter()
+            _, nodes = search_moves(game_logic, color, depth, weights, table, pool, shared)
+            seconds = time.perf_counter() - started
+            result = {"processes": processes, "shared": shared, "nodes": nodes, "seconds": seconds}
+            result.update(table.stats())
+            if pool is not None and not shared:
+                del result["fill"]  # The workers filled their private tables, not this one
+    finally:
+        if pool is not None:
+            pool.close()  # Not terminate, so workers free their private tables
+            pool.join()
+    return result
+
+
+def main():
+    """
+        Command line entry point: compares the search with one process, with workers sharing a table and with
+        workers that each have their own.
+        """
+    parser = argparse.ArgumentParser(description="Benchmark the multi-process search with a shared table.")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--position", default="midgame_2_players", help="Name of a perft fixture position.")
+    parser.add_argument("--table-entries", type=int, default=1 << 20)
+    args = parser.parse_args()
+    position = next(fixture for fixture in load_fixtures() if fixture["name"] == args.position)
+    for processes, shared in ((1, True), (args.processes, True), (args.processes, False)):
+        print(json.dumps(benchmark_search(position, args.depth, processes, shared, args.table_entries)))
+
+
+if __name__ == "__main__":
+    main()
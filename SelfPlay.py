@@ -0,0 +1,95 @@
+import random
+import time
+
+from BoardGeometry import PLAYER_COLORS, STANDARD_SIZE
+from GameLogic import GameLogic
+from ComputerPlayer import ENGINES, load_weights
+from Adjudication import GameAdjudicator, DEFAULT_REPETITION_LIMIT, DEFAULT_NO_PROGRESS_PLIES
+from Moves import MoveHistory
+from GameClock import GameClock
+
+
+class GameRecord:
+    """
+        The outcome of one headless game: the moves played in order, the winner, and how the game ended.
+        """
+    __slots__ = ("num_players", "seed", "moves", "winner", "termination", "times")
+
+    def __init__(self, num_players, seed, moves, winner, termination="win", times=None):
+        """
+            Initializes a game record.
+
+            :param num_players: Number of players, seated in color order.
+            :param seed: The seed the game was played with, or None if no seed reproduces it.
+            :param moves: The (color, start_pos, end_pos) moves in order, usually a MoveHistory. Passed turns are not
+                          recorded.
+            :param winner: The color of the winner, or None for a draw.
+            :param termination: 'win' if the winner finished, 'time' if a player ran out of time, otherwise the
+                                GameAdjudicator reason for stopping.
+            :param times: The seconds each turn took, passes included, for games played with a clock.
+                """
+        self.num_players = num_players
+        self.seed = seed
+        self.moves = moves
+        self.winner = winner
+        self.termination = termination
+        self.times = times
+
+
+def play_self_play_game(num_players=2, engine="heuristic", seed=None, max_plies=400, on_move=None,
+                        size=STANDARD_SIZE, repetition_limit=DEFAULT_REPETITION_LIMIT,
+                        no_progress_plies=DEFAULT_NO_PROGRESS_PLIES, time_control=None, timer=time.monotonic,
+                        weights_version=None):
+    """
+        Plays one game between computer players without any user interface.
+
+        :param num_players: Number of computer players.
+        :param engine: Name of the engine in ComputerPlayer.ENGINES used for every seat.
+        :param seed: Seed for the players' random choices, so the same seed replays the same game.
+        :param max_plies: Hard bound on the number of turns.
+        :param on_move: Optional callback called as on_move(game_logic, color, move) before each move is made.
+        :param size: The board size, see BoardGeometry.
+        :param repetition_limit: Stop when a position repeats this often, see GameAdjudicator.
+        :param no_progress_plies: Stop after this many plies without progress, see GameAdjudicator.
+        :param time_control: An optional GameClock.TimeControl for every seat. A player who runs out of time loses.
+        :param timer: The clock's time source, replaceable for tests.
+        :param weights_version: The version of the tuned weights the engines evaluate with, or None for
+                                DEFAULT_WEIGHTS; see load_weights.
+        :return: A GameRecord. Games stopped early are scored by remaining distance.
+        """
+    rng = random.Random(seed)
+    game_logic = GameLogic(num_players, size)
+    weights = load_weights(version=weights_version)
+    players = [ENGINES[engine](color, game_logic, rng, weights) for color in PLAYER_COLORS[:num_players]]
+    adjudicator = GameAdjudicator(game_logic, PLAYER_COLORS[:num_players], repetition_limit, no_progress_plies,
+                                  max_plies)
+    clock = GameClock(time_control, PLAYER_COLORS[:num_players], timer) if time_control is not None else None
+    times = [] if clock is not None else None
+    moves = MoveHistory(game_logic.geometry)
+    ply = 0
+    try:
+        while True:
+            player = players[ply % num_players]
+            if clock is not None:
+                clock.start(player.color)
+            move = player.choose_move(game_logic, player, clock.time_left() if clock is not None else None)
+            if clock is not None:
+                elapsed, flag_fell = clock.stop()
+                times.append(elapsed)
+                if flag_fell:
+                    winner, _ = adjudicator.adjudicate(excluded=[player.color])
+                    return GameRecord(num_players, seed, moves, winner, "time", times)
+            if move is not None:  # A player without moves passes
+                if on_move is not None:
+                    on_move(game_logic, player.color, move)
+                game_logic.make_move([(player.color,) + move])
+                moves.append((player.color,) + move)
+                if game_logic.check_win_condition(player.color):
+                    return GameRecord(num_players, seed, moves, player.color, times=times)
+            ply += 1
+            if adjudicator.record_ply(player.color):
+                winner, _ = adjudicator.adjudicate()
+                return GameRecord(num_players, seed, moves, winner, adjudicator.reason, times)
+    finally:
+        for player in players:
+            player.close()
@@ -0,0 +1,173 @@
+import random
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Entries are two 64-bit words: the key XOR the data, then the data. A reader only accepts an entry whose words
+# XOR back to the key it looks for, so an entry torn by two processes writing it at once reads as a miss instead of
+# returning another position's data, and no locks are needed.
+WORDS_PER_ENTRY = 2
+WORD_BYTES = 8
+# Random keys that fold a search context (depth, turn, ...) into a position hash, one row per context value
+MAX_CONTEXT_VALUE = 64
+_context_rng = random.Random(20240611)
+CONTEXT_KEYS = [[_context_rng.getrandbits(64) for _ in range(MAX_CONTEXT_VALUE)] for _ in range(4)]
+STAT_NAMES = ["probes", "hits", "collisions", "stores", "replacements"]
+
+
+def table_key(position_hash, *context):
+    """
+        Combines a position hash with up to four small ints, such as the remaining depth and the side to move, into
+        one table key, so the same position searched in different contexts gets different entries.
+        """
+    key = position_hash
+    for keys, value in zip(CONTEXT_KEYS, context):
+        key ^= keys[value]
+    return key
+
+
+class SharedTable:
+    """
+        A fixed-size hash table of 64-bit keys and 64-bit values in shared memory, which every process of a search
+        can read and write. Each key has a single slot, and storing always replaces what was there. Every process
+        counts its own probes, hits, collisions and replacements; see stats.
+        """
+
+    def __init__(self, num_entries=1 << 20, name=None):
+        """
+            Creates a new, empty table, or attaches to an existing one.
+
+            :param num_entries: Number of entries, rounded up to a power of two. Each takes 16 bytes. Ignored when
+                                attaching.
+            :param name: The name of an existing table to attach to, see SharedTable.name.
+                """
+        if name is None:
+            num_entries = 1 << max(num_entries - 1, 1).bit_length()
+            self.memory = shared_memory.SharedMemory(create=True, size=num_entries * WORDS_PER_ENTRY * WORD_BYTES)
+            self.owner = True
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.words = self.memory.buf.cast("Q")  # New shared memory is zero-filled, so every entry starts empty
+        self.num_entries = 1 << (len(self.words) // WORDS_PER_ENTRY).bit_length() - 1
+        self.mask = self.num_entries - 1
+        self.counts = dict.fromkeys(STAT_NAMES, 0)
+
+    @property
+    def name(self):
+        """
+            The name other processes attach to the table with.
+                """
+        return self.memory.name
+
+    def probe(self, key):
+        """
+            Looks up a key.
+
+            :return: The stored value, or None if the key is not in the table.
+                """
+        counts = self.counts
+        counts["probes"] += 1
+        slot = (key & self.mask) * WORDS_PER_ENTRY
+        check, value = self.words[slot], self.words[slot + 1]
+        if check ^ value == key:
+            counts["hits"] += 1
+            return value
+        if check or value:
+            counts["collisions"] += 1  # The slot holds another key, or a torn entry
+        return None
+
+    def store(self, key, value):
+        """
+            Stores the value of a key, replacing the entry in its slot.
+
+            :param value: An int in [0, 2 ** 64).
+                """
+        counts = self.counts
+        counts["stores"] += 1
+        words = self.words
+        slot = (key & self.mask) * WORDS_PER_ENTRY
+        if (words[slot] or words[slot + 1]) and words[slot] ^ words[slot + 1] != key:
+            counts["replacements"] += 1
+        words[slot] = key ^ value
+        words[slot + 1] = value
+
+    def clear(self):
+        """
+            Empties the table and resets the statistics of this process.
+                """
+        self.memory.buf[:len(self.words) * WORD_BYTES] = bytes(len(self.words) * WORD_BYTES)
+        self.counts = dict.fromkeys(STAT_NAMES, 0)
+
+    def take_counts(self):
+        """
+            Returns the counts of this process since the last call, and resets them. Search workers send them to
+            the process that owns the table, which adds them up with add_counts.
+                """
+        counts, self.counts = self.counts, dict.fromkeys(STAT_NAMES, 0)
+        return counts
+
+    def add_counts(self, counts):
+        """
+            Adds counts taken in another process to the counts of this one.
+                """
+        for stat in STAT_NAMES:
+            self.counts[stat] += counts[stat]
+
+    def fill(self):
+        """
+            Returns the fraction of entries in use.
+                """
+        entries = np.frombuffer(self.memory.buf, dtype=np.uint64,
+                                count=self.num_entries * WORDS_PER_ENTRY).reshape(-1, WORDS_PER_ENTRY)
+        used = int(entries.any(axis=1).sum())
+        del entries  # The view must be gone before the memory can be closed
+        return used / self.num_entries
+
+    def stats(self):
+        """
+            Returns the counts of this process, plus those added with add_counts, with the hit rate and the
+            collision rate over all probes and the fraction of entries in use.
+                """
+        stats = dict(self.counts)
+        probes = max(stats["probes"], 1)
+        stats["hit_rate"] = stats["hits"] / probes
+        stats["collision_rate"] = stats["collisions"] / probes
+        stats["fill"] = self.fill()
+        return stats
+
+    def close(self):
+        """
+            Detaches from the table, and frees it if this process created it.
+                """
+        if self.words is None:
+            return
+        self.words.release()
+        self.words = None
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+    def __del__(self):
+        # The view of the memory has to go first, or SharedMemory cannot close its mapping
+        if getattr(self, "words", None) is not None:
+            self.words.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+_attached_tables = {}
+
+
+def attached_table(name):
+    """
+        Returns this process's attachment to a shared table, attaching on first use. Lets pool workers reach the
+        table of the process that started them without attaching once per task.
+        """
+    if name not in _attached_tables:
+        _attached_tables[name] = SharedTable(name=name)
+    return _attached_tables[name]
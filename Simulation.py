@@ -0,0 +1,198 @@
+import argparse
+import json
+import os
+import tempfile
+from functools import partial
+from multiprocessing import Pool
+
+from BoardGeometry import STANDARD_SIZE
+from SelfPlay import play_self_play_game
+
+MANIFEST_FILE = "run.json"
+AGGREGATE_FILE = "aggregate.json"
+SHARD_FILE_PATTERN = "shard_{index:06d}.json"
+
+
+def atomic_write_json(path, data):
+    """
+        Writes JSON to a file atomically: the data is written to a temporary file in the same directory, flushed to
+        disk and renamed over the target, so readers see either the old or the new file, never a partial one.
+        """
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temporary_path = tempfile.mkstemp(dir=directory, prefix=".tmp_")
+    try:
+        with os.fdopen(descriptor, "w") as temporary_file:
+            json.dump(data, temporary_file, sort_keys=True, indent=1)
+            temporary_file.flush()
+            os.fsync(temporary_file.fileno())
+        os.replace(temporary_path, path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+
+def empty_aggregate():
+    """
+        Returns the aggregate of zero games.
+        """
+    return {"games": 0, "plies": 0, "draws": 0, "wins": {}, "terminations": {}}
+
+
+def merge_aggregates(total, part):
+    """
+        Adds the counts of one aggregate to another, in place. Only integer counts are kept, so the result does
+        not depend on the order in which shards are merged.
+        """
+    for key in ("games", "plies", "draws"):
+        total[key] += part[key]
+    for key in ("wins", "terminations"):
+        for name, count in part[key].items():
+            total[key][name] = total[key].get(name, 0) + count
+    return total
+
+
+def run_shard(config, shard_index):
+    """
+        Plays the games of one shard. Game i of the run is always played with seed config['seed'] + i, so a shard
+        produces the same result no matter when or where it runs.
+
+        :return: The shard's aggregate, with its index.
+        """
+    first_game = shard_index * config["shard_size"]
+    last_game = min(first_game + config["shard_size"], config["games"])
+    result = empty_aggregate()
+    for game_index in range(first_game, last_game):
+        record = play_self_play_game(config["num_players"], config["engine"], config["seed"] + game_index,
+                                     config["max_plies"], size=config["size"],
+                                     weights_version=config["weights_version"])
+        merge_aggregates(result, {"games": 1, "plies": len(record.moves), "draws": int(record.winner is None),
+                                  "wins": {record.winner: 1} if record.winner else {},
+                                  "terminations": {record.termination: 1}})
+    result["shard"] = shard_index
+    return result
+
+
+class SimulationRun:
+    """
+        A resumable batch of self-play games. The games are split into seeded shards, and every finished shard and
+        the running aggregate are checkpointed atomically in a directory. Restarting a run with the same directory
+        skips the finished shards and produces the same aggregate as an uninterrupted run.
+        """
+
+    def __init__(self, checkpoint_dir, games, shard_size=50, seed=0, num_players=2, engine="heuristic",
+                 max_plies=400, size=STANDARD_SIZE, weights_version=None):
+        """
+            Initializes the run. The configuration is stored in the checkpoint directory on the first run, and a
+            restart with a different configuration is refused.
+
+            :param weights_version: The version of the tuned weights the engines play with, or None for
+                                    DEFAULT_WEIGHTS; see ComputerPlayer.load_weights. It is part of the
+                                    configuration, so shards played with different weights are never mixed.
+                """
+        self.checkpoint_dir = checkpoint_dir
+        self.config = {"games": games, "shard_size": shard_size, "seed": seed, "num_players": num_players,
+                       "engine": engine, "max_plies": max_plies, "size": size, "weights_version": weights_version}
+        self.num_shards = -(-games // shard_size)
+
+    def shard_path(self, shard_index):
+        """
+            Returns the checkpoint file of a shard.
+                """
+        return os.path.join(self.checkpoint_dir, SHARD_FILE_PATTERN.format(index=shard_index))
+
+    def aggregate_path(self):
+        """
+            Returns the checkpoint file of the running aggregate.
+                """
+        return os.path.join(self.checkpoint_dir, AGGREGATE_FILE)
+
+    def finished_shards(self):
+        """
+            Returns the indices of the shards that already have a checkpoint.
+                """
+        return [index for index in range(self.num_shards) if os.path.exists(self.shard_path(index))]
+
+    def prepare(self):
+        """
+            Creates the checkpoint directory and stores or checks the run configuration.
+                """
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        manifest_path = os.path.join(self.checkpoint_dir, MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as manifest_file:
+                stored = json.load(manifest_file)
+            if stored != self.config:
+                changed = sorted(key for key in set(stored) | set(self.config)
+                                 if stored.get(key) != self.config.get(key))
+                raise ValueError(f"{self.checkpoint_dir} holds a run with a different configuration "
+                                 f"({', '.join(changed)}).")
+        else:
+            atomic_write_json(manifest_path, self.config)
+
+    def aggregate(self):
+        """
+            Merges the checkpoints of all finished shards, in shard order.
+                """
+        total = empty_aggregate()
+        finished = self.finished_shards()
+        for index in finished:
+            with open(self.shard_path(index)) as shard_file:
+                merge_aggregates(total, json.load(shard_file))
+        total["shards"] = len(finished)
+        return total
+
+    def run(self, processes=None, on_shard=None, max_shards=None):
+        """
+            Plays all unfinished shards in a process pool, checkpointing each one as it completes.
+
+            :param processes: Size of the process pool.
+            :param on_shard: Optional callback called with each finished shard's result.
+            :param max_shards: Stop after this many shards, e.g. to split a run over several sessions.
+            :return: The aggregate over all finished shards.
+                """
+        self.prepare()
+        finished = set(self.finished_shards())
+        pending = [index for index in range(self.num_shards) if index not in finished][:max_shards]
+        aggregate_path = self.aggregate_path()
+        aggregate = self.aggregate()
+        if pending:
+            with Pool(processes) as pool:
+                for result in pool.imap_unordered(partial(run_shard, self.config), pending):
+                    # The shard is checkpointed before it is counted, so a crash in between only redoes the shard
+                    atomic_write_json(self.shard_path(result["shard"]), result)
+                    merge_aggregates(aggregate, result)
+                    aggregate["shards"] += 1
+                    atomic_write_json(aggregate_path, aggregate)
+                    if on_shard is not None:
+                        on_shard(result)
+        atomic_write_json(aggregate_path, aggregate)
+        return aggregate
+
+
+def main():
+    """
+        Command line entry point: runs or resumes a batch simulation.
+        """
+    parser = argparse.ArgumentParser(description="Run a resumable batch of self-play games.")
+    parser.add_argument("checkpoint_dir", help="Directory for checkpoints; reuse it to resume a run.")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--shard-size", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--players", type=int, default=2)
+    parser.add_argument("--engine", default="heuristic")
+    parser.add_argument("--max-plies", type=int, default=400)
+    parser.add_argument("--size", type=int, default=STANDARD_SIZE)
+    parser.add_argument("--weights-version", type=int, default=None,
+                        help="Tuned weights the engines play with, see Tuner.py. The default weights if not given.")
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+    run = SimulationRun(args.checkpoint_dir, args.games, args.shard_size, args.seed, args.players, args.engine,
+                        args.max_plies, args.size, args.weights_version)
+    aggregate = run.run(args.processes,
+                        on_shard=lambda result: print(f"Shard {result['shard']} finished: {result['games']} games"))
+    print(json.dumps(aggregate, sort_keys=True, indent=1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+from collections import OrderedDict
+
+
+def to_cube(position, center):
+    """
+        Converts a (row, col) board position to cube coordinates relative to the center hole.
+        """
+    dr, dc = position[0] - center[0], position[1] - center[1]
+    x = (dc - dr) // 2
+    return x, -x - dr, dr
+
+
+def rotate(cube):
+    """
+        Rotates cube coordinates by 60 degrees around the center hole.
+        """
+    x, y, z = cube
+    return -z, -x, -y
+
+
+def reflect(cube):
+    """
+        Reflects cube coordinates across the axis through the center hole that keeps x fixed.
+        """
+    x, y, z = cube
+    return x, z, y
+
+
+def from_cube(cube, center):
+    """
+        Converts cube coordinates relative to the center hole back to a (row, col) board position.
+        """
+    x, _, z = cube
+    return center[0] + z, center[1] + 2 * x + z
+
+
+class Symmetry:
+    """
+        Precomputed cell permutations for the 12 rotations and reflections of the star board, and the matching
+        relabeling of colors whose home triangles map onto each other.
+        """
+
+    def __init__(self, game_logic):
+        """
+            Builds the permutation tables for the board of the given game logic.
+                """
+        self.center = game_logic.geometry.center
+        self.cells = game_logic.playable_positions()
+        self.index = {cell: i for i, cell in enumerate(self.cells)}
+        homes = {color: frozenset(positions) for color, positions in game_logic.get_player_positions().items()}
+
+        self.permutations = []  # permutations[t][i] is the index cell i is sent to by transform t
+        self.color_maps = []  # color_maps[t][color] is the color whose home is the image of color's home
+        for reflected in (False, True):  # The 6 rotations, then the 6 rotations of the mirror image
+            for turns in range(6):
+                mapping = {}
+                for cell in self.cells:
+                    cube = to_cube(cell, self.center)
+                    if reflected:
+                        cube = reflect(cube)
+                    for _ in range(turns):
+                        cube = rotate(cube)
+                    mapping[cell] = from_cube(cube, self.center)
+                self.permutations.append([self.index[mapping[cell]] for cell in self.cells])
+                color_map = {'E': 'E'}
+                for color, home in homes.items():
+                    image = frozenset(mapping[cell] for cell in home)
+                    color_map[color] = next(c for c, h in homes.items() if h == image)
+                self.color_maps.append(color_map)
+        self.inverses = []
+        for permutation in self.permutations:
+            inverse = [0] * len(permutation)
+            for i, j in enumerate(permutation):
+                inverse[j] = i
+            self.inverses.append(inverse)
+        self.color_tables = [str.maketrans(color_map) for color_map in self.color_maps]
+
+    def cell_values(self, board):
+        """
+            Returns the contents of the playable cells of a board in canonical cell order.
+                """
+        return [board[row][col] for row, col in self.cells]
+
+    def transform(self, values, side, transform):
+        """
+            Applies a transform to cell values and the side to move. Returns (key, side).
+                """
+        image_side = self.color_maps[transform][side]
+        # The cell sent to index j comes from index inverse[j]; colors are relabeled in one pass over the string
+        image = ''.join([values[i] for i in self.inverses[transform]]).translate(self.color_tables[transform])
+        return image_side + image, image_side
+
+    def canonicalize(self, board, side):
+        """
+            Maps a position and side to move to its canonical form.
+
+            :return: A tuple (key, canonical_side, transform), where transform is the index of the symmetry that
+                     maps the given position onto the canonical one.
+                """
+        values = self.cell_values(board)
+        best = None
+        for transform in range(len(self.permutations)):
+            key, canonical_side = self.transform(values, side, transform)
+            if best is None or key < best[0]:
+                best = (key, canonical_side, transform)
+        return best
+
+    def map_position(self, position, transform):
+        """
+            Maps a board position through a transform.
+                """
+        return self.cells[self.permutations[transform][self.index[position]]]
+
+    def unmap_position(self, position, transform):
+        """
+            Maps a board position back through the inverse of a transform.
+                """
+        return self.cells[self.inverses[transform][self.index[position]]]
+
+    def map_move(self, move, transform):
+        """
+            Maps a move (start_pos, end_pos, ...) into the canonical frame.
+                """
+        return tuple(self.map_position(position, transform) for position in move)
+
+    def unmap_move(self, move, transform):
+        """
+            Maps a move from the canonical frame back to the frame of the original position.
+                """
+        return tuple(self.unmap_position(position, transform) for position in move)
+
+
+class SymmetricCache:
+    """
+        A position cache keyed by canonical form, so that all symmetric variants of a position share one entry.
+        Stored moves are kept in the canonical frame and mapped back on lookup.
+        """
+
+    def __init__(self, symmetry, max_entries=None):
+        """
+            Initializes an empty cache over the given symmetry tables.
+
+            :param max_entries: How many positions to keep, least recently used first out, or None for no bound.
+                """
+        self.symmetry = symmetry
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def store(self, board, side, value, move=None, canonical=None):
+        """
+            Stores a value, and optionally a move, for a position.
+
+            :param canonical: The position's Symmetry.canonicalize result, if the caller already has it.
+                """
+        key, _, transform = canonical or self.symmetry.canonicalize(board, side)
+        if move is not None:
+            move = self.symmetry.map_move(move, transform)
+        self.entries[key] = (value, move)
+        self.entries.move_to_end(key)
+        if self.max_entries is not None and len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def lookup(self, board, side, canonical=None):
+        """
+            Returns (value, move) for a position or any of its symmetric variants, or None when not cached.
+
+            :param canonical: The position's Symmetry.canonicalize result, if the caller already has it.
+                """
+        key, _, transform = canonical or self.symmetry.canonicalize(board, side)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        value, move = entry
+        if move is not None:
+            move = self.symmetry.unmap_move(move, transform)
+        return value, move
+
+    def __len__(self):
+        return len(self.entries)
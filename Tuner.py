@@ -0,0 +1,173 @@
+import argparse
+import datetime
+import json
+import os
+
+import numpy as np
+
+from BoardGeometry import PLAYER_COLORS, size_for_holes
+from GameLogic import GameLogic
+from ComputerPlayer import (ComputerPlayer, FEATURES, DEFAULT_WEIGHTS_DIR, WEIGHTS_FILE_PATTERN, hex_distance,
+                            weight_versions)
+
+
+class FeatureTables:
+    """
+        Lookup tables over the playable holes that let position features be computed for many positions at once.
+        """
+
+    def __init__(self, game_logic):
+        """
+            Builds the tables for the board of the given game logic.
+                """
+        geometry = game_logic.geometry
+        positions = geometry.positions
+        num_holes = len(positions)
+        goal_player = ComputerPlayer(None, game_logic)
+        goals = [goal_player.goal_position(game_logic, color) for color in PLAYER_COLORS]
+
+        # distances[c, i]: steps from hole i to the goal of color c
+        self.distances = np.array([[hex_distance(position, goal) for position in positions] for goal in goals])
+        # neighbors[i, d] and jumps[i, d]: the hole one and two steps away in direction d, or num_holes if off board.
+        # Index num_holes addresses an extra always-empty, never-occupied padding column.
+        self.neighbors = np.array([[num_holes if hole is None else hole for hole in holes]
+                                   for holes in geometry.neighbors])
+        self.jumps = np.array([[num_holes if hole is None else hole for hole in holes] for holes in geometry.jumps])
+        padded = np.concatenate([self.distances, np.full((len(goals), 1), np.iinfo(np.int64).max)], axis=1)
+        # forward[c, i, d]: the step from hole i in direction d exists and brings color c closer to its goal
+        self.forward = padded[:, self.neighbors] < self.distances[:, :, None]
+        self.forward_jump = self.forward & (padded[:, self.jumps] < self.distances[:, :, None])
+
+
+def color_features(pieces, tables, side=None):
+    """
+        Computes the features of every color for a chunk of encoded positions.
+
+        :param pieces: A (positions x colors x holes) boolean array.
+        :param side: Optionally, one color index per position, to compute the features of that color only.
+        :return: A (positions x colors x features) float array, with features in FEATURES order, or a
+                 (positions x 1 x features) array if side is given.
+        """
+    occupied = pieces.any(axis=1)
+    occupied = np.concatenate([occupied, np.zeros((len(occupied), 1), dtype=bool)], axis=1)
+    empty = ~occupied
+    empty[:, -1] = False
+    distances, forward, forward_jump = tables.distances, tables.forward, tables.forward_jump
+    if side is not None:
+        rows = np.arange(len(pieces))
+        pieces = pieces[rows, side][:, None]
+        distances, forward, forward_jump = distances[side][:, None], forward[side][:, None], forward_jump[side][:, None]
+
+    distance = (pieces * distances).sum(axis=2)
+    stragglers = (pieces * distances).max(axis=2)
+    empty_steps = empty[:, tables.neighbors][:, None]  # (positions x 1 x holes x directions)
+    has_forward = forward.any(axis=-1)
+    has_free_forward = (forward & empty_steps).any(axis=3)
+    blocked = (pieces & has_forward & ~has_free_forward).sum(axis=2)
+    open_jumps = (occupied[:, tables.neighbors] & empty[:, tables.jumps])[:, None]
+    jumps = (pieces[..., None] & forward_jump & open_jumps).sum(axis=(2, 3))
+    return np.stack([distance, stragglers, blocked, jumps], axis=2).astype(float)
+
+
+def extract_features(planes, side, tables, chunk_size=8192):
+    """
+        Computes the features of the side to move relative to the average of its opponents for encoded positions.
+
+        :param planes: A (positions x colors x holes) array of 0/1 planes, as written by Dataset.
+        :param side: The color index of the side to move of each position.
+        :return: A (positions x features) float array, with columns in FEATURES order.
+        """
+    result = np.empty((len(planes), len(FEATURES)))
+    for start in range(0, len(planes), chunk_size):
+        pieces = np.asarray(planes[start:start + chunk_size], dtype=bool)
+        sides = np.asarray(side[start:start + chunk_size], dtype=np.int64)
+        per_color = color_features(pieces, tables)
+
+        rows = np.arange(len(pieces))
+        active = pieces.any(axis=2)
+        own = per_color[rows, sides]
+        opponents = ((per_color * active[..., None]).sum(axis=1) - own) / np.maximum(active.sum(axis=1) - 1, 1)[:, None]
+        result[start:start + len(pieces)] = own - opponents
+    return result
+
+
+def fit_logistic(features, targets, epochs=500, learning_rate=0.1, l2=1e-4):
+    """
+        Fits a logistic model of the game result on the features with full-batch Adam, Texel style.
+
+        :param targets: 1 for a win of the side to move, 0 for a loss, 0.5 for a game without a winner.
+        :return: (weights, bias, loss) in the scale of the original features.
+        """
+    mean = features.mean(axis=0)
+    scale = features.std(axis=0)
+    scale[scale == 0] = 1.0
+    x = (features - mean) / scale
+    params = np.zeros(x.shape[1] + 1)
+    first_moment = np.zeros_like(params)
+    second_moment = np.zeros_like(params)
+    for step in range(1, epochs + 1):
+        predictions = 1.0 / (1.0 + np.exp(-(x @ params[:-1] + params[-1])))
+        error = predictions - targets
+        gradient = np.append(x.T @ error / len(x) + l2 * params[:-1], error.mean())
+        first_moment = 0.9 * first_moment + 0.1 * gradient
+        second_moment = 0.999 * second_moment + 0.001 * gradient ** 2
+        params -= (learning_rate * (first_moment / (1 - 0.9 ** step))
+                   / (np.sqrt(second_moment / (1 - 0.999 ** step)) + 1e-8))
+    predictions = np.clip(1.0 / (1.0 + np.exp(-(x @ params[:-1] + params[-1]))), 1e-12, 1 - 1e-12)
+    loss = -np.mean(targets * np.log(predictions) + (1 - targets) * np.log(1 - predictions))
+    weights = params[:-1] / scale
+    bias = params[-1] - np.sum(params[:-1] * mean / scale)
+    return weights, bias, loss
+
+
+def tune_weights(dataset_path, max_positions=None, seed=0, epochs=500):
+    """
+        Tunes evaluation weights on an exported self-play dataset.
+
+        :param max_positions: If given, tune on a random subset of this many positions.
+        :return: A dictionary with the feature weights, the bias, the final loss and the number of positions used.
+        """
+    positions = np.load(dataset_path, mmap_mode="r")
+    if max_positions is not None and max_positions < len(positions):
+        indices = np.sort(np.random.default_rng(seed).choice(len(positions), max_positions, replace=False))
+        positions = positions[indices]
+    tables = FeatureTables(GameLogic(2, size_for_holes(positions.dtype["planes"].shape[1])))
+    features = extract_features(positions["planes"], positions["side"], tables)
+    targets = (np.asarray(positions["outcome"], dtype=float) + 1.0) / 2.0
+    weights, bias, loss = fit_logistic(features, targets, epochs)
+    return {"weights": dict(zip(FEATURES, weights.tolist())),
+            "bias": float(bias),
+            "loss": float(loss),
+            "positions": int(len(features))}
+
+
+def save_weights(result, directory=DEFAULT_WEIGHTS_DIR):
+    """
+        Saves tuned weights as the next version in the weights directory. Returns the path of the new file.
+        """
+    os.makedirs(directory, exist_ok=True)
+    versions = weight_versions(directory)
+    version = versions[-1] + 1 if versions else 1
+    path = os.path.join(directory, WEIGHTS_FILE_PATTERN.format(version=version))
+    with open(path, "x") as weights_file:
+        json.dump(dict(result, version=version, created=datetime.datetime.now().isoformat()), weights_file, indent=2)
+    return path
+
+
+def main():
+    """
+        Command line entry point: tunes weights on a dataset and saves them as a new version.
+        """
+    parser = argparse.ArgumentParser(description="Tune evaluation weights on exported self-play positions.")
+    parser.add_argument("dataset", help="A dataset written by Dataset.py.")
+    parser.add_argument("--max-positions", type=int, default=None)
+    parser.add_argument("--epochs", type=int, default=500)
+    parser.add_argument("--weights-dir", default=DEFAULT_WEIGHTS_DIR)
+    args = parser.parse_args()
+    result = tune_weights(args.dataset, args.max_positions, epochs=args.epochs)
+    path = save_weights(result, args.weights_dir)
+    print(f"Saved weights {result['weights']} (loss {result['loss']:.4f}, {result['positions']} positions) to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+import argparse
+import time
+
+import numpy as np
+
+from Adjudication import DEFAULT_NO_PROGRESS_PLIES
+from BoardGeometry import COLOR_INDEX, PLAYER_COLORS, STANDARD_SIZE, BoardGeometry, get_geometry
+from ComputerPlayer import DEFAULT_WEIGHTS, FEATURES, load_weights
+from GameLogic import GameLogic
+from Moves import MoveHistory, pack_move
+from SelfPlay import GameRecord, play_self_play_game
+from Tuner import FeatureTables, color_features
+
+# Cell values: a color index for a piece, or one of these
+EMPTY = -1
+OFF_BOARD = -2  # The padding column that neighbors and jumps off the board point to
+POLICIES = ["random", "heuristic"]
+# Termination codes; 0 means the game is still running
+TERMINATIONS = [None, "win", "no_progress", "max_plies"]
+NUM_DIRECTIONS = 6
+
+
+class VectorSimulator:
+    """
+        Plays many games in lockstep with NumPy: the boards are one (games x holes) array, and every ply generates
+        the legal moves, picks one per game, plays it and checks for a win in all games at once. All games take
+        their turns together, so the color to move is the same in every game. Stalled games are stopped like
+        GameAdjudicator stops them, except that positions are not checked for repetition.
+        """
+
+    def __init__(self, num_games, num_players=2, size=STANDARD_SIZE, policy="random", weights=None, seed=None,
+                 max_plies=400, no_progress_plies=DEFAULT_NO_PROGRESS_PLIES, record_moves=False):
+        """
+            Sets up the games at the start position.
+
+            :param policy: 'random' picks a legal move uniformly, 'heuristic' picks the move with the best weighted
+                           features, like HeuristicComputerPlayer, breaking ties at random.
+            :param weights: Feature weights of the heuristic policy, by default DEFAULT_WEIGHTS.
+            :param seed: Seed for the random choices.
+            :param max_plies: Hard bound on the number of plies.
+            :param no_progress_plies: Stop a game after this many plies without a color reaching a new best
+                                      remaining distance, or None.
+            :param record_moves: Keep the moves of every game, see records.
+                """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy {policy!r}, expected one of {POLICIES}.")
+        geometry = get_geometry(size)
+        num_holes = len(geometry.positions)
+        self.geometry = geometry
+        self.num_games = num_games
+        self.colors = PLAYER_COLORS[:num_players]
+        self.policy = policy
+        self.weights = weights if weights is not None else DEFAULT_WEIGHTS
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.max_plies = max_plies
+        self.no_progress_plies = no_progress_plies
+
+        # neighbors[i, d] and jumps[i, d]: the hole one and two steps from hole i in direction d, or the padding
+        # column; destinations[i, m]: where move slot m of hole i goes, steps first, then jumps
+        self.neighbors = np.array([[num_holes if hole is None else hole for hole in holes]
+                                   for holes in geometry.neighbors])
+        self.jumps = np.array([[num_holes if hole is None else hole for hole in holes] for holes in geometry.jumps])
+        self.destinations = np.concatenate([self.neighbors, self.jumps], axis=1)
+        self.targets = np.array([[position in geometry.target_sets[color] for position in geometry.positions]
+                                 for color in PLAYER_COLORS])
+        # Remaining distance, as in Adjudication.remaining_distance: distance to the tip of the target triangle,
+        # minus that of a filled triangle
+        self.tip_distances = np.array([[BoardGeometry.distance(position, geometry.targets[color][0])
+                                        for position in geometry.positions] for color in PLAYER_COLORS])
+        self.filled_distances = np.array([
+            sum(sorted(BoardGeometry.distance(target, geometry.targets[color][0])
+                       for target in geometry.targets[color])[:len(geometry.homes[color])])
+            for color in PLAYER_COLORS])
+        self.feature_tables = FeatureTables(GameLogic(2, size)) if policy == "heuristic" else None
+
+        board = GameLogic(num_players, size).board
+        start = np.array([COLOR_INDEX.get(board[row][col], EMPTY) for row, col in geometry.positions] + [OFF_BOARD],
+                         dtype=np.int8)
+        self.cells = np.tile(start, (num_games, 1))
+        # pieces[c, g, p]: the hole of piece p of color c in game g. Moves are generated from the pieces, which
+        # are far fewer than the holes.
+        self.pieces = np.stack([np.tile(np.nonzero(start == color_index)[0], (num_games, 1))
+                                for color_index in range(num_players)])
+        self.ply = 0
+        self.winners = np.full(num_games, -1, dtype=np.int8)
+        self.terminations = np.zeros(num_games, dtype=np.int8)
+        self.plies = np.zeros(num_games, dtype=np.int32)
+        all_games = np.arange(num_games)
+        self.best_distances = np.stack([self.remaining_distances(color_index, all_games)
+                                        for color_index in range(num_players)], axis=1)
+        self.plies_without_progress = np.zeros(num_games, dtype=np.int32)
+        self.history = [] if record_moves else None  # Per ply, the packed move of every game, or -1
+
+    def active(self):
+        """
+            Returns a boolean array of the games still running.
+                """
+        return self.terminations == 0
+
+    def remaining_distances(self, color_index, games):
+        """
+            Returns, for the given games, how many single steps the color's pieces still need to fill their target.
+                """
+        return self.tip_distances[color_index][self.pieces[color_index, games]].sum(axis=1) - \
+            self.filled_distances[color_index]
+
+    def legal_moves(self, color_index, games):
+        """
+            Returns the legal moves of a color in the given games as a (games x pieces x 12) boolean array, with
+            pieces as in self.pieces. Slots 0-5 are steps and 6-11 jumps, in the directions of
+            BoardGeometry.HEX_DIRECTIONS.
+                """
+        holes = self.pieces[color_index, games]
+        cells = self.cells[games]
+        rows = np.arange(len(games))[:, None, None]
+        over = cells[rows, self.neighbors[holes]]
+        steps = over == EMPTY
+        jumps = (over >= 0) & (cells[rows, self.jumps[holes]] == EMPTY)
+        return np.concatenate([steps, jumps], axis=2)
+
+    def planes(self):
+        """
+            Encodes every board as (colors x holes) 0/1 planes, like Dataset.encode_board.
+
+            :return: A (games x colors x holes) uint8 array.
+                """
+        return (self.cells[:, None, :-1] == np.arange(len(PLAYER_COLORS))[None, :, None]).astype(np.uint8)
+
+    def heuristic_scores(self, color_index, games, holes, ends, chunk_size=8192):
+        """
+            Scores candidate moves by the weighted features of the color after the move. When only the distance
+            has a weight, as with the default weights, the score is the change in distance, computed directly.
+
+            :param games: The game of each candidate move.
+            :param holes: The start hole of each candidate move.
+            :param ends: The end hole of each candidate move.
+            :return: A float array with one score per candidate.
+                """
+        distances = self.feature_tables.distances[color_index]
+        if all(self.weights[name] == 0 for name in FEATURES if name != "distance"):
+            return self.weights["distance"] * (distances[ends] - distances[holes])
+        scores = np.empty(len(games))
+        colors = np.arange(len(PLAYER_COLORS))[None, :, None]
+        for start in range(0, len(games), chunk_size):
+            chunk = slice(start, start + chunk_size)
+            cells = self.cells[games[chunk], :-1].copy()
+            rows = np.arange(len(cells))
+            cells[rows, holes[chunk]] = EMPTY
+            cells[rows, ends[chunk]] = color_index
+            features = color_features(cells[:, None, :] == colors, self.feature_tables,
+                                      np.full(len(cells), color_index))[:, 0]
+            chunk_scores = np.zeros(len(cells))
+            for column, name in enumerate(FEATURES):
+                chunk_scores = chunk_scores + self.weights[name] * features[:, column]
+            scores[chunk] = chunk_scores
+        return scores
+
+    def choose_moves(self, color_index, games, legal):
+        """
+            Picks one legal move per game with the policy.
+
+            :param legal: The legal moves in the given games, see legal_moves.
+            :return: A tuple (games that move, their moving pieces, their move slots).
+                """
+        flat = legal.reshape(len(legal), -1)
+        keys = self.rng.random(flat.shape)
+        if self.policy == "heuristic":
+            rows, candidates = np.nonzero(flat)
+            pieces, slots = np.divmod(candidates, 2 * NUM_DIRECTIONS)
+            holes = self.pieces[color_index, games[rows], pieces]
+            scores = np.full(flat.shape, -np.inf)
+            scores[rows, candidates] = self.heuristic_scores(color_index, games[rows], holes,
+                                                             self.destinations[holes, slots])
+            flat = flat & (scores == scores.max(axis=1, keepdims=True))  # Random keys break ties between the best
+        keys[~flat] = -1.0
+        choices = keys.argmax(axis=1)
+        moving = np.nonzero(flat.any(axis=1))[0]
+        pieces, slots = np.divmod(choices[moving], 2 * NUM_DIRECTIONS)
+        return games[moving], pieces, slots
+
+    def stop(self, games, termination):
+        """
+            Stops games that are not won, naming the color with the smallest remaining distance as the winner,
+            or no winner if several colors share it.
+                """
+        if not len(games):
+            return
+        distances = np.stack([self.remaining_distances(color_index, games)
+                              for color_index in range(len(self.colors))], axis=1)
+        best = distances.min(axis=1, keepdims=True)
+        unique = (distances == best).sum(axis=1) == 1
+        self.winners[games] = np.where(unique, distances.argmin(axis=1), -1)
+        self.terminations[games] = TERMINATIONS.index(termination)
+        self.plies[games] = self.ply
+
+    def step(self):
+        """
+            Plays one ply in every running game. A color without moves passes.
+                """
+        turn = self.ply % len(self.colors)
+        color_index = COLOR_INDEX[self.colors[turn]]
+        games = np.nonzero(self.active())[0]
+        moving, pieces, slots = self.choose_moves(color_index, games, self.legal_moves(color_index, games))
+        holes = self.pieces[color_index, moving, pieces]
+        ends = self.destinations[holes, slots]
+        self.cells[moving, holes] = EMPTY
+        self.cells[moving, ends] = color_index
+        self.pieces[color_index, moving, pieces] = ends
+        if self.history is not None:
+            packed = np.full(self.num_games, -1, dtype=np.int64)
+            packed[moving] = pack_move(color_index, holes, ends)
+            self.history.append(packed)
+        self.ply += 1
+
+        won = self.targets[color_index][self.pieces[color_index, games]].all(axis=1)
+        self.winners[games[won]] = color_index
+        self.terminations[games[won]] = TERMINATIONS.index("win")
+        self.plies[games[won]] = self.ply
+        games = games[~won]
+
+        distances = self.remaining_distances(color_index, games)
+        progress = distances < self.best_distances[games, turn]
+        self.best_distances[games, turn] = np.minimum(self.best_distances[games, turn], distances)
+        self.plies_without_progress[games] = np.where(progress, 0, self.plies_without_progress[games] + 1)
+        if self.no_progress_plies is not None:
+            stalled = self.plies_without_progress[games] >= self.no_progress_plies
+            self.stop(games[stalled], "no_progress")
+            games = games[~stalled]
+        if self.ply >= self.max_plies:
+            self.stop(games, "max_plies")
+
+    def run(self, on_ply=None):
+        """
+            Plays until every game is over.
+
+            :param on_ply: Optional callback called as on_ply(simulator, color_index) before every ply, e.g. to
+                           collect training positions with planes().
+            :return: The simulator.
+                """
+        while self.active().any():
+            if on_ply is not None:
+                on_ply(self, COLOR_INDEX[self.colors[self.ply % len(self.colors)]])
+            self.step()
+        return self
+
+    def records(self):
+        """
+            Returns a GameRecord per game, with its moves if they were recorded. The games share one random
+            generator, so no seed replays a single game on its own, and the records' seed is None.
+                """
+        records = []
+        for game in range(self.num_games):
+            moves = MoveHistory(self.geometry)
+            if self.history is not None:
+                for packed in self.history[:self.plies[game]]:
+                    if packed[game] >= 0:
+                        moves.append_code(int(packed[game]))
+            winner = self.colors[self.winners[game]] if self.winners[game] >= 0 else None
+            records.append(GameRecord(len(self.colors), None, moves, winner,
+                                      TERMINATIONS[self.terminations[game]]))
+        return records
+
+
+def benchmark(num_games=1000, num_players=2, policy="heuristic", max_plies=400, baseline_games=5, seed=0):
+    """
+        Times the vectorized simulator against playing games one at a time with play_self_play_game.
+
+        :return: A dictionary with the games per second of both, and the speedup.
+        """
+    started = time.perf_counter()
+    VectorSimulator(num_games, num_players, policy=policy, seed=seed, max_plies=max_plies).run()
+    vector_rate = num_games / (time.perf_counter() - started)
+    started = time.perf_counter()
+    for game_seed in range(baseline_games):
+        play_self_play_game(num_players, policy, seed=game_seed, max_plies=max_plies)
+    baseline_rate = baseline_games / (time.perf_counter() - started)
+    return {"vector_games_per_second": vector_rate, "baseline_games_per_second": baseline_rate,
+            "speedup": vector_rate / baseline_rate}
+
+
+def main():
+    """
+        Command line entry point: plays many games at once and prints how they ended, or benchmarks the simulator.
+        """
+    parser = argparse.ArgumentParser(description="Simulate many games in lockstep with NumPy.")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--players", type=int, default=2)
+    parser.add_argument("--policy", choices=POLICIES, default="heuristic")
+    parser.add_argument("--max-plies", type=int, default=400)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--weights-version", type=int, default=None,
+                        help="Tuned weights of the heuristic policy, see Tuner.py. The default weights if not given.")
+    parser.add_argument("--benchmark", action="store_true", help="Compare against one game at a time.")
+    args = parser.parse_args()
+    if args.benchmark:
+        result = benchmark(args.games, args.players, args.policy, args.max_plies, seed=args.seed)
+        print(f"{result['vector_games_per_second']:.1f} games/s vectorized, "
+              f"{result['baseline_games_per_second']:.2f} games/s one at a time ({result['speedup']:.0f}x)")
+        return
+    started = time.perf_counter()
+    simulator = VectorSimulator(args.games, args.players, policy=args.policy,
+                                weights=load_weights(version=args.weights_version), seed=args.seed,
+                                max_plies=args.max_plies).run()
+    elapsed = time.perf_counter() - started
+    for code, termination in enumerate(TERMINATIONS[1:], start=1):
+        print(f"{termination}: {int((simulator.terminations == code).sum())}")
+    for color_index, color in enumerate(simulator.colors):
+        print(f"{color} wins: {int((simulator.winners == color_index).sum())}")
+    print(f"{args.games} games in {elapsed:.2f} s, mean length {simulator.plies.mean():.1f} plies")
+
+
+if __name__ == "__main__":
+    main()
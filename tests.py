@@ -1,4 +1,5 @@
 import pytest
+import asyncio
 from ChineseCheckers import *
 from GameLogic import *
 
@@ -179,3 +180,846 @@ def test_game_initialization_with_various_players():
     # Test with an invalid number of players
     with pytest.raises(AssertionError):
         ChineseCheckers(7, 0), "Should raise an error for invalid total number of players."
+
+
+def test_game_server_human_and_computer_turns(tmp_path):
+    """Test a scripted client playing against a computer seat over a Unix socket."""
+    from GameServer import GameServer, GameClient
+
+    async def scenario():
+        server = GameServer(move_timeout=10.0, computer_workers=1)
+        path = str(tmp_path / "server.sock")
+        await server.start_unix(path)
+        client = GameClient()
+        await client.connect_unix(path)
+        try:
+            created = await client.request("create", seats=["human", "computer"], max_plies=2)
+            table_id = created["table"]
+            assert (await client.request("join", table=table_id, color="R"))["ok"]
+            await client.next_event("turn", timeout=5)
+            illegal = await client.request("move", table=table_id, color="R", **{"from": [3, 9], "to": [5, 9]})
+            assert not illegal["ok"], "An illegal move should be rejected."
+            legal = await client.request("move", table=table_id, color="R", **{"from": [3, 9], "to": [4, 8]})
+            assert legal["ok"], "A legal move should be accepted."
+            human_move = await client.next_event("move", timeout=10)
+            assert human_move["color"] == "R"
+            computer_move = await client.next_event("move", timeout=10)
+            assert computer_move["color"] == "B", "The computer seat should move after the human."
+            end = await client.next_event("end", timeout=10)
+            assert end["ply"] == 2
+        finally:
+            await client.close()
+            await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_game_server_move_timeout_passes_turn(tmp_path):
+    """Test that a seat that does not move in time loses its turn."""
+    from GameServer import GameServer, GameClient
+
+    async def scenario():
+        server = GameServer(move_timeout=0.05)
+        host, port = await server.start_tcp()
+        client = GameClient()
+        await client.connect_tcp(host, port)
+        try:
+            created = await client.request("create", seats=["human", "human"], max_plies=2)
+            timeout = await client.next_event("timeout", timeout=5)
+            assert timeout["color"] == "R" and timeout["table"] == created["table"]
+            await client.next_event("end", timeout=5)
+            assert created["table"] in server.tables, "A finished table is kept while a client watches it."
+            await client.close()
+            for _ in range(100):
+                if not server.tables:
+                    break
+                await asyncio.sleep(0.01)
+            assert not server.tables, "A finished table is dropped once its last client has left."
+        finally:
+            await client.close()
+            await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_game_server_ends_table_when_computer_move_fails(monkeypatch):
+    """Test that a computer move that raises ends its table with an error, and that bad ply bounds are refused."""
+    from concurrent.futures import ThreadPoolExecutor
+    from GameServer import GameServer, GameClient
+
+    def failing_move(*args):
+        raise RuntimeError("engine crashed")
+
+    monkeypatch.setattr("GameServer.compute_computer_move", failing_move)
+
+    async def scenario():
+        server = GameServer(move_timeout=5.0)
+        host, port = await server.start_tcp()
+        server.executor.shutdown()
+        server.executor = ThreadPoolExecutor(max_workers=1)
+        client = GameClient()
+        await client.connect_tcp(host, port)
+        try:
+            for max_plies in (0, -3, 2.5, "10"):
+                assert not (await client.request("create", seats=["computer", "computer"], max_plies=max_plies))["ok"]
+            created = await client.request("create", seats=["computer", "computer"])
+            error = await client.next_event("error", timeout=5)
+            assert error["error"] == "engine crashed" and error["table"] == created["table"]
+            end = await client.next_event("end", timeout=5)
+            assert end["winner"] is None and end["ply"] == 0
+        finally:
+            await client.close()
+            await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_computer_move_is_stopped_at_its_time_limit(monkeypatch):
+    """Test that a computer move which overruns its time limit is interrupted instead of running on."""
+    import time
+    from ComputerPlayer import ComputerPlayer
+    from GameServer import compute_computer_move
+    board = [row[:] for row in GameLogic(2).board]
+    assert compute_computer_move(board, "R", 2, time_limit=5.0) is not None
+    monkeypatch.setattr(ComputerPlayer, "choose_move", lambda *args: time.sleep(5))
+    started = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        compute_computer_move(board, "R", 2, time_limit=0.05)
+    assert time.perf_counter() - started < 2.5
+
+
+def test_symmetry_canonicalizes_rotated_positions():
+    """Test that every symmetric variant of a position has the same canonical key and moves map back."""
+    from Symmetry import Symmetry, SymmetricCache
+    game_logic = GameLogic(2)
+    game_logic.make_move([('R', (3, 9), (4, 8))])
+    symmetry = Symmetry(game_logic)
+    cache = SymmetricCache(symmetry)
+    cache.store(game_logic.board, 'B', 1.0, ((13, 9), (12, 8)))
+
+    key = symmetry.canonicalize(game_logic.board, 'B')[0]
+    values = symmetry.cell_values(game_logic.board)
+    for transform in range(12):
+        image, side = symmetry.transform(values, 'B', transform)
+        board = [[' '] * game_logic.max_cols for _ in range(game_logic.max_rows)]
+        for (row, col), value in zip(symmetry.cells, image[1:]):
+            board[row][col] = value
+        assert symmetry.canonicalize(board, side)[0] == key
+        value, move = cache.lookup(board, side)
+        assert move == symmetry.map_move(((13, 9), (12, 8)), transform)
+    assert cache.hits == 12 and len(cache) == 1
+
+
+def write_test_game_log(path, moves):
+    """Writes a game log for a 1 human, 1 computer game with the given moves."""
+    logger = Logging(str(path))
+    logger.log_action("System", "Game Start, number of humans: 1, number of computers: 1")
+    for color, start_pos, end_pos in moves:
+        logger.log_action(color, f"Moved from {start_pos} to {end_pos}")
+
+
+def test_heuristic_player_prefers_advancing_moves():
+    """Test that the heuristic player scores moves by progress towards the opposite triangle."""
+    game_logic = GameLogic(2)
+    computer_player = HeuristicComputerPlayer("R", game_logic)
+    assert computer_player.goal_position(game_logic, 'R') == (16, 12)
+    move = computer_player.choose_move(game_logic, computer_player)
+    scores = dict(computer_player.score_moves(game_logic, computer_player))
+    assert scores[move] == max(scores.values()) == 2, "Jumping out of the home triangle gains two steps."
+
+
+def test_analyze_logs_flags_blunders(tmp_path, monkeypatch):
+    """Test batch analysis of logged games to CSV and NPY."""
+    import csv
+    import numpy as np
+    from Analysis import COLUMNS, analyze_game, analyze_logs
+    from ComputerPlayer import DEFAULT_WEIGHTS
+    log_dir = tmp_path / "logs"
+    log_dir.mkdir()
+    write_test_game_log(log_dir / "game_1.txt", [('R', (3, 9), (4, 8)), ('B', (13, 9), (12, 8)),
+                                                 ('R', (4, 8), (3, 9))])
+    write_test_game_log(log_dir / "game_2.txt", [('R', (3, 11), (4, 10))])
+
+    summary = analyze_logs([str(log_dir)], str(tmp_path / "analysis.csv"), processes=2)
+    assert summary == {"games": 2, "plies": 4, "disagreements": 4, "blunders": 1}
+    with open(tmp_path / "analysis.csv") as csv_file:
+        rows = list(csv.DictReader(csv_file))
+    assert [row["blunder"] for row in rows] == ["0", "0", "1", "0"]
+    assert rows[2]["game"] == "game_1.txt" and float(rows[2]["played_score"]) == -1
+    monkeypatch.setattr("Analysis.PENDING_GAMES_PER_PROCESS", 1)  # Games are still written in order
+    assert analyze_logs([str(log_dir)], str(tmp_path / "serial.csv"), processes=1) == summary
+    assert (tmp_path / "serial.csv").read_text() == (tmp_path / "analysis.csv").read_text()
+
+    analyze_logs([str(log_dir)], str(tmp_path / "analysis.npy"), processes=2)
+    table = np.load(tmp_path / "analysis.npy", mmap_mode="r")
+    assert list(table["game"]) == [0, 0, 0, 1] and table["blunder"].sum() == 1
+    assert table["best_score"].dtype == np.float64
+
+    # The played move is scored by the engine, on the same scale as the best move
+    monkeypatch.setattr("ComputerPlayer.DEFAULT_WEIGHTS", dict(DEFAULT_WEIGHTS, distance=-2.0))
+    (row,) = analyze_game(str(log_dir / "game_2.txt"))
+    assert row[COLUMNS.index("played_score")] == 2.0 and row[COLUMNS.index("best_score")] == 4.0
+
+
+def test_self_play_is_reproducible():
+    """Test that self-play games with the same seed are identical."""
+    from SelfPlay import play_self_play_game
+    first = play_self_play_game(2, "heuristic", seed=7, max_plies=60)
+    second = play_self_play_game(2, "heuristic", seed=7, max_plies=60)
+    assert first.moves == second.moves and len(first.moves) == 60
+
+
+def test_export_and_sample_self_play_dataset(tmp_path):
+    """Test exporting self-play positions in chunks and sampling minibatches from the memory map."""
+    from Dataset import export_self_play, PositionSampler
+    path = str(tmp_path / "positions.npy")
+    rows = export_self_play(path, games=3, max_plies=20, chunk_size=25, processes=2)
+    assert rows == 60
+    assert export_self_play(path, games=1, seed=3, max_plies=20, processes=1) == 80, "Exports should append."
+
+    sampler = PositionSampler(path, seed=0)
+    planes, side, outcome = sampler.sample(16)
+    assert planes.shape == (16, 6, 121) and side.shape == outcome.shape == (16,)
+    assert (planes.sum(axis=(1, 2)) == 20).all(), "Every 2-player position has 20 pieces."
+
+
+def test_vectorized_features_match_player_features():
+    """Test that the tuner's vectorized features agree with the features the computer players evaluate."""
+    from Dataset import encode_board
+    from Tuner import FeatureTables, extract_features
+    from ComputerPlayer import position_features, FEATURES
+    from SelfPlay import play_self_play_game
+    game_logic = GameLogic(2)
+    tables = FeatureTables(game_logic)
+    record = play_self_play_game(2, "heuristic", seed=3, max_plies=40)
+    for color, start_pos, end_pos in record.moves:
+        game_logic.make_move([(color, start_pos, end_pos)])
+    planes = encode_board(game_logic.board, game_logic.playable_positions())[None]
+    player = ComputerPlayer("R", game_logic)
+    own = position_features(game_logic, 'R', player.goal_position(game_logic, 'R'))
+    other = position_features(game_logic, 'B', player.goal_position(game_logic, 'B'))
+    expected = [own[name] - other[name] for name in FEATURES]
+    assert extract_features(planes, [0], tables)[0].tolist() == expected
+
+
+def test_tuned_weights_are_versioned_and_loaded(tmp_path):
+    """Test tuning weights on a small dataset and loading a pinned version in a heuristic player."""
+    from Dataset import export_self_play
+    from Tuner import tune_weights, save_weights
+    from ComputerPlayer import load_weights, weight_versions, DEFAULT_WEIGHTS
+    dataset = str(tmp_path / "positions.npy")
+    export_self_play(dataset, games=4, max_plies=300, processes=2)
+    result = tune_weights(dataset, epochs=200)
+    assert result["positions"] > 0 and result["loss"] < 0.7
+
+    weights_dir = str(tmp_path / "weights")
+    assert load_weights(weights_dir) == DEFAULT_WEIGHTS
+    assert save_weights(result, weights_dir).endswith("weights_v001.json")
+    assert save_weights(dict(result, weights={"distance": -2.0}), weights_dir).endswith("weights_v002.json")
+    assert weight_versions(weights_dir) == [1, 2]
+    assert load_weights(weights_dir) == DEFAULT_WEIGHTS, "New weights files must not change the default."
+    assert load_weights(weights_dir, version=2)["distance"] == -2.0
+    assert load_weights(weights_dir, version=1) == result["weights"]
+    player = HeuristicComputerPlayer("R", GameLogic(2), weights=load_weights(weights_dir, version=2))
+    assert player.choose_move(player.game_logic, player)
+    assert HeuristicComputerPlayer("R", GameLogic(2)).weights == DEFAULT_WEIGHTS
+
+
+def test_board_geometry_standard_and_small_boards():
+    """Test the generated board layout for the standard board and a small training board."""
+    from BoardGeometry import get_geometry
+    game_logic = GameLogic(6)
+    assert (game_logic.max_rows, game_logic.max_cols) == (17, 25)
+    assert len(game_logic.playable_positions()) == 121
+    assert game_logic.get_player_positions()['R'][:3] == [(0, 12), (1, 11), (1, 13)]
+    assert set(game_logic.get_target_areas_for_player('O')) == set(game_logic.get_player_positions()['P'])
+    assert game_logic.geometry is GameLogic(2).geometry, "Geometry tables should be shared across games."
+
+    small = GameLogic(2, size=2)
+    assert (small.max_rows, small.max_cols) == (9, 13) and len(small.playable_positions()) == 37
+    assert len(get_geometry(2).homes['B']) == 3
+    computer_player = HeuristicComputerPlayer("R", small)
+    assert computer_player.generate_possible_moves(small, computer_player)
+
+
+def test_fast_move_validation_matches_validate_move():
+    """Test that the exception-free and batched validation agree with validate_move on every candidate move."""
+    from SelfPlay import play_self_play_game
+    game_logic = GameLogic(3)
+    for color, start_pos, end_pos in play_self_play_game(3, "heuristic", seed=1, max_plies=30).moves:
+        game_logic.make_move([(color, start_pos, end_pos)])
+    candidates = [(start_pos, (start_pos[0] + dr, start_pos[1] + dc))
+                  for start_pos in game_logic.playable_positions()
+                  for dr in range(-2, 3) for dc in range(-4, 5)]
+    for color in ['R', 'B', 'G']:
+        expected = [game_logic.validate_move(color, start_pos, end_pos, False) for start_pos, end_pos in candidates]
+        assert game_logic.validate_moves(color, candidates) == expected
+        assert set(game_logic.legal_moves(color)) == {move for move, legal in zip(candidates, expected) if legal}
+
+
+def test_adjudicator_stops_repeated_positions():
+    """Test that shuffling pieces back and forth is detected through the incremental position hash."""
+    from Adjudication import GameAdjudicator, remaining_distance
+    game_logic = GameLogic(2)
+    adjudicator = GameAdjudicator(game_logic, ['R', 'B'], repetition_limit=3, no_progress_plies=None)
+    shuffle = [('R', (3, 9), (4, 8)), ('B', (13, 9), (12, 8)), ('R', (4, 8), (3, 9)), ('B', (12, 8), (13, 9))]
+    reasons = []
+    for color, start_pos, end_pos in shuffle * 2:
+        game_logic.make_move([(color, start_pos, end_pos)])
+        assert game_logic.position_hash == game_logic.compute_hash()
+        reasons.append(adjudicator.record_ply(color))
+    assert reasons == [None] * 7 + ["repetition"]
+    assert remaining_distance(game_logic, 'R') == remaining_distance(game_logic, 'B') == 120
+    assert adjudicator.adjudicate() == (None, {'R': 120, 'B': 120})
+
+
+def test_self_play_game_length_is_bounded():
+    """Test that stalled random games end by no-progress adjudication with a winner by remaining distance."""
+    from SelfPlay import play_self_play_game
+    record = play_self_play_game(2, "random", seed=0, max_plies=1000, no_progress_plies=30)
+    assert record.termination == "no_progress" and record.winner in ('R', 'B')
+    assert len(record.moves) < 1000
+    record = play_self_play_game(2, "random", seed=0, max_plies=25, no_progress_plies=None)
+    assert record.termination == "max_plies" and len(record.moves) == 25
+
+
+def test_simulation_run_resumes_with_identical_aggregate(tmp_path):
+    """Test that an interrupted simulation run resumes from its checkpoints with a bit-identical aggregate."""
+    from Simulation import SimulationRun
+    settings = dict(games=6, shard_size=2, seed=11, max_plies=40)
+    complete = SimulationRun(str(tmp_path / "complete"), **settings).run(processes=2)
+    assert complete["games"] == 6 and complete["shards"] == 3
+
+    resumed_dir = str(tmp_path / "resumed")
+    partial = SimulationRun(resumed_dir, **settings).run(processes=2, max_shards=1)
+    assert partial["games"] == 2
+    finished = []
+    resumed = SimulationRun(resumed_dir, **settings).run(processes=2, on_shard=finished.append)
+    assert len(finished) == 2, "Only the unfinished shards should be played again."
+    assert resumed == complete
+    with open(tmp_path / "complete" / "aggregate.json", "rb") as complete_file:
+        with open(tmp_path / "resumed" / "aggregate.json", "rb") as resumed_file:
+            assert complete_file.read() == resumed_file.read()
+    with pytest.raises(ValueError):
+        SimulationRun(resumed_dir, **dict(settings, seed=12)).run()
+    with pytest.raises(ValueError, match="weights_version"):
+        SimulationRun(resumed_dir, **dict(settings, weights_version=1)).run()
+
+
+def test_coordinator_requeues_lost_work_and_matches_local_run(tmp_path):
+    """Test a coordinator with worker processes on localhost, including a worker that disappears mid-shard."""
+    import multiprocessing
+    from Coordinator import Coordinator, encode_frame, read_frame, run_worker
+    from Simulation import SimulationRun, run_shard
+    settings = dict(games=6, shard_size=2, seed=5, max_plies=40)
+    expected = SimulationRun(str(tmp_path / "local"), **settings).run(processes=1)
+
+    async def scenario():
+        streamed = []
+        coordinator = Coordinator(SimulationRun(str(tmp_path / "distributed"), **settings),
+                                  on_result=lambda result, aggregate: streamed.append(aggregate["games"]))
+        host, port = await coordinator.start()
+        # A worker that takes a shard and disconnects without answering
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(encode_frame({"type": "request"}))
+        lost = await read_frame(reader)
+        writer.close()
+        await writer.wait_closed()
+        workers = [multiprocessing.Process(target=run_worker, args=(host, port)) for _ in range(2)]
+        for worker in workers:
+            worker.start()
+        aggregate = await asyncio.wait_for(coordinator.wait_finished(), 60)
+        for worker in workers:
+            await asyncio.get_running_loop().run_in_executor(None, worker.join, 10)
+            assert worker.exitcode == 0
+        return lost, streamed, aggregate
+
+    lost, streamed, aggregate = asyncio.run(scenario())
+    assert lost["type"] == "work" and lost["shard"] == 0
+    assert streamed == [2, 4, 6]
+    assert aggregate == expected
+
+    # A result that arrives after its lease ran out keeps the shard from being handed out a second time
+    async def late_result():
+        coordinator = Coordinator(SimulationRun(str(tmp_path / "late"), **settings))
+        await coordinator.start()
+        shard = coordinator.next_message(None)["shard"]
+        coordinator.leases[shard] = (None, 0.0)  # The lease has run out
+        handed = [coordinator.next_message(None)["shard"]]
+        coordinator.record_result(run_shard(coordinator.run.config, shard))
+        while (message := coordinator.next_message(None))["type"] == "work":
+            handed.append(message["shard"])
+        coordinator.server.close()
+        return shard, handed
+
+    shard, handed = asyncio.run(late_result())
+    assert shard not in handed and sorted(handed) == [1, 2]
+
+
+def test_packed_moves_and_compact_history():
+    """Test packed move encoding, applying and undoing packed moves, and the memory of a stored game history."""
+    from Moves import MoveHistory, decode_move, encode_move, traced_peak
+    from SelfPlay import play_self_play_game
+    game_logic = GameLogic(2)
+    geometry = game_logic.geometry
+    codes = game_logic.legal_move_codes('R')
+    assert [decode_move(geometry, code)[1:] for code in codes] == game_logic.legal_moves('R')
+    for code in codes:
+        assert encode_move(geometry, decode_move(geometry, code)) == code
+        color, start_pos, end_pos = decode_move(geometry, code)
+        board_before, hash_before = [row[:] for row in game_logic.board], game_logic.position_hash
+        game_logic.make_packed_move(code)
+        assert game_logic.position_hash == game_logic.compute_hash()
+        game_logic.make_packed_move(encode_move(geometry, (color, end_pos, start_pos)))
+        assert game_logic.board == board_before and game_logic.position_hash == hash_before
+
+    record = play_self_play_game(2, "heuristic", seed=3, max_plies=200)
+    moves = list(record.moves)
+    assert isinstance(record.moves, MoveHistory) and record.moves == moves and record.moves[0] == moves[0]
+    # Store a long history, so that fresh tuples are allocated rather than reused from the interpreter's free lists
+    history = moves * 20
+    _, tuple_bytes = traced_peak(lambda: [(color, (start[0], start[1]), (end[0], end[1]))
+                                          for color, start, end in history])
+    _, packed_bytes = traced_peak(MoveHistory, geometry, history)
+    assert packed_bytes * 10 < tuple_bytes
+    for slotted in (Player("Alice", "R"), ComputerPlayer("R", game_logic), record):
+        assert not hasattr(slotted, "__dict__")
+
+
+def test_perft_fixtures_and_parallel_split():
+    """Test move generation against the stored perft counts, and that splitting the root over processes agrees."""
+    from Perft import check_fixtures, load_fixtures, parallel_perft, perft, perft_divide, setup_position
+    assert check_fixtures(max_depth=3) == []
+    midgame = next(fixture for fixture in load_fixtures() if fixture["name"] == "midgame_2_players")
+    assert parallel_perft(midgame, 3, processes=2) == midgame["counts"][2]
+    game_logic = setup_position(midgame["num_players"], midgame["size"], midgame["moves"])
+    divided = perft_divide(game_logic, ['R', 'B'], 2, midgame["turn"])
+    assert len(divided) == midgame["counts"][0] and sum(nodes for _, nodes in divided) == midgame["counts"][1]
+    assert perft(game_logic, ['R', 'B'], 2, midgame["turn"]) == midgame["counts"][1]
+
+
+def test_reachable_destinations_and_hints():
+    """Test cached destinations, including jump chains, and background hints."""
+    from HintEngine import HintEngine, ReachabilityCache
+    from Perft import load_fixtures, setup_position
+    midgame = next(fixture for fixture in load_fixtures() if fixture["name"] == "midgame_2_players")
+    game_logic = setup_position(midgame["num_players"], midgame["size"], midgame["moves"])
+    cache = ReachabilityCache(game_logic)
+    reachable = cache.precompute('R')
+    # Clicks in the same position reuse the precomputed destinations instead of searching again
+    assert cache.precompute('R') is reachable and (cache.hits, cache.misses) == (1, 1)
+    assert any(len(path) > 2 for destinations in reachable.values() for path in destinations.values())
+    for start_pos, destinations in reachable.items():
+        assert {end for path in destinations.values() if len(path) == 2 for end in path[1:]} == \
+            {end_pos for start, end_pos in game_logic.legal_moves('R') if start == start_pos}
+        for destination, path in destinations.items():
+            chain = setup_position(midgame["num_players"], midgame["size"], midgame["moves"])
+            for hop_start, hop_end in zip(path, path[1:]):
+                assert chain.is_legal_move('R', hop_start, hop_end)
+                assert len(path) == 2 or hop_end not in chain.geometry.steps[chain.geometry.index[hop_start]]
+                chain.make_move([('R', hop_start, hop_end)])
+            assert path[0] == start_pos and path[-1] == destination
+    assert cache.destinations('R', (0, 0)) == {} and (cache.hits, cache.misses) == (2, 1)
+
+    hint_engine = HintEngine()
+    hint = hint_engine.request_hint(game_logic, 'R').result(timeout=10)
+    hint_engine.close()
+    assert hint in game_logic.legal_moves('R')
+
+
+def test_console_renderers_draw_only_changes():
+    """Test that the curses renderer rewrites only changed cells, and the plain and quiet fallbacks."""
+    import io
+    from ConsoleRenderer import CursesRenderer, QuietRenderer, create_renderer, format_board
+
+    class FakeScreen:
+        def __init__(self):
+            self.writes = []
+
+        def addstr(self, row, col, text):
+            self.writes.append((row, col, text))
+
+        def erase(self):
+            self.writes = []
+
+        def move(self, row, col):
+            pass
+
+        def clrtobot(self):
+            pass
+
+        def refresh(self):
+            pass
+
+    game_logic = GameLogic(2)
+    screen = FakeScreen()
+    renderer = CursesRenderer(screen)
+    ui = UserInterface(game_logic, renderer)
+    ui.display_board()
+    assert [text for _, _, text in screen.writes] == format_board(game_logic.board).splitlines()
+    screen.writes = []
+    game_logic.make_move([('R', (3, 11), (4, 10))])
+    ui.display_board()
+    assert sorted(screen.writes) == [(4, 3 + 2 * 11, ". "), (5, 3 + 2 * 10, "R ")]
+    ui.display_winner('R')
+    assert screen.writes[-1] == (game_logic.max_rows + 2, 0, "Congratulations, Player R has won the game!")
+
+    output = io.StringIO()
+    plain = create_renderer("auto", output)  # StringIO is not a terminal
+    plain.render(game_logic.board)
+    assert output.getvalue() == format_board(game_logic.board) + "\n"
+    assert output.getvalue().splitlines()[5][3 + 2 * 10] == "R"
+    quiet_output = io.StringIO()
+    quiet = QuietRenderer(quiet_output)
+    quiet.render(game_logic.board)
+    quiet.message("done")
+    assert quiet_output.getvalue() == "done\n"
+
+
+def test_game_clock_modes_and_flag_fall(tmp_path):
+    """Test the three time controls, flag fall in self-play, and clock lines in the game log."""
+    import io
+    from ConsoleRenderer import QuietRenderer
+    from GameClock import GameClock, TimeControl
+    from SelfPlay import play_self_play_game
+    now = [0.0]
+    timer = lambda: now[0]
+
+    def turn(clock, color, seconds):
+        clock.start(color)
+        now[0] += seconds
+        return clock.stop()
+
+    increment = GameClock(TimeControl.parse("10+2"), ['R', 'B'], timer)
+    assert turn(increment, 'R', 3) == (3, False) and increment.remaining['R'] == 9
+    sudden_death = GameClock(TimeControl.parse("10"), ['R', 'B'], timer)
+    assert turn(sudden_death, 'R', 4) == (4, False) and turn(sudden_death, 'R', 7) == (7, True)
+    per_move = GameClock(TimeControl.parse("5/move"), ['R', 'B'], timer)
+    assert turn(per_move, 'B', 4.5) == (4.5, False) and turn(per_move, 'B', 4.5) == (4.5, False)
+    per_move.start('B')
+    now[0] += 6
+    assert per_move.flagged() and per_move.time_left('R') == 5
+    assert str(TimeControl.parse("300+5")) == "300+5" and str(TimeControl.parse("10/move")) == "10/move"
+    with pytest.raises(ValueError):
+        TimeControl.parse("fast")
+
+    # Every call of the timer advances it by half a second, so each turn takes a second and red, moving first,
+    # runs out of time on its 30th turn
+    def ticking():
+        now[0] += 0.5
+        return now[0]
+
+    record = play_self_play_game(2, "heuristic", seed=0, time_control=TimeControl.parse("30"), timer=ticking)
+    assert record.termination == "time" and len(record.times) == 59 and record.winner == 'B'
+
+    game = ChineseCheckers(0, 2, QuietRenderer(io.StringIO()))
+    logger = Logging(str(tmp_path / "game_log.txt"))
+    colors = [player.color[0] for player in game.players]
+    clock = GameClock(TimeControl.parse("100+1"), colors, timer)
+    run_game_loop(game, logger, GameAdjudicator(game.game_logic, colors), 0, clock=clock)
+    with open(logger.log_file_path) as log_file:
+        clock_lines = [line for line in log_file if "Clock: " in line]
+    assert len(clock_lines) == len(logger.parse_log_file()) > 0
+
+
+def test_game_database_ingest_and_queries(tmp_path):
+    """Test ingesting logs into the game database and querying by outcome, leader, length and position."""
+    from GameDatabase import CHECKPOINT_INTERVAL, GameDatabase, summarize_log
+    from SelfPlay import play_self_play_game
+    logs = tmp_path / "logs"
+    logs.mkdir()
+    for seed in range(6):
+        record = play_self_play_game(2, "random" if seed % 2 else "heuristic", seed=seed)
+        path = logs / f"game_log_{seed}.txt"
+        write_test_game_log(path, record.moves)
+        if record.termination != "win":
+            Logging(str(path)).log_action("System", f"Game adjudicated ({record.termination}), winner: {record.winner}")
+    (logs / "notes.txt").write_text("not a game log\n")
+
+    database = GameDatabase(str(tmp_path / "games.db"))
+    assert database.ingest_logs([str(logs)], processes=2, batch_size=4) == 6
+    assert database.ingest_logs([str(logs)], processes=2) == 0  # Already ingested
+    summaries = [summarize_log(str(logs / f"game_log_{seed}.txt")) for seed in range(6)]
+    assert database.count_games() == 6
+    assert {game["source"] for game in database.find_games(winner='B')} == \
+        {summary["source"] for summary in summaries if summary["winner"] == 'B'}
+    assert len(database.find_games(color='R', kind='human')) == 6
+    with pytest.raises(ValueError):
+        database.find_games(result='win')
+    assert len(database.find_games(min_plies=100)) == sum(summary["plies"] >= 100 for summary in summaries)
+
+    lost_after_leading = 0
+    for color in ('R', 'B'):
+        expected = {summary["source"] for summary in summaries
+                    if dict(summary["checkpoints"]).get(CHECKPOINT_INTERVAL * 4) == color
+                    and summary["winner"] not in (None, color)}
+        found = database.games_lost_after_leading(color, CHECKPOINT_INTERVAL * 4)
+        assert {game["source"] for game in found} == expected
+        assert database.games_lost_after_leading(color, CHECKPOINT_INTERVAL * 4, count=True) == len(found)
+        lost_after_leading += len(found)
+    assert lost_after_leading > 0
+    with pytest.raises(ValueError):
+        database.games_lost_after_leading('R', CHECKPOINT_INTERVAL + 1)
+
+    summary = summaries[0]
+    reached = database.games_with_position(summary["hashes"][20])
+    assert summary["source"] in {game["source"] for game in reached}
+    assert next(game["ply"] for game in reached if game["source"] == summary["source"]) == 20
+    assert database.win_rates()['B'] == sum(summary["winner"] == 'B' for summary in summaries) / 6
+    database.close()
+
+
+def test_offscreen_board_images(tmp_path, monkeypatch):
+    """Test headless rendering of positions to PNG and SVG, in a process pool, with the GUI palette."""
+    import os
+    import struct
+    import zlib
+    import numpy as np
+    from BoardImage import BoardRenderer, Image, png_bytes, render_frames, render_logs, write_gif
+    from BoardLayout import BACKGROUND_COLOR, get_color, hex_to_rgb
+    from SelfPlay import play_self_play_game
+    game_logic = GameLogic(2)
+    renderer = BoardRenderer(width=300, height=300)
+    image = renderer.render(game_logic.board)
+    assert image.shape == (300, 300, 3)
+    for position, cell in (((0, 12), 'R'), ((16, 12), 'B'), ((8, 12), 'E')):
+        x, y = renderer.layout.center(*position)
+        assert tuple(image[int(y), int(x)]) == hex_to_rgb(get_color(cell))
+    assert tuple(image[0, 0]) == hex_to_rgb(BACKGROUND_COLOR)
+
+    # Decode the PNG by hand: its single IDAT chunk holds the filtered scanlines
+    png = png_bytes(image)
+    assert png[:8] == b"\x89PNG\r\n\x1a\n" and struct.unpack(">II", png[16:24]) == (300, 300)
+    idat_length = struct.unpack(">I", png[33:37])[0]
+    scanlines = np.frombuffer(zlib.decompress(png[41:41 + idat_length]), dtype=np.uint8).reshape(300, 901)
+    assert not scanlines[:, 0].any() and np.array_equal(scanlines[:, 1:].reshape(300, 300, 3), image)
+    assert renderer.svg(game_logic.board).count("<circle") == 121
+
+    boards = []
+    play_self_play_game(2, "heuristic", seed=0, max_plies=12,
+                        on_move=lambda logic, color, move: boards.append([row[:] for row in logic.board]))
+    frames = render_frames(boards, 300, 300, processes=2)
+    assert all(np.array_equal(frame, renderer.render(board)) for frame, board in zip(frames, boards))
+
+    logs = tmp_path / "logs"
+    logs.mkdir()
+    for seed in range(3):
+        write_test_game_log(logs / f"game_log_{seed}.txt", play_self_play_game(2, seed=seed, max_plies=20).moves)
+    written = render_logs([str(logs)], str(tmp_path / "images"), ("png", "svg"), 120, 120, processes=2)
+    assert [os.path.basename(path) for path in written] == \
+        [f"game_log_{seed}.{extension}" for seed in range(3) for extension in ("png", "svg")]
+    if Image is None:
+        with pytest.raises(ImportError):
+            write_gif(str(tmp_path / "game.gif"), frames)
+    else:
+        write_gif(str(tmp_path / "game.gif"), frames)
+        assert os.path.getsize(tmp_path / "game.gif") > 0
+    monkeypatch.setattr("BoardImage.Image", None)
+    with pytest.raises(ImportError):
+        render_logs([str(logs)], str(tmp_path / "animations"), ("png", "gif"), 120, 120, processes=2)
+    assert not os.path.exists(tmp_path / "animations"), "Missing Pillow is reported before rendering starts."
+
+
+def test_move_service_batches_caches_and_matches_heuristic():
+    """Test the HTTP move service: answers match the heuristic, repeats hit the cache, requests are batched."""
+    import http.client
+    import json
+    from ComputerPlayer import DEFAULT_WEIGHTS, HeuristicComputerPlayer
+    from MoveService import (MicroBatcher, MoveService, board_symmetry, decode_position, encode_position, load_test,
+                             request_move, request_stats, sample_positions)
+    positions = sample_positions(12, seed=1)
+    assert all(encode_position(decode_position(position)) == position for position, _ in positions)
+    with pytest.raises(ValueError):
+        decode_position("RB.X")
+
+    service = MoveService(weights=DEFAULT_WEIGHTS)
+    host, port = service.start_background()
+    try:
+        connection = http.client.HTTPConnection(host, port)
+        for position, color in positions:
+            reply = request_move(connection, position, color)
+            game_logic = decode_position(position)
+            scored_moves = HeuristicComputerPlayer(color, game_logic, weights=DEFAULT_WEIGHTS).score_moves(
+                game_logic, Player("Test", color))
+            best_score = max(score for _, score in scored_moves)
+            assert tuple(map(tuple, reply["move"])) in [move for move, score in scored_moves if score == best_score]
+            assert not reply["cached"]
+        assert request_move(connection, *positions[0])["cached"]
+        # A mirrored and rotated copy of an answered position is answered from the cache, in its own frame
+        symmetry = board_symmetry()
+        position, color = positions[0]
+        game_logic = decode_position(position)
+        image, mirrored_color = symmetry.transform(symmetry.cell_values(game_logic.board), color, 8)
+        for (row, col), cell in zip(symmetry.cells, image[1:]):
+            game_logic.board[row][col] = cell
+        reply = request_move(connection, encode_position(game_logic), mirrored_color)
+        scored_moves = HeuristicComputerPlayer(mirrored_color, game_logic, weights=DEFAULT_WEIGHTS).score_moves(
+            game_logic, Player("Test", mirrored_color))
+        best_score = max(score for _, score in scored_moves)
+        assert reply["cached"] and tuple(map(tuple, reply["move"])) in \
+            [move for move, score in scored_moves if score == best_score]
+        for bad_request in ('{"position": "RRR", "color": "R"}', '{"position": ["RRR"], "color": "R"}',
+                            '{"position": "RRR", "color": ["R"]}', '["RRR", "R"]'):
+            connection.request("POST", "/move", bad_request)
+            response = connection.getresponse()
+            assert response.status == 400 and "error" in json.loads(response.read())
+        connection.close()
+        idle_connection = http.client.HTTPConnection(host, port)  # Left open, so closing must end its handler
+        idle_connection.request("GET", "/health")
+        assert json.loads(idle_connection.getresponse().read()) == {"status": "ok"}
+
+        result = load_test(host, port, positions, clients=4, requests_per_client=25)
+        assert result["requests"] == 100
+        stats = request_stats(host, port)
+        assert stats["requests"] == 114 and stats["cache_hits"] >= 102
+        assert 0 < stats["latency_p50_ms"] <= stats["latency_p90_ms"] <= stats["latency_p99_ms"]
+    finally:
+        service.stop_background()
+    assert not service.connections
+    idle_connection.close()
+
+    # Requests that arrive together are evaluated in one call
+    batches = []
+
+    async def submit_together():
+        batcher = MicroBatcher(lambda items: batches.append(items) or [item * 2 for item in items], max_batch=8)
+        batcher.start()
+        results = await asyncio.gather(*(batcher.submit(item) for item in range(10)))
+        await batcher.close()
+        return results
+
+    assert asyncio.run(submit_together()) == [item * 2 for item in range(10)]
+    assert [len(batch) for batch in batches] == [8, 2]
+
+
+def test_shared_table_search_and_perft():
+    """Test the shared-memory table across processes, and the searches that share it."""
+    from multiprocessing import Pool
+    from Perft import parallel_perft, perft, setup_position
+    from Search import LookaheadComputerPlayer, search_moves
+    from SelfPlay import play_self_play_game
+    from SharedTable import SharedTable, attached_table, table_key
+    with SharedTable(1000) as table:
+        assert table.num_entries == 1024
+        key = table_key(123456789, 3, 1)
+        assert key != table_key(123456789, 2, 1)
+        table.store(key, 42)
+        assert table.probe(key) == 42 and table.probe(key + 1024) is None
+        assert attached_table(table.name).probe(key) == 42
+        # An entry whose words do not match, as after two processes wrote it at once, reads as a miss
+        table.words[(key & table.mask) * 2 + 1] = 43
+        assert table.probe(key) is None
+        stats = table.stats()
+        assert (stats["probes"], stats["hits"], stats["collisions"]) == (3, 1, 2)
+        assert stats["fill"] == 1 / 1024
+
+        game_logic = setup_position(2, 2)
+        with SharedTable(1 << 12) as perft_table:
+            assert perft(game_logic, ["R", "B"], 4, 0, perft_table) == 3844
+        assert parallel_perft({"num_players": 2, "size": 2, "moves": [], "turn": 0}, 4, 2, 1 << 12) == 3844
+
+        weights = {"distance": -1.0, "stragglers": -0.5, "blocked": 0.0, "jumps": 0.25}
+        table.clear()
+        serial, serial_nodes = search_moves(game_logic, "R", 3, weights, table)
+        assert len(serial) == 6 and table.stats()["hits"] > 0
+        with Pool(2) as pool:
+            table.clear()
+            shared, shared_nodes = search_moves(game_logic, "R", 3, weights, table, pool)
+            table.clear()
+            private, private_nodes = search_moves(game_logic, "R", 3, weights, table, pool, shared=False)
+            # Workers clear their private tables, so values searched with other weights do not carry over
+            other_weights = dict(weights, jumps=2.0)
+            private_other, _ = search_moves(game_logic, "R", 3, other_weights, table, pool, shared=False)
+            table.clear()
+            assert private_other == search_moves(game_logic, "R", 3, other_weights, table)[0] != private
+            pool.close()
+            pool.join()
+        assert serial == shared == private
+        assert shared_nodes < private_nodes
+
+    player = LookaheadComputerPlayer("R", game_logic, random.Random(0), weights, depth=2)
+    try:
+        move = player.choose_move(game_logic, player)
+        scored_moves = player.score_moves(game_logic, player)
+        assert move in [move for move, score in scored_moves if score == max(score for _, score in scored_moves)]
+        assert player.last_depth == 2
+        # On a clock the search deepens only as far as the time left allows
+        assert player.choose_move(game_logic, player, time_left=0.0) in game_logic.legal_moves("R")
+        assert player.last_depth == 1
+        player.choose_move(game_logic, player, time_left=1e6)
+        assert player.last_depth == 2
+    finally:
+        player.close()
+    assert len(play_self_play_game(2, engine="lookahead", seed=0, max_plies=2).moves) == 2
+
+
+def test_vector_simulator_matches_game_logic():
+    """Test the lockstep simulator: its moves are legal in GameLogic, and wins and encodings agree."""
+    import numpy as np
+    from BoardGeometry import PLAYER_COLORS
+    from Dataset import encode_board
+    from Moves import pack_move
+    from VectorSim import VectorSimulator
+    simulator = VectorSimulator(16, 2, policy="random", seed=3, max_plies=40)
+    for _ in range(25):
+        simulator.step()
+    for game in range(16):
+        game_logic = GameLogic(2)
+        for (row, col), cell in zip(game_logic.geometry.positions, simulator.cells[game, :-1]):
+            game_logic.board[row][col] = PLAYER_COLORS[cell] if cell >= 0 else 'E'
+        assert np.array_equal(simulator.planes()[game], encode_board(game_logic.board, game_logic.geometry.positions))
+        for color_index, color in enumerate("RB"):
+            pieces, slots = np.nonzero(simulator.legal_moves(color_index, np.array([game]))[0])
+            holes = simulator.pieces[color_index, game, pieces]
+            assert sorted(pack_move(color_index, int(hole), int(simulator.destinations[hole, slot]))
+                          for hole, slot in zip(holes, slots)) == sorted(game_logic.legal_move_codes(color))
+    simulator.run()
+    assert not simulator.active().any() and (simulator.plies <= 40).all()
+
+    for num_players in (2, 3):
+        simulator = VectorSimulator(8, num_players, policy="heuristic", seed=0, record_moves=True).run()
+        records = simulator.records()
+        assert sum(record.termination == "win" for record in records) >= 6
+        for record in records:
+            assert record.seed is None  # Lockstep games share a generator, so no seed replays one alone
+            game_logic = GameLogic(num_players)
+            for move in record.moves:
+                assert game_logic.make_move([move])
+            if record.termination == "win":
+                assert game_logic.check_win_condition(record.winner)
+
+
+def test_animation_timeline_drops_frames_and_throttles_sound(tmp_path):
+    """Test the hop animation timeline, frame pacing, sound throttling and loading logs for replay."""
+    from Animation import FramePacer, HopAnimation, SoundThrottle, interpolate, load_replay, turn_hops
+    from SelfPlay import play_self_play_game
+    hops = [("R", (13, 9), (12, 10))] * 150
+    assert HopAnimation(hops, hop_seconds=0.2).progress(0.5) == (2, pytest.approx(0.5))
+    assert HopAnimation(hops, hop_seconds=0.2).progress(100.0) == (150, 0.0)
+    assert interpolate((0, 0), (10, 20), 0.5) == (5, 10) and interpolate((0, 0), (10, 20), 1.0) == (10, 20)
+
+    # Play 150 hops at 100x with 60 frames per second, where drawing a frame takes 5 ms
+    now = [0.0]
+    pacer = FramePacer(1 / 60, timer=lambda: now[0])
+    throttle = SoundThrottle(0.08, timer=lambda: now[0])
+    animation = HopAnimation(hops, hop_seconds=0.25, speed=100)
+    pacer.start()
+    shown = sounds = 0
+    while shown < len(hops):
+        hops_done, _ = animation.progress(pacer.begin_frame())
+        if hops_done > shown:
+            pacer.record_hops(hops_done - shown, 1)
+            sounds += throttle.ready()
+        shown = hops_done
+        now[0] += 0.005
+        delay = pacer.next_delay_ms()
+        assert delay == 12
+        now[0] += delay / 1000
+    assert now[0] < 0.45 and pacer.frames < 30 and pacer.dropped_hops > 100
+    assert sounds < 6 and sounds + throttle.skipped == pacer.frames - 1
+
+    moves = list(play_self_play_game(2, seed=0, max_plies=30).moves)
+    write_test_game_log(tmp_path / "game_log.txt", moves)
+    assert load_replay(str(tmp_path / "game_log.txt")) == (2, moves)
+    assert [len(turn) for turn in turn_hops([("R", (13, 9), (11, 11)), ("R", (11, 11), (9, 9)),
+                                             ("B", (3, 9), (4, 10))])] == [2, 1]